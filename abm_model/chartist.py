@@ -27,14 +27,21 @@ class ChartistAgent(MarketAgent):
     price_trend_importance: float = -10.
     order_amount_range: list[float] = [0.01, 0.15]
 
-    def __init__(self, unique_id: int, model: Model, cash: float | None = None, assets_quantity: int | None = None):
+    def __init__(self, unique_id: int, model: Model, cash: float | None = None, assets_quantity: int | None = None,
+                 is_optimistic: bool | None = None, take_profit: float | None = None,
+                 order_amount_perc: float | None = None):
+        """
+        Parameters which are not given are drawn from `RNG`, see `abm_model.population` for templates.
+        """
         cls = type(self)
         cash = cls.RNG.lognormal(*cls.cash_distr) * cls.cash_scale if not cash else cash
         super().__init__(unique_id=unique_id, model=model, cash=cash, assets_quantity=assets_quantity)
-        self.__is_optimistic = cls.RNG.choice([True, False], p=[cls.optimistic_ratio, 1 - cls.optimistic_ratio])
-        self.take_profit = cls.RNG.uniform(*cls.take_profit_range)
+        self.__is_optimistic = (cls.RNG.choice([True, False], p=[cls.optimistic_ratio, 1 - cls.optimistic_ratio])
+                                if is_optimistic is None else is_optimistic)
+        self.take_profit = cls.RNG.uniform(*cls.take_profit_range) if take_profit is None else take_profit
         self.__avg_opened_price = 0
-        self.__order_amount_perc = cls.RNG.uniform(*cls.order_amount_range)
+        self.__order_amount_perc = (cls.RNG.uniform(*cls.order_amount_range) if order_amount_perc is None
+                                    else order_amount_perc)
 
         self.model._optimistic_chartists_number += int(self.__is_optimistic)
 
@@ -42,6 +49,14 @@ class ChartistAgent(MarketAgent):
     def is_optimistic(self):
         return self.__is_optimistic
 
+    @property
+    def order_amount_perc(self) -> float:
+        return self.__order_amount_perc
+
+    @property
+    def avg_opened_price(self) -> float:
+        return self.__avg_opened_price
+
     @is_optimistic.setter
     def is_optimistic(self, value: bool):
         if self.__is_optimistic != value:
@@ -53,7 +68,7 @@ class ChartistAgent(MarketAgent):
 
     def __majority_opinion(self):
         cls = type(self)
-        chartists_number = len(self.model.get_agents_of_type(cls))
+        chartists_number = len(self.model.schedule.agents_of_type(cls))
         optimists_number = self.model._optimistic_chartists_number
         pessimists_number = chartists_number - optimists_number
         majority = (optimists_number - pessimists_number) / chartists_number
@@ -64,8 +79,8 @@ class ChartistAgent(MarketAgent):
 
     def __evaluate_opinion(self):
         cls = type(self)
-        chartists_number = len(self.model.get_agents_of_type(cls))
-        agents_number = len(self.model.agents) - 2  # -MarketMaker, -News
+        chartists_number = len(self.model.schedule.agents_of_type(cls))
+        agents_number = self.model.schedule.agents_number - self.model.market_makers_number - 1  # -MarketMakers, -News
         change_proba = cls.revaluation_freq * (chartists_number / agents_number) * math.exp(
             self.__majority_opinion() * (1 if self.is_optimistic else -1)
         )
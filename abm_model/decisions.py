@@ -0,0 +1,272 @@
+import weakref
+from multiprocessing import get_context
+
+import numpy as np
+
+import config
+from abm_model.chartist import ChartistAgent
+from abm_model.fundamentalist import FundamentalistAgent
+from abm_model.market_agent import MarketAgent
+from utils.models import MarketAction
+from utils.order_book import OrderBook
+
+logger = config.get_logger(__name__)
+
+STATE = ['is_chartist', 'cash', 'assets', 'cash_reserved', 'fundamental_price', 'chi_market', 'chi_opinion',
+         'order_amount_perc', 'is_optimistic', 'take_profit', 'avg_opened_price']
+DECISION = ['cancel', 'fundamental_price', 'is_optimistic', 'action_1', 'price_1', 'quantity_1',
+            'action_2', 'price_2', 'quantity_2']
+CANCEL_SIDES = {1: 'bid', 2: 'ask', 3: 'both'}
+BLOCK_SIZE = 256  # traders per random stream, results don't depend on how blocks are spread over workers
+
+_S = {name: idx for idx, name in enumerate(STATE)}
+_D = {name: idx for idx, name in enumerate(DECISION)}
+_BUY, _BUY_LIMIT = MarketAction.BUY.value, MarketAction.BUY_LIMIT.value
+_SELL, _SELL_LIMIT = MarketAction.SELL.value, MarketAction.SELL_LIMIT.value
+
+
+def snapshot(model) -> dict:
+    """
+    Read-only market state the traders decide on: top of book, last prices, opinions and class parameters.
+    """
+    order_book: OrderBook = model.order_book
+    best_ask, best_bid, central = order_book.get_best_ask(), order_book.get_best_bid(), order_book.get_central_price()
+    schedule = model.schedule
+    return {
+        'last_price': float(model.prices[-1]),
+        'prev_price': float(model.prices[-2]) if len(model.prices) > 1 else np.nan,
+        'central_price': float(central) if central else np.nan,
+        'best_ask': best_ask.price if best_ask else np.nan,
+        'best_bid': best_bid.price if best_bid else np.nan,
+        'news': float(model.news_event_value) if model.news_event_occurred else np.nan,
+        'optimists': model._optimistic_chartists_number,
+        'chartists': len(schedule.agents_of_type(ChartistAgent)),
+        'traders': schedule.agents_number - model.market_makers_number - 1,  # -MarketMakers, -News
+        'tick_size': model.tick_size,
+        'lambda_limit': MarketAgent.lambda_limit,
+        'fundamental_price_variance': FundamentalistAgent.fundamental_price_variance,
+        'revaluation_freq': ChartistAgent.revaluation_freq,
+        'majority_importance': ChartistAgent.majority_importance,
+        'price_trend_importance': ChartistAgent.price_trend_importance,
+    }
+
+
+def _round_to_tick(price: np.ndarray, tick_size: float) -> np.ndarray:
+    return np.maximum(np.round(np.round(price / tick_size) * tick_size, 4), 1e-10)
+
+
+def _buy_quantity(wealth, cash, perc, price):
+    qty = np.floor(np.minimum(wealth * perc, cash) / price)
+    return np.where((qty == 0) & (cash >= price), 1., qty)
+
+
+def _sell_quantity(wealth, reserved, perc, price):
+    free_cash = (wealth - reserved) * 0.95
+    qty = np.floor(np.minimum(wealth * perc, free_cash) / price)
+    return np.where((qty == 0) & (free_cash >= price), 1., qty)
+
+
+def decide_block(state: np.ndarray, out: np.ndarray, traders: np.ndarray, snap: dict, rng: np.random.Generator):
+    """
+    `FundamentalistAgent.step` and `ChartistAgent.step` as array operations on the snapshot, for `traders`
+    (indices into the `state` and `out` columns). Orders are written to `out`, nothing is placed.
+    """
+    n = len(traders)
+    s = state[:, traders]
+    is_chartist = s[_S['is_chartist']] > 0
+    cash, assets, reserved = s[_S['cash']], s[_S['assets']], s[_S['cash_reserved']]
+    perc = s[_S['order_amount_perc']]
+    last, central = snap['last_price'], snap['central_price']
+    ask, bid = snap['best_ask'], snap['best_bid']
+    market = central if central == central else last
+    wealth = np.round(cash + last * assets, 4)
+    bankrupt = wealth <= 0
+    uniform = rng.random(n)
+    limit = _round_to_tick(rng.laplace(market, 1 / snap['lambda_limit'], n), snap['tick_size'])
+    news = (rng.normal(snap['news'], snap['fundamental_price_variance'], n) if snap['news'] == snap['news']
+            else np.zeros(n))
+
+    # fundamentalists, see `FundamentalistAgent._calc_fundamental_price` and `_intention`
+    chi_market, chi_opinion = s[_S['chi_market']], s[_S['chi_opinion']]
+    fundamental = s[_S['fundamental_price']] + news
+    herding = chi_opinion < np.abs(1 - fundamental / market)
+    fundamental = np.where(herding, np.where(fundamental >= market, market * (1 + chi_opinion),
+                                             market * (1 - chi_opinion)), fundamental)
+    fundamental = np.where(bankrupt, s[_S['fundamental_price']], fundamental)
+    f_cancel = np.where(bankrupt, 3, np.where(fundamental > market, 2, 1))
+    buy = fundamental > ask * (1 + chi_market)
+    buy_limit = ~buy & (ask < fundamental) & (fundamental <= ask * (1 + chi_market))
+    sell = ~buy & ~buy_limit & (fundamental < bid * (1 - chi_market))
+    sell_limit = ~buy & ~buy_limit & ~sell & (bid * (1 - chi_market) <= fundamental) & (fundamental < bid)
+    f_action = np.select([buy, buy_limit, sell, sell_limit], [_BUY, _BUY_LIMIT, _SELL, _SELL_LIMIT], 0)
+    f_price = np.where(buy_limit | sell_limit, limit, 0.)
+    qty_price = np.where(buy | sell, market, limit)
+    f_qty = np.where(buy | buy_limit, _buy_quantity(wealth, cash, perc, qty_price) + np.maximum(-assets, 0),
+                     _sell_quantity(wealth, reserved, perc, qty_price) + np.maximum(assets, 0))
+    f_qty = np.where((f_action != 0) & ~bankrupt & (qty_price > 0), f_qty, 0.)
+
+    # chartists, see `ChartistAgent.__evaluate_opinion` and `step`
+    optimistic = s[_S['is_optimistic']] > 0
+    chartists = max(snap['chartists'], 1)
+    majority = (2 * snap['optimists'] - chartists) / chartists
+    prev = snap['prev_price']
+    trend = (last - prev) / prev if prev == prev else 0.0001
+    opinion = (snap['majority_importance'] * majority
+               + snap['price_trend_importance'] * trend / snap['revaluation_freq'])
+    change_proba = np.minimum(snap['revaluation_freq'] * (chartists / max(snap['traders'], 1))
+                              * np.exp(opinion * np.where(optimistic, 1., -1.)), 1.)
+    flip = uniform < change_proba
+    c_optimistic = optimistic ^ flip
+    take_profit, opened = s[_S['take_profit']], s[_S['avg_opened_price']]
+    close_buy = (assets < 0) & c_optimistic & (ask == ask)
+    close_buy_limit = ~close_buy & (assets < 0) & (opened * (1 - take_profit) >= ask)
+    close_sell = (assets > 0) & ~c_optimistic & (bid == bid)
+    close_sell_limit = ~close_sell & (assets > 0) & (opened * (1 + take_profit) <= bid)
+    c_action = np.select([close_buy, close_buy_limit, close_sell, close_sell_limit],
+                         [_BUY, _BUY_LIMIT, _SELL, _SELL_LIMIT], 0)
+    c_price = np.where(close_buy | close_buy_limit, ask, np.where(close_sell | close_sell_limit, bid, 0.))
+    c_qty = np.abs(assets) * (c_action != 0)
+    new_order = ~close_buy & ~close_sell & ~bankrupt
+    n_qty = np.where(c_optimistic, _buy_quantity(wealth, cash, perc, limit),
+                     _sell_quantity(wealth, reserved, perc, limit))
+    n_qty = np.where(new_order, np.maximum(n_qty, 0), 0.)
+
+    out[_D['cancel'], traders] = np.where(is_chartist, 0, f_cancel)  # chartists cancel on an opinion change
+    out[_D['fundamental_price'], traders] = fundamental
+    out[_D['is_optimistic'], traders] = c_optimistic
+    out[_D['action_1'], traders] = np.where(is_chartist, c_action, f_action)
+    out[_D['price_1'], traders] = np.where(is_chartist, c_price, f_price)
+    out[_D['quantity_1'], traders] = np.where(is_chartist, c_qty, f_qty)
+    out[_D['action_2'], traders] = np.where(is_chartist & (n_qty > 0), np.where(c_optimistic, _BUY_LIMIT,
+                                                                                _SELL_LIMIT), 0)
+    out[_D['price_2'], traders] = limit
+    out[_D['quantity_2'], traders] = n_qty
+
+
+def _decide_blocks(state, out, positions, count, blocks, snap, seed):
+    for block in blocks:
+        traders = positions[block * BLOCK_SIZE:min((block + 1) * BLOCK_SIZE, count)]
+        decide_block(state, out, traders, snap, np.random.default_rng([seed, block]))
+
+
+def apply_decision(trader: MarketAgent, decision: np.ndarray, order_book: OrderBook):
+    """
+    Updates the trader's state, cancels and places its orders as its `step` would.
+    """
+    cancel, fundamental_price, is_optimistic, *orders = decision.tolist()
+    if isinstance(trader, ChartistAgent):
+        trader.is_optimistic = bool(is_optimistic)
+    else:
+        trader._fundamental_price = fundamental_price
+    if cancel:
+        order_book.cancel_limit_orders(trader.unique_id, CANCEL_SIDES[int(cancel)])
+    for action, price, quantity in (orders[:3], orders[3:]):
+        if action and quantity > 0:
+            order_book.place_order(trader.unique_id, MarketAction(int(action)), price, int(quantity))
+
+
+def _views(buffers: list, traders_number: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    state, out and positions arrays over the (shared) buffers.
+    """
+    return (np.frombuffer(buffers[0], dtype=np.float64).reshape(len(STATE), traders_number),
+            np.frombuffer(buffers[1], dtype=np.float64).reshape(len(DECISION), traders_number),
+            np.frombuffer(buffers[2], dtype=np.int64))
+
+
+def _decision_worker(conn, buffers: list, traders_number: int):
+    state, out, positions = _views(buffers, traders_number)
+    while True:
+        task = conn.recv()
+        if task is None:
+            conn.close()
+            return
+        try:
+            _decide_blocks(state, out, positions, *task)
+            conn.send(None)
+        except Exception as error:
+            conn.send(error)
+
+
+def _close_workers(workers):
+    for process, conn in workers:
+        try:
+            conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        process.join(timeout=5)
+        if process.is_alive():
+            process.terminate()
+
+
+class DecisionPool:
+    """
+    Decision phase of the traders. `state` and `out` are (column, trader) arrays, in shared memory when
+    `workers` > 1: worker processes decide disjoint blocks of traders and write their orders in place.
+    Each block draws from its own stream (seed, block), so orders don't depend on the number of workers.
+    """
+
+    def __init__(self, traders: tuple, workers: int = 1):
+        self.traders = traders
+        self.workers = max(int(workers), 1)
+        size = len(traders)
+        self.__workers = []
+        if self.workers > 1:
+            ctx = get_context()
+            buffers = [ctx.RawArray('d', len(STATE) * size), ctx.RawArray('d', len(DECISION) * size),
+                       ctx.RawArray('q', size)]
+            for _ in range(self.workers):
+                parent_conn, child_conn = ctx.Pipe()
+                process = ctx.Process(target=_decision_worker, args=(child_conn, buffers, size), daemon=True)
+                process.start()
+                self.__workers.append((process, parent_conn))
+        else:
+            buffers = [bytearray(8 * len(STATE) * size), bytearray(8 * len(DECISION) * size), bytearray(8 * size)]
+        self.state, self.out, self.positions = _views(buffers, size)
+        self.__finalizer = weakref.finalize(self, _close_workers, self.__workers)
+        for idx, trader in enumerate(traders):
+            if isinstance(trader, ChartistAgent):
+                self.state[_S['is_chartist'], idx] = 1
+                self.state[_S['take_profit'], idx] = trader.take_profit
+            else:
+                self.state[_S['chi_market'], idx] = trader._chi_market
+                self.state[_S['chi_opinion'], idx] = trader._chi_opinion
+            self.state[_S['order_amount_perc'], idx] = trader.order_amount_perc
+
+    def __gather(self, positions: np.ndarray):
+        state = self.state
+        cash, assets, reserved = state[_S['cash']], state[_S['assets']], state[_S['cash_reserved']]
+        traders = self.traders
+        for idx in positions.tolist():
+            trader = traders[idx]
+            cash[idx] = trader.cash
+            assets[idx] = trader.assets_quantity
+            reserved[idx] = trader._cash_reserved
+            if isinstance(trader, ChartistAgent):
+                state[_S['is_optimistic'], idx] = trader.is_optimistic
+                state[_S['avg_opened_price'], idx] = trader.avg_opened_price
+            else:
+                state[_S['fundamental_price'], idx] = trader._fundamental_price
+
+    def decide(self, positions: np.ndarray, snap: dict, seed: int) -> np.ndarray:
+        """
+        Decides for the traders at `positions` and returns the `out` array.
+        """
+        count = len(positions)
+        self.positions[:count] = positions
+        self.__gather(positions)
+        blocks = range((count + BLOCK_SIZE - 1) // BLOCK_SIZE)
+        if not self.__workers:
+            _decide_blocks(self.state, self.out, self.positions, count, blocks, snap, seed)
+            return self.out
+        for shard, (_, conn) in enumerate(self.__workers):
+            conn.send((count, blocks[shard::self.workers], snap, seed))
+        errors = [conn.recv() for _, conn in self.__workers]
+        for error in errors:
+            if error is not None:
+                raise RuntimeError(f'Decision worker failed: {error!r}') from error
+        return self.out
+
+    def close(self):
+        self.__finalizer()
+        self.__workers = []
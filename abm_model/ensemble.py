@@ -0,0 +1,299 @@
+import numpy as np
+
+import config
+from abm_model.chartist import ChartistAgent
+from abm_model.fundamentalist import FundamentalistAgent
+from abm_model.market_agent import MarketAgent
+from abm_model.market_maker import MarketMaker
+from abm_model.market_model import BOOL_REPORTERS, MODEL_REPORTERS
+from abm_model.news import NewsAgent
+from abm_model.scheduler import MarketScheduler
+
+logger = config.get_logger(__name__)
+
+
+def _round_to_tick(price: np.ndarray, tick_size: float) -> np.ndarray:
+    return np.maximum(np.round(np.round(price / tick_size) * tick_size, 4), 1e-10)
+
+
+def _sorted_rows(prices: np.ndarray, qty: np.ndarray, offsets: np.ndarray):
+    order = np.argsort(prices, axis=1)
+    prices = np.take_along_axis(prices, order, axis=1)
+    qty = np.take_along_axis(qty, order, axis=1)
+    cum_qty = np.concatenate([np.zeros((len(prices), 1)), np.cumsum(qty, axis=1)], axis=1)
+    return (prices + offsets[:, None]).ravel(), cum_qty
+
+
+def batch_clear(bid_p: np.ndarray, bid_q: np.ndarray, ask_p: np.ndarray, ask_q: np.ndarray, last_price: np.ndarray):
+    """
+    Uniform-price call auction in every replica at once.
+    bid_p, bid_q: (R, B) bid prices and quantities, ask_p, ask_q: (R, A), quantity 0 means no order.
+    The clearing price maximizes matched volume, ties go to the price closest to `last_price`.
+    Returns clearing price (nan where nothing is matched), volume, and per-order fills of bids and asks.
+    The matched volume is filled by price priority, orders at the last filled price level pro rata.
+    """
+    replicas, n_bids = bid_p.shape
+    n_asks = ask_p.shape[1]
+    # shifting every replica into its own price band makes one 1-D searchsorted serve all rows
+    band = 2. * max(bid_p.max(initial=0), ask_p.max(initial=0)) + 1.
+    offsets = np.arange(replicas) * band
+    flat_bids, bid_cum = _sorted_rows(bid_p, bid_q, offsets)
+    flat_asks, ask_cum = _sorted_rows(ask_p, ask_q, offsets)
+
+    candidates = np.concatenate([np.where(bid_q > 0, bid_p, np.nan), np.where(ask_q > 0, ask_p, np.nan)], axis=1)
+    shifted = np.nan_to_num(candidates, nan=0.) + offsets[:, None]
+    rows = np.arange(replicas)[:, None]
+    bid_idx = np.searchsorted(flat_bids, shifted, side='left') - rows * n_bids
+    ask_idx = np.searchsorted(flat_asks, shifted, side='right') - rows * n_asks
+    demand = bid_cum[:, -1:] - np.take_along_axis(bid_cum, np.clip(bid_idx, 0, n_bids), axis=1)
+    supply = np.take_along_axis(ask_cum, np.clip(ask_idx, 0, n_asks), axis=1)
+    volume = np.where(np.isnan(candidates), -1., np.minimum(demand, supply))
+
+    max_volume = volume.max(axis=1, keepdims=True)
+    distance = np.where(volume == max_volume, np.abs(candidates - last_price[:, None]), np.inf)
+    best = np.argmin(distance, axis=1)
+    price = candidates[np.arange(replicas), best]
+    matched = np.maximum(max_volume[:, 0], 0.)
+    price = np.where(matched > 0, price, np.nan)
+
+    def fills(order_p, order_q, flat, cum, bids: bool):
+        # quantity of strictly better orders and of the order's price level, matched volume goes by price priority
+        shifted = order_p + offsets[:, None]
+        n_orders = order_p.shape[1]
+        left = np.searchsorted(flat, shifted, side='left') - rows * n_orders
+        right = np.searchsorted(flat, shifted, side='right') - rows * n_orders
+        level_qty = np.take_along_axis(cum, right, axis=1) - np.take_along_axis(cum, left, axis=1)
+        ahead = cum[:, -1:] - np.take_along_axis(cum, right, axis=1) if bids else np.take_along_axis(cum, left, axis=1)
+        level_fill = np.clip(matched[:, None] - ahead, 0., level_qty)
+        ratio = np.divide(level_fill, level_qty, out=np.zeros_like(level_fill), where=level_qty > 0)
+        return np.where(np.isnan(price)[:, None], 0., order_q * ratio)
+
+    bid_fill = fills(bid_p, bid_q, flat_bids, bid_cum, bids=True)
+    ask_fill = fills(ask_p, ask_q, flat_asks, ask_cum, bids=False)
+    return price, matched, bid_fill, ask_fill
+
+
+class EnsembleModel:
+    """
+    Runs `replicas` independent markets in lockstep, all agent state kept in (R x N) arrays.
+    Agent rules follow `FundamentalistAgent`, `ChartistAgent`, `MarketMaker` and `NewsAgent`
+    and take their class attributes, but simplified to be vectorizable:
+    - the book is cleared once per step by a call auction (`batch_clear`), orders don't rest between steps;
+    - market orders are limit orders at the market maker's opposite quote;
+    - fills can be fractional, chartists have no take-profit orders.
+    So trajectories are statistically comparable with `MarketModel`, not identical.
+    Reporter columns are the same as `MarketModel.datacollector` model reporters.
+    """
+
+    def __init__(
+            self,
+            *,
+            replicas: int,
+            fundamentalists_number: int,
+            chartists_number: int,
+            steps_number: int,
+            initial_market_price: float = 100.,
+            tick_size: float = 0.05,
+            seed: int | None = None,
+    ):
+        if steps_number <= 0:
+            raise ValueError(f"`steps_number` must be >0. Got {str(steps_number)}")
+        self.replicas = int(replicas)
+        self.steps_number = int(steps_number)
+        self.tick_size = float(tick_size)
+        self.RNG = np.random.default_rng(seed if seed else config.RANDOM_SEED)
+        self.steps = 0
+        r, nf, nc = self.replicas, int(fundamentalists_number), int(chartists_number)
+        self.fundamentalists_number, self.chartists_number = nf, nc
+
+        self.prices = np.empty((self.steps_number + 1, r))
+        self.prices[0] = initial_market_price
+        self.best_bid = np.zeros(r)
+        self.best_ask = np.zeros(r)
+        self.transactions = np.zeros(r)
+        self.volume = np.zeros(r)
+
+        fa, ca, mm = FundamentalistAgent, ChartistAgent, MarketMaker
+        self.f_cash = self.RNG.lognormal(*fa.cash_distr, (r, nf)) * fa.cash_scale
+        self.f_assets = np.zeros((r, nf))
+        self.f_fundamental = self.RNG.uniform(initial_market_price * (1 - fa.fundamental_price_spread),
+                                              initial_market_price * (1 + fa.fundamental_price_spread), (r, nf))
+        self.f_chi_market = self.RNG.uniform(*fa.chi_market_range, (r, nf))
+        self.f_chi_opinion = self.RNG.uniform(*fa.chi_opinion_range, (r, nf))
+        self.f_amount = self.RNG.uniform(*fa.order_amount_range, (r, nf))
+
+        self.c_cash = self.RNG.lognormal(*ca.cash_distr, (r, nc)) * ca.cash_scale
+        self.c_assets = np.zeros((r, nc))
+        self.c_optimistic = self.RNG.random((r, nc)) < ca.optimistic_ratio
+        self.c_amount = self.RNG.uniform(*ca.order_amount_range, (r, nc))
+
+        self.mm_cash = np.full(r, 200000.)
+        self.mm_assets = np.full(r, 2000.)
+        self.mm_inventory_max = int(2000 * mm.inventory_max_coef)
+        self.mm_inventory_min = int(2000 * mm.inventory_min_coef)
+        self.mm_base_spread, self.mm_max_spread = 0.02, 0.05
+
+        self.news_lambda = MarketScheduler.news_lambda
+        self.news_step = np.round(self.RNG.exponential(1 / self.news_lambda, r))
+        self.news_value = np.zeros(r)
+        self.news_occurred = np.zeros(r, dtype=bool)
+
+        self.model_vars = {column: np.empty((self.steps_number + 1, r),
+                                            dtype=bool if column in BOOL_REPORTERS else float)
+                           for column in MODEL_REPORTERS}
+        self._collect()
+
+    @property
+    def price(self) -> np.ndarray:
+        return self.prices[self.steps]
+
+    def _collect(self):
+        price = self.price
+        f_wealth = self.f_cash + self.f_assets * price[:, None]
+        c_wealth = self.c_cash + self.c_assets * price[:, None]
+        columns = {
+            'Price': price,
+            'Transactions': self.transactions,
+            'Volume': self.volume,
+            'Best bid price': self.best_bid,
+            'Best ask price': self.best_ask,
+            'MM total wealth': self.mm_cash + self.mm_assets * price,
+            'MM total cash': self.mm_cash,
+            'MM total assets': self.mm_assets,
+            'Positive news occurred': self.news_occurred & (self.news_value > 0),
+            'Negative news occurred': self.news_occurred & (self.news_value < 0),
+            'Fundamentalists total wealth': f_wealth.sum(axis=1),
+            'Fundamentalists total cash': self.f_cash.sum(axis=1),
+            'Fundamentalists total assets': self.f_assets.sum(axis=1),
+            'Optimists': self.c_optimistic.sum(axis=1),
+            'Chartists total wealth': c_wealth.sum(axis=1),
+            'Chartists total cash': self.c_cash.sum(axis=1),
+            'Chartists total assets': self.c_assets.sum(axis=1),
+        }
+        for column, values in columns.items():
+            self.model_vars[column][self.steps] = values
+
+    def _news(self):
+        self.news_occurred = self.news_step == self.steps
+        values = self.RNG.normal(NewsAgent.mean, NewsAgent.variance, self.replicas)
+        self.news_value = np.where(self.news_occurred, values, self.news_value)
+        next_step = self.steps + np.ceil(self.RNG.exponential(1 / self.news_lambda, self.replicas))
+        self.news_step = np.where(self.news_occurred, next_step, self.news_step)
+
+    def _mm_quotes(self, price: np.ndarray):
+        coeff = np.where(self.news_occurred, np.where(self.news_value > 0, 1.005, 0.995), 1.)
+        spread_coeff = np.where(self.news_occurred, np.where(self.news_value > 0, 0.95, 1.05), 1.)
+        high, low = self.mm_assets >= self.mm_inventory_max, self.mm_assets <= self.mm_inventory_min
+        spread = np.where(high, self.mm_max_spread, np.where(low, self.mm_base_spread * 0.95, self.mm_base_spread))
+        spread = spread * spread_coeff
+        buy_amount = self.mm_cash * np.where(high, 0.3, np.where(low, 0.8, 0.5))
+        sell_qty = np.where(high, self.mm_assets - (self.mm_inventory_min + self.mm_inventory_max) // 2,
+                            np.where(low, self.mm_assets // 3, self.mm_assets // 2))
+        bid = _round_to_tick(price * (1 - spread / 2) * coeff, self.tick_size)
+        ask = _round_to_tick(price * (1 + spread / 2) * coeff, self.tick_size)
+        return bid, np.maximum(buy_amount // bid, 0), ask, np.maximum(sell_qty, 0)
+
+    def _limit_prices(self, price: np.ndarray, shape: tuple) -> np.ndarray:
+        return _round_to_tick(self.RNG.laplace(price[:, None], 1 / MarketAgent.lambda_limit, shape), self.tick_size)
+
+    @staticmethod
+    def _order_qty(cash, assets, amount, price, buy):
+        wealth = cash + assets * price
+        qty = np.where(buy, np.minimum(wealth * amount, cash), np.minimum(wealth * amount, wealth * 0.95)) // price
+        qty = np.where((qty == 0) & (np.where(buy, cash, wealth * 0.95) >= price), 1, qty)
+        return np.where(wealth > 0, np.maximum(qty, 0), 0)
+
+    def _fundamentalists_orders(self, price, mm_bid, mm_ask):
+        fa = FundamentalistAgent
+        shocks = self.RNG.normal(self.news_value[:, None], fa.fundamental_price_variance, self.f_fundamental.shape)
+        fundamental = self.f_fundamental + np.where(self.news_occurred[:, None], shocks, 0.)
+        market = price[:, None]
+        too_far = self.f_chi_opinion < np.abs(1 - fundamental / market)
+        herded = np.where(fundamental >= market, market * (1 + self.f_chi_opinion), market * (1 - self.f_chi_opinion))
+        self.f_fundamental = np.where(too_far, herded, fundamental)
+
+        buy = self.f_fundamental > market
+        aggressive = np.abs(self.f_fundamental / market - 1) > self.f_chi_market
+        order_p = np.where(aggressive, np.where(buy, mm_ask[:, None], mm_bid[:, None]),
+                           self._limit_prices(price, self.f_fundamental.shape))
+        order_q = self._order_qty(self.f_cash, self.f_assets, self.f_amount, order_p, buy)
+        order_q = order_q + np.where(buy, np.maximum(-self.f_assets, 0), np.maximum(self.f_assets, 0))
+        order_q = np.where(self.f_fundamental == market, 0, order_q)
+        return buy, order_p, order_q
+
+    def _chartists_orders(self, price):
+        ca = ChartistAgent
+        agents_number = self.fundamentalists_number + self.chartists_number
+        optimists = self.c_optimistic.sum(axis=1)
+        majority = (2 * optimists - self.chartists_number) / max(self.chartists_number, 1)
+        prev = self.prices[self.steps - 1] if self.steps > 0 else price
+        trend = np.where(self.steps > 0, (price - prev) / prev, 0.0001)
+        opinion = ca.majority_importance * majority + ca.price_trend_importance * trend / ca.revaluation_freq
+        change_proba = ca.revaluation_freq * (self.chartists_number / agents_number) * np.exp(
+            opinion[:, None] * np.where(self.c_optimistic, 1, -1))
+        flip = self.RNG.random(self.c_optimistic.shape) < np.minimum(change_proba, 1.)
+        self.c_optimistic = self.c_optimistic ^ flip
+
+        buy = self.c_optimistic
+        order_p = self._limit_prices(price, buy.shape)
+        order_q = self._order_qty(self.c_cash, self.c_assets, self.c_amount, order_p, buy)
+        order_q = order_q + np.where(buy, np.maximum(-self.c_assets, 0), np.maximum(self.c_assets, 0))
+        return buy, order_p, order_q
+
+    def step(self):
+        price = self.price
+        self._news()
+        mm_bid, mm_bid_q, mm_ask, mm_ask_q = self._mm_quotes(price)
+        f_buy, f_p, f_q = self._fundamentalists_orders(price, mm_bid, mm_ask)
+        c_buy, c_p, c_q = self._chartists_orders(price)
+
+        # columns: market maker, fundamentalists, chartists
+        buy = np.concatenate([np.ones((self.replicas, 1), bool), f_buy, c_buy], axis=1)
+        sell = np.concatenate([np.ones((self.replicas, 1), bool), ~f_buy, ~c_buy], axis=1)
+        order_p = np.concatenate([mm_bid[:, None], f_p, c_p], axis=1)
+        order_q = np.concatenate([mm_bid_q[:, None], f_q, c_q], axis=1)
+        ask_p = np.concatenate([mm_ask[:, None], f_p, c_p], axis=1)
+        ask_q = np.concatenate([mm_ask_q[:, None], f_q, c_q], axis=1)
+        bid_q, ask_q = np.where(buy, order_q, 0.), np.where(sell, ask_q, 0.)
+        bid_q[:, 0], ask_q[:, 0] = mm_bid_q, mm_ask_q
+
+        clearing, volume, bid_fill, ask_fill = batch_clear(order_p, bid_q, ask_p, ask_q, price)
+        settle_price = np.nan_to_num(clearing)[:, None]
+        delta_assets = bid_fill - ask_fill
+        delta_cash = -delta_assets * settle_price
+        nf = self.fundamentalists_number
+        self.mm_assets += delta_assets[:, 0]
+        self.mm_cash += delta_cash[:, 0]
+        self.f_assets += delta_assets[:, 1:nf + 1]
+        self.f_cash += delta_cash[:, 1:nf + 1]
+        self.c_assets += delta_assets[:, nf + 1:]
+        self.c_cash += delta_cash[:, nf + 1:]
+
+        rest_bid = np.where(bid_q - bid_fill > 1e-9, order_p, 0.)
+        rest_ask = np.where(ask_q - ask_fill > 1e-9, ask_p, np.inf)
+        self.best_bid = rest_bid.max(axis=1)
+        self.best_ask = np.where(np.isinf(rest_ask.min(axis=1)), 0., rest_ask.min(axis=1))
+        self.transactions = np.maximum((bid_fill > 0).sum(axis=1), (ask_fill > 0).sum(axis=1))
+        self.volume = volume
+
+        mid = np.where((self.best_bid > 0) & (self.best_ask > 0), 0.5 * (self.best_bid + self.best_ask), np.nan)
+        new_price = np.where(np.isnan(mid), np.where(np.isnan(clearing), price, clearing), mid)
+        self.steps += 1
+        self.prices[self.steps] = np.round(new_price, 4)
+        self._collect()
+
+    def run_model(self) -> None:
+        while self.steps < self.steps_number:
+            self.step()
+
+    def get_model_vars_dataframe(self, replica: int | None = None):
+        """
+        All replicas indexed by (Replica, Step), or one replica indexed by step like `MarketModel`.
+        """
+        import pandas as pd
+
+        if replica is not None:
+            return pd.DataFrame({column: values[:, replica] for column, values in self.model_vars.items()})
+        steps = self.steps_number + 1
+        index = pd.MultiIndex.from_product([range(self.replicas), range(steps)], names=['Replica', 'Step'])
+        return pd.DataFrame({column: values.T.ravel() for column, values in self.model_vars.items()}, index=index)
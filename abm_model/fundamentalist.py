@@ -20,17 +20,27 @@ class FundamentalistAgent(MarketAgent):
     fundamental_price_variance: float = 0.2
     order_amount_range: list[float] = [0.025, 0.10]
 
-    def __init__(self, unique_id: int, model: Model, cash: float | None = None, assets_quantity: int | None = None):
+    def __init__(self, unique_id: int, model: Model, cash: float | None = None, assets_quantity: int | None = None,
+                 fundamental_price: float | None = None, chi_market: float | None = None,
+                 chi_opinion: float | None = None, order_amount_perc: float | None = None):
+        """
+        Parameters which are not given are drawn from `RNG`, see `abm_model.population` for templates.
+        """
         cls = type(self)
         cash = cls.RNG.lognormal(*cls.cash_distr) * cls.cash_scale if not cash else cash
         super().__init__(unique_id=unique_id, model=model, cash=cash, assets_quantity=assets_quantity)
         self._fundamental_price = cls.RNG.uniform(
             low=self.model.prices[-1] * (1 - cls.fundamental_price_spread),
             high=self.model.prices[-1] * (1 + cls.fundamental_price_spread),
-        )
-        self._chi_market = cls.RNG.uniform(*cls.chi_market_range)
-        self._chi_opinion = cls.RNG.uniform(*cls.chi_opinion_range)
-        self.__order_amount_perc = cls.RNG.uniform(*cls.order_amount_range)
+        ) if fundamental_price is None else fundamental_price
+        self._chi_market = cls.RNG.uniform(*cls.chi_market_range) if chi_market is None else chi_market
+        self._chi_opinion = cls.RNG.uniform(*cls.chi_opinion_range) if chi_opinion is None else chi_opinion
+        self.__order_amount_perc = (cls.RNG.uniform(*cls.order_amount_range) if order_amount_perc is None
+                                    else order_amount_perc)
+
+    @property
+    def order_amount_perc(self) -> float:
+        return self.__order_amount_perc
 
     def _calc_fundamental_price(self) -> float:
         """
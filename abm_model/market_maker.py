@@ -2,6 +2,7 @@ from mesa import Model
 
 from config import get_logger
 from abm_model.market_agent import MarketAgent
+from abm_model.quoting import QuoteLadder
 from abm_model.utils import round_to_tick
 from utils.models import MarketAction
 from utils.order_book import OrderBook
@@ -12,6 +13,9 @@ logger = get_logger(__name__)
 class MarketMaker(MarketAgent):
     inventory_max_coef: float = 1.5
     inventory_min_coef: float = 0.5
+    quote_levels: int = 1
+    level_ticks: int = 1
+    incremental_quotes: bool = False
 
     def __init__(
             self,
@@ -35,6 +39,7 @@ class MarketMaker(MarketAgent):
             self._max_spread = max(max_spread, self._base_spread + 0.05)
         self._inventory_max = int(assets_quantity * (inventory_max_coef if inventory_max_coef else cls.inventory_max_coef))
         self._inventory_min = int(assets_quantity * (inventory_min_coef if inventory_min_coef else cls.inventory_min_coef))
+        self._quotes = QuoteLadder(model.order_book, unique_id)
 
     @property
     def news_price_coeff(self) -> float:
@@ -85,27 +90,60 @@ class MarketMaker(MarketAgent):
         else:
             return int(self.assets_quantity // 2)
 
+    def _desired_quotes(self, current_price: float) -> dict[tuple[MarketAction, int], tuple[float, int]]:
+        """
+        Quote ladder: `quote_levels` levels per side, `level_ticks` ticks apart, the quantity is split evenly
+        and the remainder goes to the top level.
+        """
+        cls = type(self)
+        tick_size = self.model.tick_size
+        levels = max(int(cls.quote_levels), 1)
+        quotes = {}
+
+        buy_price = round_to_tick(current_price * (1 - self.spread / 2) * self.news_price_coeff, tick_size)
+        buy_qty = int(self.buy_amount // buy_price if self.buy_amount > buy_price else self.cash // buy_price)
+        for level in range(levels):
+            qty = buy_qty // levels + (buy_qty % levels if level == 0 else 0)
+            price = round_to_tick(buy_price - level * cls.level_ticks * tick_size, tick_size) if level else buy_price
+            if qty > 0 and (level == 0 or price > tick_size / 2):
+                quotes[(MarketAction.BUY_LIMIT, level)] = (price, qty)
+
+        sell_qty = self.sell_quantity
+        if sell_qty > 0:
+            sell_price = round_to_tick(current_price * (1 + self.spread / 2) * self.news_price_coeff, tick_size)
+            for level in range(levels):
+                qty = sell_qty // levels + (sell_qty % levels if level == 0 else 0)
+                price = round_to_tick(sell_price + level * cls.level_ticks * tick_size, tick_size) if level else sell_price
+                if qty > 0:
+                    quotes[(MarketAction.SELL_LIMIT, level)] = (price, qty)
+        return quotes
+
     def step(self):
+        """
+        Cancels its quotes and posts new ones, or with `incremental_quotes` only requotes changed levels
+        (the reference price then ignores its own resting quotes, as if they were cancelled).
+        """
         order_book: OrderBook = self.model.order_book
-        order_book.cancel_limit_orders(self.unique_id)
-        current_price = self.model.prices[-1] if not order_book.get_central_price() else order_book.get_central_price()
+        incremental = type(self).incremental_quotes
+        if not incremental:
+            order_book.cancel_limit_orders(self.unique_id)
+        exclude = self.unique_id if incremental else None
+        central_price = order_book.get_central_price(exclude)
+        current_price = self.model.prices[-1] if not central_price else central_price
 
-        best_bid = order_book.get_best_bid()
+        best_bid = order_book.get_best_bid(exclude)
         if (self.wealth * 0.1 > self.cash or self.assets_quantity > self._inventory_max) and best_bid:
             market_qty = max((self.wealth * 0.1 - self.cash) // best_bid.price, best_bid.quantity)
             order_book.place_order(self.unique_id, MarketAction.SELL, best_bid.price, market_qty)
 
-        best_ask = order_book.get_best_ask()
+        best_ask = order_book.get_best_ask(exclude)
         if self._inventory_min * 0.1 > self.assets_quantity and best_ask:
             market_qty = max(self._inventory_min * 0.1 - self.assets_quantity, best_ask.quantity)
             order_book.place_order(self.unique_id, MarketAction.BUY, best_ask.price, market_qty)
 
-        buy_price = round_to_tick(current_price * (1 - self.spread / 2) * self.news_price_coeff, self.model.tick_size)
-        buy_qty = self.buy_amount // buy_price if self.buy_amount > buy_price else self.cash // buy_price
-        if buy_qty > 0:
-            order_book.place_order(self.unique_id, MarketAction.BUY_LIMIT, buy_price, int(buy_qty))
-
-        if self.sell_quantity > 0:
-            sell_price = round_to_tick(current_price * (1 + self.spread / 2) * self.news_price_coeff,
-                                       self.model.tick_size)
-            order_book.place_order(self.unique_id, MarketAction.SELL_LIMIT, sell_price, self.sell_quantity)
+        quotes = self._desired_quotes(current_price)
+        if incremental:
+            self._quotes.update(quotes)
+            return
+        for (action, _), (price, qty) in quotes.items():
+            order_book.place_order(self.unique_id, action, price, qty)
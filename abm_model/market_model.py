@@ -8,22 +8,81 @@ from abm_model.fundamentalist import FundamentalistAgent
 from abm_model.market_agent import MarketAgent
 from abm_model.market_maker import MarketMaker
 from abm_model.news import NewsAgent
+from abm_model.online_metrics import OnlineMetrics
+from abm_model.population import get_population
+from abm_model.profiling import StepProfiler
 from abm_model.scheduler import MarketScheduler
+from abm_model.shocks import ShockPaths
 from utils.order_book import OrderBook
+from utils.price_history import PriceHistory
+from utils.trade_tape import TradeTape
 
 logger = config.get_logger(__name__)
 
 
-def _agents_factory(model: Model, agent_type: type[Agent], agents_number: int, class_config: dict | None = None):
-    class_config = class_config or {}
-    for attr, value in class_config.items():
-        setattr(agent_type, attr, value)
-    for _ in range(agents_number):
+# columns of `MarketModel.datacollector` model reporters, without profiling ones
+MODEL_REPORTERS = [
+    'Price', 'Transactions', 'Volume', 'Best bid price', 'Best ask price',
+    'MM total wealth', 'MM total cash', 'MM total assets',
+    'Positive news occurred', 'Negative news occurred',
+    'Fundamentalists total wealth', 'Fundamentalists total cash', 'Fundamentalists total assets',
+    'Optimists', 'Chartists total wealth', 'Chartists total cash', 'Chartists total assets',
+]
+BOOL_REPORTERS = ['Positive news occurred', 'Negative news occurred']
+
+_MISSING = object()
+_class_overrides: dict[tuple[type, str], object] = {}
+
+
+def reset_class_config():
+    """
+    Undoes the `*_config` overrides of the last model, the classes are back to their defaults.
+    """
+    for (cls, attr), value in _class_overrides.items():
+        if value is _MISSING:
+            delattr(cls, attr)
+        else:
+            setattr(cls, attr, value)
+    _class_overrides.clear()
+
+
+def _apply_class_config(class_configs: dict[type, dict | None]):
+    """
+    `*_config` kwargs are set as class attributes. The previous model's overrides are undone first,
+    so a run never inherits the configuration of an earlier one.
+    """
+    reset_class_config()
+    for cls, class_config in class_configs.items():
+        for attr, value in (class_config or {}).items():
+            _class_overrides.setdefault((cls, attr), cls.__dict__.get(attr, _MISSING))
+            setattr(cls, attr, value)
+
+
+def class_defaults(cls: type) -> dict:
+    """
+    Class attributes with the `*_config` overrides of the last model undone.
+    """
+    attrs = dict(vars(cls))
+    for (override_cls, attr), value in _class_overrides.items():
+        if override_cls is not cls: continue
+        if value is _MISSING:
+            attrs.pop(attr, None)
+        else:
+            attrs[attr] = value
+    return attrs
+
+
+def _agents_factory(model: Model, agent_type: type[Agent], agents_number: int, params: dict[str, list] | None = None):
+    """
+    params: constructor kwargs, a list of `agents_number` values per name (see `abm_model.population`)
+    """
+    for idx in range(agents_number):
+        kwargs = {name: values[idx] for name, values in params.items()} if params else {}
         match agent_type.__name__:
             case 'FundamentalistAgent':
-                agent = FundamentalistAgent(unique_id=model.next_id(), model=model)
+                agent = FundamentalistAgent(unique_id=model.next_id(), model=model, **kwargs)
             case 'ChartistAgent':
-                agent = ChartistAgent(unique_id=model.next_id(), model=model)
+                agent = ChartistAgent(unique_id=model.next_id(), model=model, **kwargs)
             case 'MarketMaker':
                 agent = MarketMaker(unique_id=model.next_id(), model=model)
             case 'NewsAgent':
@@ -35,7 +94,7 @@ def _agents_factory(model: Model, agent_type: type[Agent], agents_number: int, c
 
 
 def get_type_attr_ttl(model: Model, agent_type: MarketAgent, attr: str):
-    return round(sum(model.get_agents_of_type(agent_type).get(attr)), 2)
+    return round(sum(getattr(agent, attr) for agent in model.schedule.agents_of_type(agent_type)), 2)
 
 
 def get_best_order(model: Model, side: str):
@@ -61,23 +120,67 @@ class MarketModel(Model):
             tick_size: float = 0.05,
             fundamentalists_config: dict | None = None,
             chartists_config: dict | None = None,
+            scheduler_config: dict | None = None,
+            market_makers_number: int = 1,
+            market_maker_config: dict | None = None,
+            collect_data: bool = True,
+            extended_metrics: bool = False,
+            price_window: int | None = None,
+            price_spill_path: str | None = None,
+            profile: bool = False,
+            trade_tape: bool = False,
+            population: str | None = 'exact',
+            decision_workers: int | None = None,
+            decision_batch: int | None = None,
+            shocks: ShockPaths | None = None,
     ):
+        """
+        market_makers_number: each market maker quotes its own ladder (see `MarketMaker.quote_levels`)
+        collect_data: if False, DataCollector is skipped and only `model.metrics` is maintained
+        extended_metrics: also track returns autocorrelation, kurtosis and volatility clustering in `model.metrics`
+        price_window: keep only the last `price_window` prices in memory (see `PriceHistory`)
+        price_spill_path: with `price_window`, write the full price series to this .npy memory-mapped file
+        profile: per-step timers and counters of the scheduler and the order book, reported as `Profile: *` columns
+        population: traders' initial parameters come from a cached `PopulationTemplate`, 'exact' reproduces
+            the one-by-one construction, 'bulk' draws them as arrays. None constructs them one by one
+        trade_tape: record every fill and per-step OHLC, VWAP and signed order flow in `model.trade_tape`
+        decision_workers, decision_batch: traders decide in parallel on a market snapshot (see `MarketScheduler`),
+            None keeps the sequential agent steps
+        shocks: common news and trader orders shared by runs of one seed, see `abm_model.shocks.generate_shocks`
+        """
         logger.info('Initializing model.')
         super().__init__()
         self.running = True
         if steps_number <= 0:
             raise ValueError(f"`steps_number` must be >0. Got {str(steps_number)}")
         self.__steps_number = int(steps_number)
-        self.schedule = MarketScheduler(self)
+        if shocks is not None and len(shocks.news) < self.__steps_number:
+            raise ValueError(f"`shocks` cover {len(shocks.news)} steps, the model runs {self.__steps_number}.")
+        if market_makers_number < 1:
+            raise ValueError(f"`market_makers_number` must be >=1. Got {str(market_makers_number)}")
+        _apply_class_config({
+            MarketScheduler: scheduler_config,
+            MarketMaker: market_maker_config,
+            FundamentalistAgent: fundamentalists_config,
+            ChartistAgent: chartists_config,
+        })
+        self.schedule = MarketScheduler(self, profiler=StepProfiler() if profile else None,
+                                        decision_workers=decision_workers, decision_batch=decision_batch,
+                                        shocks=shocks)
         self.order_book = OrderBook()
 
-        self.prices = [initial_market_price]
+        self.prices = PriceHistory(initial_market_price, capacity=self.__steps_number + 1, window=price_window,
+                                   spill_path=price_spill_path)
+        self.trade_tape = TradeTape(steps=self.__steps_number) if trade_tape else None
+        self.market_makers_number = int(market_makers_number)
         self._optimistic_chartists_number = 0
         self.completed_transactions = 0
         self.traded_qty = 0
         self.tick_size = float(tick_size)
         self._news_event_value: float = 0.
         self.news_event_occurred = False
+        self.collect_data = collect_data
+        self.metrics = OnlineMetrics(extended=extended_metrics)
 
         self.datacollector = DataCollector(
             model_reporters={
@@ -100,6 +203,7 @@ class MarketModel(Model):
                 'Chartists total wealth': partial(get_type_attr_ttl, agent_type=ChartistAgent, attr='wealth'),
                 'Chartists total cash': partial(get_type_attr_ttl, agent_type=ChartistAgent, attr='cash'),
                 'Chartists total assets': partial(get_type_attr_ttl, agent_type=ChartistAgent, attr='assets_quantity'),
+                **(self.schedule.profiler.reporters() if profile else {}),
             },
             agent_reporters={
                 'Type': lambda a: type(a).__name__,
@@ -113,11 +217,14 @@ class MarketModel(Model):
         )
 
         logger.debug(f"MarketAgent seed: {MarketAgent.RNG._bit_generator.seed_seq.entropy}")
-        _agents_factory(self, MarketMaker, 1)
+        _agents_factory(self, MarketMaker, self.market_makers_number)
         _agents_factory(self, NewsAgent, 1)
-        _agents_factory(self, FundamentalistAgent, fundamentalists_number, fundamentalists_config)
-        _agents_factory(self, ChartistAgent, chartists_number, chartists_config)
+        template = (get_population(fundamentalists_number, chartists_number, initial_market_price, population)
+                    if population else None)
+        _agents_factory(self, FundamentalistAgent, fundamentalists_number, template.fundamentalists if template else None)
+        _agents_factory(self, ChartistAgent, chartists_number, template.chartists if template else None)
 
+        self.metrics.update(self)
         log_agents = {t.__name__: len(l) for t, l in self.agents_.items()}
         logger.info(f'Model initialized. Agents: {log_agents}')
 
@@ -131,7 +238,8 @@ class MarketModel(Model):
         self._news_event_value = float(value)
 
     def step(self):
-        self.datacollector.collect(self)
+        if self.collect_data:
+            self.datacollector.collect(self)
         self.schedule.step()
         if self.schedule.steps == self.__steps_number:
             self.running = False
@@ -139,4 +247,5 @@ class MarketModel(Model):
     def run_model(self) -> None:
         while self.running:
             self.step()
-        self.datacollector.collect(self)
+        if self.collect_data:
+            self.datacollector.collect(self)
@@ -0,0 +1,246 @@
+import math
+from contextlib import contextmanager
+from multiprocessing import get_context
+
+import numpy as np
+
+import config
+from abm_model.chartist import ChartistAgent
+from abm_model.fundamentalist import FundamentalistAgent
+from abm_model.market_agent import MarketAgent
+from abm_model.market_model import MarketModel
+from abm_model.news import NewsAgent
+
+logger = config.get_logger(__name__)
+
+RNG_CLASSES = [MarketAgent, FundamentalistAgent, ChartistAgent, NewsAgent]
+
+
+class _AssetRunner:
+    """
+    One asset's `MarketModel`. Agents' class RNGs are swapped for the asset's own around construction and every
+    step, so the asset's path depends neither on the other assets nor on the process that steps it.
+    """
+
+    def __init__(self, asset: int, seed: int, market_params: dict, external_news: bool):
+        self.asset = asset
+        self.rng = np.random.default_rng(seed)
+        self.news_rng = np.random.default_rng(seed + 1)
+        base_seed = config.RANDOM_SEED
+        config.RANDOM_SEED = seed  # the scheduler is seeded from config
+        try:
+            with self.__rngs():
+                self.model = MarketModel(**market_params)
+        finally:
+            config.RANDOM_SEED = base_seed
+        if external_news:
+            self.model.schedule.news_event_step = -1
+
+    @contextmanager
+    def __rngs(self):
+        saved = {cls: cls.__dict__['RNG'] for cls in RNG_CLASSES if 'RNG' in cls.__dict__}
+        for cls in saved:
+            cls.RNG = self.news_rng if cls is NewsAgent else self.rng
+        try:
+            yield
+        finally:
+            for cls, rng in saved.items():
+                cls.RNG = rng
+
+    def step(self, news: float | None = None) -> tuple[float, int, int]:
+        model = self.model
+        with self.__rngs():
+            if news is not None:
+                model.schedule.inject_news(news)
+            model.step()
+        return model.prices[-1], model.completed_transactions, model.traded_qty
+
+    def finish(self):
+        if self.model.collect_data:
+            self.model.datacollector.collect(self.model)
+
+    def accounts(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Wealth and assets of the traders in creation order, fundamentalists first.
+        """
+        traders = (list(self.model.get_agents_of_type(FundamentalistAgent))
+                   + list(self.model.get_agents_of_type(ChartistAgent)))
+        return (np.array([trader.wealth for trader in traders], dtype=np.float64),
+                np.array([trader.assets_quantity for trader in traders], dtype=np.int64))
+
+
+def _dispatch(runners: dict[int, _AssetRunner], command: str, arg=None) -> dict:
+    match command:
+        case 'step':
+            return {asset: runner.step(arg.get(asset)) for asset, runner in runners.items()}
+        case 'finish':
+            return {asset: runner.finish() for asset, runner in runners.items()}
+        case 'accounts':
+            return {asset: runner.accounts() for asset, runner in runners.items()}
+        case 'model_data':
+            return {asset: runners[asset].model.datacollector.get_model_vars_dataframe()
+                    for asset in arg if asset in runners}
+        case _:
+            raise ValueError(f'Unknown command {command}.')
+
+
+def _shard_worker(conn, seeds: dict[int, int], market_params: dict, external_news: bool):
+    try:
+        runners = {asset: _AssetRunner(asset, seed, market_params, external_news) for asset, seed in seeds.items()}
+        conn.send({asset: runner.model.schedule._news_lambda for asset, runner in runners.items()})
+    except Exception as error:
+        conn.send(error)
+        return
+    while True:
+        command, arg = conn.recv()
+        if command == 'close':
+            conn.close()
+            return
+        try:
+            conn.send(_dispatch(runners, command, arg))
+        except Exception as error:
+            conn.send(error)
+
+
+class MultiAssetModel:
+    """
+    `assets_number` markets stepped in lockstep. Each asset is a `MarketModel` built from `market_params`
+    with its own order book, prices, market maker, traders and seed. Trader j of every asset is the sub-account
+    of investor j: positions and cash are per asset, `portfolio_wealth` sums the sub-accounts.
+
+    news_correlation: None keeps every asset's own news process. Otherwise news events are market-wide, arrive
+        with `MarketScheduler.news_lambda` and their values are correlated across assets through a common factor
+    workers: >1 shards the assets over processes, each one decides and matches its assets for the step in
+        parallel. Results don't depend on the number of workers. Call `close` (or use `with`) to stop them
+    """
+
+    def __init__(self, assets_number: int, market_params: dict, seed: int | None = None,
+                 news_correlation: float | None = None, workers: int = 1):
+        if assets_number < 1:
+            raise ValueError(f"`assets_number` must be >=1. Got {str(assets_number)}")
+        if news_correlation is not None and not 0 <= news_correlation <= 1:
+            raise ValueError(f"`news_correlation` must be in [0, 1]. Got {str(news_correlation)}")
+        self.assets_number = int(assets_number)
+        self.market_params = dict(market_params)
+        self.steps_number = int(self.market_params['steps_number'])
+        self.news_correlation = news_correlation
+        self.workers = max(min(int(workers or 1), self.assets_number), 1)
+        self.steps = 0
+        self.running = True
+
+        seed = seed if seed is not None else config.RANDOM_SEED
+        children = np.random.SeedSequence(seed).spawn(self.assets_number + 1)
+        asset_seeds = {asset: int(child.generate_state(1)[0]) for asset, child in enumerate(children[:-1])}
+        self.RNG = np.random.default_rng(children[-1])
+        self.news = np.zeros((self.steps_number + 1, self.assets_number))
+
+        initial_price = float(self.market_params.get('initial_market_price', 100.))
+        self.prices = np.full((self.steps_number + 1, self.assets_number), np.nan)
+        self.prices[0] = initial_price
+        self.transactions = np.zeros((self.steps_number + 1, self.assets_number), dtype=np.int64)
+        self.volume = np.zeros((self.steps_number + 1, self.assets_number), dtype=np.int64)
+
+        external_news = news_correlation is not None
+        self.__runners: dict[int, _AssetRunner] = {}
+        self.__shards = []
+        if self.workers == 1:
+            self.__runners = {asset: _AssetRunner(asset, seed, self.market_params, external_news)
+                              for asset, seed in asset_seeds.items()}
+            news_lambdas = {asset: runner.model.schedule._news_lambda for asset, runner in self.__runners.items()}
+        else:
+            ctx = get_context()
+            for shard in range(self.workers):
+                shard_seeds = {asset: seed for asset, seed in asset_seeds.items() if asset % self.workers == shard}
+                parent_conn, child_conn = ctx.Pipe()
+                process = ctx.Process(target=_shard_worker, args=(child_conn, shard_seeds, self.market_params,
+                                                                  external_news), daemon=True)
+                process.start()
+                self.__shards.append((process, parent_conn))
+            news_lambdas = {}
+            for _, conn in self.__shards:
+                news_lambdas.update(self.__check(conn.recv()))
+        # `scheduler_config` is applied by the asset models, the rate is the same for all of them
+        self._news_lambda = float(news_lambdas[0])
+        self.news_event_step = round(self.RNG.exponential(1 / self._news_lambda))
+        logger.info(f'Multi-asset model initialized. Assets: {self.assets_number}. Workers: {self.workers}.')
+
+    @staticmethod
+    def __check(reply):
+        if isinstance(reply, BaseException):
+            raise RuntimeError(f'Asset shard failed: {reply!r}') from reply
+        return reply
+
+    def __call(self, command: str, arg=None) -> dict:
+        if not self.__shards:
+            return _dispatch(self.__runners, command, arg)
+        for _, conn in self.__shards:
+            conn.send((command, arg))
+        result = {}
+        for _, conn in self.__shards:
+            result.update(self.__check(conn.recv()))
+        return result
+
+    def __news(self) -> dict[int, float]:
+        if self.news_correlation is None or self.steps != self.news_event_step:
+            return {}
+        self.news_event_step = self.steps + math.ceil(self.RNG.exponential(1 / self._news_lambda))
+        rho = self.news_correlation
+        shocks = math.sqrt(rho) * self.RNG.normal() + math.sqrt(1 - rho) * self.RNG.normal(size=self.assets_number)
+        values = NewsAgent.mean + NewsAgent.variance * shocks
+        return dict(enumerate(values.tolist()))
+
+    def step(self):
+        news = self.__news()
+        results = self.__call('step', news)
+        self.steps += 1
+        for asset, value in news.items():
+            self.news[self.steps, asset] = value
+        for asset, (price, transactions, volume) in results.items():
+            self.prices[self.steps, asset] = price
+            self.transactions[self.steps, asset] = transactions
+            self.volume[self.steps, asset] = volume
+        if self.steps == self.steps_number:
+            self.running = False
+
+    def run_model(self):
+        while self.running:
+            self.step()
+        self.__call('finish')
+
+    def accounts(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (investor, asset) arrays of sub-account wealth and positions.
+        """
+        accounts = self.__call('accounts')
+        wealth = np.column_stack([accounts[asset][0] for asset in range(self.assets_number)])
+        positions = np.column_stack([accounts[asset][1] for asset in range(self.assets_number)])
+        return wealth, positions
+
+    def portfolio_wealth(self) -> np.ndarray:
+        return self.accounts()[0].sum(axis=1)
+
+    def model_data(self, asset: int):
+        """
+        The asset's model reporters DataFrame, `market_params` must keep `collect_data`.
+        """
+        return self.__call('model_data', [asset])[asset]
+
+    def returns(self) -> np.ndarray:
+        return np.diff(np.log(self.prices), axis=0)
+
+    def close(self):
+        for process, conn in self.__shards:
+            try:
+                conn.send(('close', None))
+            except (BrokenPipeError, OSError):
+                pass
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self.__shards = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -6,13 +6,17 @@ import config
 logger = config.get_logger(__name__)
 
 logger.debug(f'Seed: {config.RANDOM_SEED}')
-RNG = np.random.default_rng(config.RANDOM_SEED)
 
 
 class NewsAgent(Agent):
+    RNG = np.random.default_rng(config.RANDOM_SEED)
     mean = 0
     variance = 0.15
 
+    @classmethod
+    def update_rng(cls, seed: int | None = None):
+        cls.RNG = np.random.default_rng(seed if seed else config.RANDOM_SEED)
+
     def __init__(self, unique_id: int, model: Model, mean: float | None = None, variance: float | None = None):
         cls = type(self)
         super().__init__(unique_id, model)
@@ -20,5 +24,6 @@ class NewsAgent(Agent):
         self._variance = variance or cls.variance
 
     def step(self):
-        self.model.news_event_value = RNG.normal(self._mean, self._variance)
+        cls = type(self)
+        self.model.news_event_value = cls.RNG.normal(self._mean, self._variance)
         logger.debug(f'Step {self.model.schedule.steps + 1}. News event {round(self.model.news_event_value, 4)}')
@@ -0,0 +1,130 @@
+import math
+
+from mesa import Model
+
+
+class Welford:
+    """
+    Running mean and central moments (Welford/Terriberry updates), O(1) memory.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.m3 = 0.
+        self.m4 = 0.
+
+    def update(self, x: float):
+        n1 = self.n
+        self.n += 1
+        delta = x - self.mean
+        delta_n = delta / self.n
+        delta_n2 = delta_n * delta_n
+        term1 = delta * delta_n * n1
+        self.mean += delta_n
+        self.m4 += term1 * delta_n2 * (self.n * self.n - 3 * self.n + 3) + 6 * delta_n2 * self.m2 - 4 * delta_n * self.m3
+        self.m3 += term1 * delta_n * (self.n - 2) - 3 * delta_n * self.m2
+        self.m2 += term1
+
+    def variance(self, ddof: int = 1) -> float:
+        if self.n - ddof <= 0: return math.nan
+        return self.m2 / (self.n - ddof)
+
+    def std(self, ddof: int = 1) -> float:
+        return math.sqrt(self.variance(ddof))
+
+    def kurtosis(self) -> float:
+        """
+        Excess kurtosis, population estimate.
+        """
+        if self.n < 2 or self.m2 == 0: return math.nan
+        return self.n * self.m4 / (self.m2 * self.m2) - 3.
+
+
+class LagCorrelation:
+    """
+    Running Pearson correlation between x_t and x_{t-1}.
+    """
+
+    def __init__(self):
+        self.__prev: float | None = None
+        self.n = 0
+        self.mean_x = self.mean_y = 0.
+        self.m2_x = self.m2_y = 0.
+        self.co_moment = 0.
+
+    def update(self, value: float):
+        if self.__prev is not None:
+            x, y = self.__prev, value
+            self.n += 1
+            dx = x - self.mean_x
+            self.mean_x += dx / self.n
+            dy = y - self.mean_y
+            self.mean_y += dy / self.n
+            self.m2_x += dx * (x - self.mean_x)
+            self.m2_y += dy * (y - self.mean_y)
+            self.co_moment += dx * (y - self.mean_y)
+        self.__prev = value
+
+    def corr(self) -> float:
+        if self.n < 2 or self.m2_x == 0 or self.m2_y == 0: return math.nan
+        return self.co_moment / math.sqrt(self.m2_x * self.m2_y)
+
+
+class OnlineMetrics:
+    """
+    Same metrics as `experiments.mertics.calculate_metrics`, updated on every collected step
+    instead of computed from the model DataFrame after the run.
+    """
+
+    def __init__(self, extended: bool = False):
+        self.extended = extended
+        self.steps = 0
+        self.price = Welford()
+        self.spread_sum = 0.
+        self.abs_spread_sum = 0.
+        self.transactions_sum = 0
+        self.volume_sum = 0
+        self.__last_price: float | None = None
+        if self.extended:
+            self.returns = Welford()
+            self.returns_acf = LagCorrelation()
+            self.abs_returns_acf = LagCorrelation()
+
+    def update(self, model: Model):
+        price = model.prices[-1]
+        best_bid = model.order_book.get_best_bid()
+        best_ask = model.order_book.get_best_ask()
+        spread = (best_ask.price if best_ask else 0) - (best_bid.price if best_bid else 0)
+
+        self.steps += 1
+        self.price.update(price)
+        self.abs_spread_sum += spread
+        self.spread_sum += spread / price
+        self.transactions_sum += model.completed_transactions
+        self.volume_sum += model.traded_qty
+
+        if self.extended and self.__last_price:
+            ret = price / self.__last_price - 1
+            self.returns.update(ret)
+            self.returns_acf.update(ret)
+            self.abs_returns_acf.update(abs(ret))
+        self.__last_price = price
+
+    def as_dict(self, absolute: bool = False) -> dict:
+        metrics = {
+            'spread': round((self.abs_spread_sum if absolute else self.spread_sum) / self.steps, 6),
+            'price_std': round(self.price.std() / (1 if absolute else self.price.mean), 6),
+            'transactions_mean': round(self.transactions_sum / self.steps, 6),
+            'transactions_sum': int(self.transactions_sum),
+            'volume_mean': round(self.volume_sum / self.steps, 6),
+            'volume_sum': int(self.volume_sum),
+        }
+        if self.extended:
+            metrics.update(
+                returns_autocorr=round(self.returns_acf.corr(), 6),
+                returns_kurtosis=round(self.returns.kurtosis(), 6),
+                volatility_clustering=round(self.abs_returns_acf.corr(), 6),
+            )
+        return metrics
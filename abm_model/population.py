@@ -0,0 +1,128 @@
+import hashlib
+import json
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+
+from abm_model.chartist import ChartistAgent
+from abm_model.fundamentalist import FundamentalistAgent
+
+# class attributes used to draw the initial parameters
+DRAW_ATTRS = {
+    FundamentalistAgent: ['cash_distr', 'cash_scale', 'fundamental_price_spread', 'chi_market_range',
+                          'chi_opinion_range', 'order_amount_range'],
+    ChartistAgent: ['cash_distr', 'cash_scale', 'optimistic_ratio', 'take_profit_range', 'order_amount_range'],
+}
+MAX_TEMPLATES = 8
+
+_templates: OrderedDict[str, 'PopulationTemplate'] = OrderedDict()
+
+
+class PopulationTemplate(NamedTuple):
+    """
+    Initial parameters of the traders, a list per constructor kwarg, and the agents' RNG states after
+    they were drawn, so a model built from the template continues the same random stream.
+    """
+    fundamentalists: dict[str, list]
+    chartists: dict[str, list]
+    rng_states: dict[str, dict]
+
+
+def _draw_exact(fundamentalists_number: int, chartists_number: int, initial_price: float) -> tuple[dict, dict]:
+    """
+    Same draws in the same order as the agents' constructors.
+    """
+    fa, ca = FundamentalistAgent, ChartistAgent
+    fundamentalists = {name: [] for name in ['cash', 'fundamental_price', 'chi_market', 'chi_opinion',
+                                             'order_amount_perc']}
+    for _ in range(fundamentalists_number):
+        fundamentalists['cash'].append(fa.RNG.lognormal(*fa.cash_distr) * fa.cash_scale)
+        fundamentalists['fundamental_price'].append(fa.RNG.uniform(
+            low=initial_price * (1 - fa.fundamental_price_spread),
+            high=initial_price * (1 + fa.fundamental_price_spread),
+        ))
+        fundamentalists['chi_market'].append(fa.RNG.uniform(*fa.chi_market_range))
+        fundamentalists['chi_opinion'].append(fa.RNG.uniform(*fa.chi_opinion_range))
+        fundamentalists['order_amount_perc'].append(fa.RNG.uniform(*fa.order_amount_range))
+
+    chartists = {name: [] for name in ['cash', 'is_optimistic', 'take_profit', 'order_amount_perc']}
+    for _ in range(chartists_number):
+        chartists['cash'].append(ca.RNG.lognormal(*ca.cash_distr) * ca.cash_scale)
+        chartists['is_optimistic'].append(ca.RNG.choice([True, False], p=[ca.optimistic_ratio,
+                                                                          1 - ca.optimistic_ratio]))
+        chartists['take_profit'].append(ca.RNG.uniform(*ca.take_profit_range))
+        chartists['order_amount_perc'].append(ca.RNG.uniform(*ca.order_amount_range))
+    return fundamentalists, chartists
+
+
+def _draw_bulk(fundamentalists_number: int, chartists_number: int, initial_price: float) -> tuple[dict, dict]:
+    """
+    One vectorized draw per parameter. Same distributions, but not the per-agent stream of `_draw_exact`.
+    """
+    fa, ca = FundamentalistAgent, ChartistAgent
+    n = fundamentalists_number
+    fundamentalists = {
+        'cash': fa.RNG.lognormal(*fa.cash_distr, size=n) * fa.cash_scale,
+        'fundamental_price': fa.RNG.uniform(initial_price * (1 - fa.fundamental_price_spread),
+                                            initial_price * (1 + fa.fundamental_price_spread), size=n),
+        'chi_market': fa.RNG.uniform(*fa.chi_market_range, size=n),
+        'chi_opinion': fa.RNG.uniform(*fa.chi_opinion_range, size=n),
+        'order_amount_perc': fa.RNG.uniform(*fa.order_amount_range, size=n),
+    }
+    n = chartists_number
+    chartists = {
+        'cash': ca.RNG.lognormal(*ca.cash_distr, size=n) * ca.cash_scale,
+        'is_optimistic': ca.RNG.random(size=n) < ca.optimistic_ratio,
+        'take_profit': ca.RNG.uniform(*ca.take_profit_range, size=n),
+        'order_amount_perc': ca.RNG.uniform(*ca.order_amount_range, size=n),
+    }
+    return ({name: column.tolist() for name, column in fundamentalists.items()},
+            {name: column.tolist() for name, column in chartists.items()})
+
+
+def _rng_states() -> dict[str, dict]:
+    return {cls.__name__: cls.RNG.bit_generator.state for cls in DRAW_ATTRS}
+
+
+def _template_key(mode: str, fundamentalists_number: int, chartists_number: int, initial_price: float) -> str:
+    key = {
+        'mode': mode,
+        'counts': [fundamentalists_number, chartists_number],
+        'initial_price': initial_price,
+        'rng_states': _rng_states(),
+        'class_config': {cls.__name__: {attr: getattr(cls, attr) for attr in attrs}
+                         for cls, attrs in DRAW_ATTRS.items()},
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def get_population(fundamentalists_number: int, chartists_number: int, initial_price: float,
+                   mode: str = 'exact') -> PopulationTemplate:
+    """
+    Cached initial population for the current agents' RNG states and class attributes.
+    Building a model from it leaves the RNGs where they would be after constructing the agents one by one.
+    mode: 'exact' reproduces the per-agent draws, 'bulk' draws each parameter as one array
+    """
+    if mode not in ('exact', 'bulk'):
+        raise ValueError(f"Unexpected population `mode` {mode}. Expected 'exact' or 'bulk'.")
+    initial_price = float(initial_price)
+    key = _template_key(mode, fundamentalists_number, chartists_number, initial_price)
+    template = _templates.get(key)
+    if template is not None:
+        _templates.move_to_end(key)
+        for cls in DRAW_ATTRS:
+            cls.RNG.bit_generator.state = template.rng_states[cls.__name__]
+        return template
+
+    draw = _draw_exact if mode == 'exact' else _draw_bulk
+    fundamentalists, chartists = draw(fundamentalists_number, chartists_number, initial_price)
+    template = PopulationTemplate(fundamentalists, chartists, _rng_states())
+    _templates[key] = template
+    if len(_templates) > MAX_TEMPLATES:
+        _templates.popitem(last=False)
+    return template
+
+
+def clear_cache():
+    _templates.clear()
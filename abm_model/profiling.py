@@ -0,0 +1,60 @@
+from collections import defaultdict
+
+from utils.order_book import OrderBook
+
+TIMERS = ['ChartistAgent time', 'FundamentalistAgent time', 'MarketMaker time', 'Matching time', 'Settlement time',
+          'Decision time']
+COUNTERS = ['MM requotes', 'MM one-sided requotes', 'Execute calls', 'Transactions settled', 'Orders placed',
+            'Orders cancelled', 'Orders amended', 'Bid depth', 'Ask depth']
+
+
+class StepProfiler:
+    """
+    Per-step timers and counters of `MarketScheduler`. The scheduler only calls it if profiling is on,
+    so a model without a profiler pays one attribute check per hook.
+    `last` holds the values of the last finished step, `totals` the sums over the run (depths are the last values).
+    """
+
+    def __init__(self):
+        self.current: dict[str, float] = defaultdict(float)
+        self.last: dict[str, float] = {name: 0 for name in TIMERS + COUNTERS}
+        self.totals: dict[str, float] = defaultdict(float)
+        self.__book_counters = (0, 0, 0, 0)
+
+    def add_time(self, name: str, seconds: float):
+        self.current[name] += seconds
+
+    def count(self, name: str, value: int = 1):
+        self.current[name] += value
+
+    @staticmethod
+    def _book_counters(order_book: OrderBook) -> tuple[int, int, int, int]:
+        return order_book.orders_placed, order_book.orders_cancelled, order_book.orders_amended, order_book.executions
+
+    def start_step(self, order_book: OrderBook):
+        self.current = defaultdict(float)
+        self.__book_counters = self._book_counters(order_book)
+
+    def end_step(self, order_book: OrderBook):
+        placed, cancelled, amended, executions = (now - before for now, before in
+                                                  zip(self._book_counters(order_book), self.__book_counters))
+        self.current.update({
+            'Orders placed': placed,
+            'Orders cancelled': cancelled,
+            'Orders amended': amended,
+            'Execute calls': executions,
+        })
+        self.last = {name: self.current[name] for name in TIMERS + COUNTERS}
+        self.last.update({'Bid depth': len(order_book.bid), 'Ask depth': len(order_book.ask)})
+        for name, value in self.last.items():
+            if name in ('Bid depth', 'Ask depth'):
+                self.totals[name] = value
+            else:
+                self.totals[name] += value
+
+    def reporters(self) -> dict:
+        """
+        DataCollector model reporters, one column per timer and counter.
+        """
+        return {f'Profile: {name}': (lambda model, name=name: model.schedule.profiler.last[name])
+                for name in TIMERS + COUNTERS}
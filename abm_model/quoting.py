@@ -0,0 +1,52 @@
+from utils.models import MarketAction
+from utils.order_book import Order, OrderBook
+
+QuoteKey = tuple[MarketAction, int]  # (BUY_LIMIT | SELL_LIMIT, level)
+
+
+class QuoteLadder:
+    """
+    Resting limit orders of one agent by side and level. `update` diffs the desired quotes against them and
+    only touches levels whose price or remaining quantity changed: unchanged levels and quantity decreases keep
+    their queue position, other changes are requeued with `OrderBook.replace_order`.
+    """
+
+    def __init__(self, order_book: OrderBook, agent_id: int | str):
+        self.order_book = order_book
+        self.agent_id = agent_id
+        self.__orders: dict[QuoteKey, Order] = {}
+
+    def __len__(self):
+        return len(self.__orders)
+
+    @property
+    def orders(self) -> dict[QuoteKey, Order]:
+        return self.__orders
+
+    def update(self, desired: dict[QuoteKey, tuple[float, int]]) -> int:
+        """
+        desired: {(action, level): (price, quantity)}, levels missing from it are cancelled
+        Returns the number of levels touched.
+        """
+        order_book = self.order_book
+        touched = 0
+        for key in [key for key in self.__orders if key not in desired]:
+            order_book.cancel_order(self.__orders.pop(key))
+            touched += 1
+        for key, (price, quantity) in desired.items():
+            resting = self.__orders.get(key)
+            if resting is not None and resting.quantity > 0:
+                if resting.price == price and resting.quantity == quantity:
+                    continue
+                if order_book.replace_order(resting, price, quantity):
+                    touched += 1
+                    continue
+            self.__orders[key] = order_book.place_order(self.agent_id, key[0], price, quantity)
+            touched += 1
+        return touched
+
+    def cancel(self):
+        for order in self.__orders.values():
+            if order.quantity > 0:
+                self.order_book.cancel_order(order)
+        self.__orders.clear()
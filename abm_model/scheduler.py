@@ -1,12 +1,17 @@
-from mesa import Model
+from time import perf_counter
+
+from mesa import Agent, Model
 from mesa.time import BaseScheduler
 import numpy as np
 
 import config
 from abm_model.chartist import ChartistAgent
+from abm_model.decisions import DecisionPool, apply_decision, snapshot
 from abm_model.fundamentalist import FundamentalistAgent
 from abm_model.market_maker import MarketMaker
 from abm_model.news import NewsAgent
+from abm_model.profiling import StepProfiler
+from abm_model.shocks import ShockPaths
 from utils.models import Transaction
 from utils.order_book import OrderBook
 
@@ -16,15 +21,77 @@ logger = config.get_logger(__name__)
 class MarketScheduler(BaseScheduler):
     news_lambda: float = 0.5
 
-    def __init__(self, model: Model, seed: int | None = None):
+    def __init__(self, model: Model, seed: int | None = None, profiler: StepProfiler | None = None,
+                 decision_workers: int | None = None, decision_batch: int | None = None,
+                 shocks: ShockPaths | None = None):
+        """
+        shocks: pre-drawn news and, optionally, trader orders replace the scheduler's and `NewsAgent` draws
+        decision_workers: None steps the traders one by one. Otherwise the traders decide on a snapshot
+            of the market taken at the start of the step (or of each `decision_batch` traders) in that many
+            processes, see `abm_model.decisions`. The orders are then placed and matched in the step's
+            seeded order. Results don't depend on the number of workers
+        """
         super().__init__(model)
+        self.profiler = profiler
+        if decision_batch is not None and decision_batch < 1:
+            raise ValueError(f"`decision_batch` must be >=1. Got {str(decision_batch)}")
+        self.decision_workers = decision_workers
+        self.decision_batch = decision_batch
+        self.__decisions: DecisionPool | None = None
         self._news_lambda = type(self).news_lambda
         self.RNG = np.random.default_rng(seed if seed else config.RANDOM_SEED)
         self.news_event_step = round(self.RNG.exponential(1 / self._news_lambda))
+        self._injected_news: float | None = None
+        self.shocks = shocks
+        if shocks is not None:
+            self.news_event_step = -1
+        self.__population: tuple | None = None
+        self.__views: dict[type, tuple] = {}
+        self.__by_id: dict[int, Agent] = {}
+        self.__traders: tuple = ()
+        self.__trader_order = np.empty(0, dtype=np.intp)
+        self.__trader_identity = np.empty(0, dtype=np.intp)
+        self.__mm_order = np.empty(0, dtype=np.intp)
+        self.__mm_identity = np.empty(0, dtype=np.intp)
+
+    def __refresh_agents(self):
+        """
+        Typed views of the model's agents, rebuilt only when the population (agents per type) changes.
+        """
+        agents_ = self.model.agents_
+        population = tuple((agent_type, len(agents)) for agent_type, agents in agents_.items())
+        if population == self.__population: return
+        self.__population = population
+        self.__views = {agent_type: tuple(agents) for agent_type, agents in agents_.items()}
+        self.__by_id = {agent.unique_id: agent for agents in self.__views.values() for agent in agents}
+        self.__traders = self.__views.get(ChartistAgent, ()) + self.__views.get(FundamentalistAgent, ())
+        self.__trader_identity = np.arange(len(self.__traders), dtype=np.intp)
+        self.__trader_order = self.__trader_identity.copy()
+        self.__mm_identity = np.arange(len(self.__views.get(MarketMaker, ())), dtype=np.intp)
+        self.__mm_order = self.__mm_identity.copy()
+        logger.debug(f'Agent views rebuilt. Agents: {len(self.__by_id)}.')
+
+    def invalidate_agents(self):
+        """
+        Forces the views rebuild, for agents replaced without changing the number of agents of a type.
+        """
+        self.__population = None
+
+    def agents_of_type(self, agent_type: type[Agent]) -> tuple:
+        """
+        Agents of `agent_type` in creation order, a cached alternative to `model.get_agents_of_type`.
+        """
+        self.__refresh_agents()
+        return self.__views.get(agent_type, ())
+
+    @property
+    def agents_number(self) -> int:
+        self.__refresh_agents()
+        return len(self.__by_id)
 
     def __complete_transaction(self, transaction: Transaction):
-        buyer = self.model.agents.select(filter_func=lambda a: a.unique_id == transaction.buyer_id)[0]
-        seller = self.model.agents.select(filter_func=lambda a: a.unique_id == transaction.seller_id)[0]
+        buyer = self.__by_id[transaction.buyer_id]
+        seller = self.__by_id[transaction.seller_id]
 
         if isinstance(buyer, ChartistAgent):
             buyer.update_open_pos_price('buy', transaction.price, transaction.quantity)
@@ -36,47 +103,117 @@ class MarketScheduler(BaseScheduler):
         seller.cash += transaction.price * transaction.quantity
         seller.assets_quantity -= transaction.quantity
 
+        if self.model.trade_tape is not None:
+            self.model.trade_tape.record(self.steps, transaction.price, transaction.quantity, type(buyer).__name__,
+                                         type(seller).__name__, transaction.aggressor)
+
         self.model.traded_qty += transaction.quantity
 
     def __execute_order_book(self):
         order_book: OrderBook = self.model.order_book
+        profiler = self.profiler
+        if profiler: start = perf_counter()
         transactions = order_book.execute_orders()
+        if profiler:
+            settle_start = perf_counter()
+            profiler.add_time('Matching time', settle_start - start)
         ttl_amount = ttl_qty = 0
         for transaction in transactions:
             self.__complete_transaction(transaction)
             ttl_amount += transaction.quantity * transaction.price
             ttl_qty += transaction.quantity
             self.model.completed_transactions += 1
+        if profiler:
+            profiler.add_time('Settlement time', perf_counter() - settle_start)
+            profiler.count('Transactions settled', len(transactions))
         return (ttl_amount / ttl_qty) if transactions else 0
 
     def __mm_step(self):
-        for mm in self.model.get_agents_of_type(MarketMaker).shuffle():
+        profiler = self.profiler
+        if profiler: start = perf_counter()
+        market_makers = self.__views.get(MarketMaker, ())
+        if len(market_makers) > 1:  # seeded, unlike `AgentSet.shuffle` which draws from the unseeded `model.random`
+            order = self.__mm_order
+            np.copyto(order, self.__mm_identity)
+            self.RNG.shuffle(order)
+            market_makers = [market_makers[idx] for idx in order.tolist()]
+        for mm in market_makers:
             mm.step()
+        if profiler:
+            profiler.add_time('MarketMaker time', perf_counter() - start)
+            profiler.count('MM requotes')
+
+    def __trader_turn(self, trader, decision: np.ndarray | None = None):
+        profiler = self.profiler
+        if not all([self.model.order_book.get_best_ask(), self.model.order_book.get_best_bid()]):
+            if profiler: profiler.count('MM one-sided requotes')
+            self.__mm_step()
+        if profiler: start = perf_counter()
+        if decision is None:
+            trader.step()
+        else:
+            apply_decision(trader, decision, self.model.order_book)
+        if profiler: profiler.add_time(f'{type(trader).__name__} time', perf_counter() - start)
+        self.__execute_order_book()
+
+    def __decided_turns(self, order: np.ndarray):
+        traders = self.__traders
+        if self.__decisions is None or self.__decisions.traders is not traders:
+            if self.__decisions is not None: self.__decisions.close()
+            self.__decisions = DecisionPool(traders, self.decision_workers)
+        profiler = self.profiler
+        batch = self.decision_batch or max(len(order), 1)
+        for batch_start in range(0, len(order), batch):
+            positions = order[batch_start:batch_start + batch]
+            if profiler: start = perf_counter()
+            decisions = self.__decisions.decide(positions, snapshot(self.model), int(self.RNG.integers(2 ** 63)))
+            if profiler: profiler.add_time('Decision time', perf_counter() - start)
+            for idx in positions.tolist():
+                self.__trader_turn(traders[idx], decisions[:, idx])
+
+    def inject_news(self, value: float):
+        """
+        News event with `value` at the next step, for news driven from outside the model (see `MultiAssetModel`).
+        Set `news_event_step` to -1 to switch off the scheduler's own news.
+        """
+        self._injected_news = float(value)
 
     def __generate_news_event(self):
         self.news_event_step = self.steps + np.ceil(self.RNG.exponential(1 / self._news_lambda))
-        for news_agent in self.model.get_agents_of_type(NewsAgent):
+        for news_agent in self.__views.get(NewsAgent, ()):
             news_agent.step()
 
     def step(self):
         logger.debug(f'Step #{self.steps} starts.')
+        profiler = self.profiler
+        if profiler: profiler.start_step(self.model.order_book)
         self.model.completed_transactions = 0
         self.model.traded_qty = 0
 
+        self.__refresh_agents()
+        shocks = self.shocks
+        if shocks is not None and self.steps < len(shocks.news) and not np.isnan(shocks.news[self.steps]):
+            self.inject_news(shocks.news[self.steps])
         self.model.news_event_occurred = False
-        if self.steps == self.news_event_step:
+        if self._injected_news is not None:
+            self.model.news_event_value, self._injected_news = self._injected_news, None
+        elif self.steps == self.news_event_step:
             self.__generate_news_event()
 
-        traders = []
-        for agent_type in [ChartistAgent, FundamentalistAgent]:
-            traders.extend(self.model.get_agents_of_type(agent_type))
-
-        self.RNG.shuffle(traders)
-        for trader in traders:
-            if not all([self.model.order_book.get_best_ask(), self.model.order_book.get_best_bid()]):
-                self.__mm_step()
-            trader.step()
-            self.__execute_order_book()
+        traders = self.__traders
+        order = self.__trader_order
+        if shocks is not None and shocks.activation is not None:
+            order = np.asarray(shocks.activation[self.steps])
+            if len(order) != len(traders):
+                raise ValueError(f'Activation of {len(order)} traders, the model has {len(traders)}.')
+        else:
+            np.copyto(order, self.__trader_identity)  # the permutation of the creation order, as shuffling the agents
+            self.RNG.shuffle(order)
+        if self.decision_workers:
+            self.__decided_turns(order)
+        else:
+            for idx in order.tolist():
+                self.__trader_turn(traders[idx])
 
         self.__mm_step()
         avg_price = self.__execute_order_book()
@@ -87,6 +224,8 @@ class MarketScheduler(BaseScheduler):
                          f"Order book: {self.model.order_book}")
             raise ValueError(f"Wrong `market_price` {market_price}. Step: {self.steps}.")
         self.model.prices.append(round(market_price, 4))
+        self.model.metrics.update(self.model)
+        if profiler: profiler.end_step(self.model.order_book)
 
         logger.debug(f'Step #{self.steps} finished.')
         self.steps += 1
@@ -0,0 +1,91 @@
+import os
+import json
+from typing import NamedTuple
+
+import numpy as np
+
+from abm_model.news import NewsAgent
+
+
+class ShockPaths(NamedTuple):
+    """
+    Exogenous randomness of a run drawn in advance (common random numbers): models given the same paths
+    see the same news and, with `activation`, the same trader order, whatever their other parameters.
+    news: (steps,) news value of every step, NaN without news
+    activation: (steps, traders) order of the traders in every step, indices in creation order
+        (chartists, then fundamentalists), or None to keep the scheduler's shuffle
+    """
+    news: np.ndarray
+    activation: np.ndarray | None = None
+
+    def save(self, folder_name: str, name: str, news_lambda: float | None = None):
+        """
+        Also writes `shocks_<name>.json` with the inputs of the paths (steps, `news_lambda`, traders), written last,
+        so it describes complete files. A stale activation file of earlier paths is removed.
+        """
+        activation_path = os.path.join(folder_name, f'shocks_{name}_activation.npy')
+        np.save(os.path.join(folder_name, f'shocks_{name}_news.npy'), self.news)
+        if self.activation is not None:
+            np.save(activation_path, self.activation)
+        elif os.path.exists(activation_path):
+            os.remove(activation_path)
+        with open(os.path.join(folder_name, f'shocks_{name}.json'), 'w') as i_file:
+            json.dump(self.info(news_lambda), i_file)
+
+    def info(self, news_lambda: float | None = None) -> dict:
+        return {
+            'steps': len(self.news),
+            'news_lambda': news_lambda,
+            'traders_number': int(self.activation.shape[1]) if self.activation is not None else None,
+        }
+
+    @staticmethod
+    def load_info(folder_name: str, name: str) -> dict | None:
+        """
+        Inputs of the saved paths, `None` if there are none (or they were saved without them).
+        """
+        info_path = os.path.join(folder_name, f'shocks_{name}.json')
+        if not os.path.exists(info_path):
+            return None
+        with open(info_path, 'r') as i_file:
+            return json.load(i_file)
+
+    @classmethod
+    def load(cls, folder_name: str, name: str):
+        """
+        Memory-mapped, `None` if the paths were not saved.
+        """
+        news_path = os.path.join(folder_name, f'shocks_{name}_news.npy')
+        if not os.path.exists(news_path):
+            return None
+        activation_path = os.path.join(folder_name, f'shocks_{name}_activation.npy')
+        info = cls.load_info(folder_name, name)
+        with_activation = os.path.exists(activation_path) and (info is None or info['traders_number'] is not None)
+        return cls(news=np.load(news_path, mmap_mode='r'),
+                   activation=np.load(activation_path, mmap_mode='r') if with_activation else None)
+
+
+def generate_shocks(seed: int, steps_number: int, news_lambda: float | None = None,
+                    traders_number: int | None = None) -> ShockPaths:
+    """
+    News arrive as in `MarketScheduler` (exponential waiting times with `news_lambda`, by default the
+    scheduler's) with `NewsAgent` values. Timing, values and activation come from separate streams of `seed`
+    and are drawn step by step, so a longer run extends the paths of a shorter one.
+    traders_number: also draw a permutation of the traders per step
+    """
+    if news_lambda is None:
+        from abm_model.scheduler import MarketScheduler
+        news_lambda = MarketScheduler.news_lambda
+    timing_rng, values_rng, activation_rng = (np.random.default_rng(child)
+                                              for child in np.random.SeedSequence(seed).spawn(3))
+    news = np.full(steps_number, np.nan)
+    step = round(timing_rng.exponential(1 / news_lambda))
+    while step < steps_number:
+        news[step] = values_rng.normal(NewsAgent.mean, NewsAgent.variance)
+        step += int(np.ceil(timing_rng.exponential(1 / news_lambda)))
+    activation = None
+    if traders_number is not None:
+        activation = np.empty((steps_number, traders_number), dtype=np.intp)
+        for step in range(steps_number):
+            activation[step] = activation_rng.permutation(traders_number)
+    return ShockPaths(news=news, activation=activation)
@@ -62,9 +62,11 @@ SEEDS = list({
 def get_logger(name, level=None):
     logger = logging.getLogger(name)
     logger.setLevel(level if level else LOGGING_LEVEL)
-    ch = logging.StreamHandler()
-    formatter = logging.Formatter(LOG_FORMAT, datefmt='%Y-%m-%dT%H:%M:%S')
-    ch.setFormatter(formatter)
-    ch.setLevel(level if level else LOGGING_LEVEL)
-    logger.addHandler(ch)
+    if not logger.handlers:
+        ch = logging.StreamHandler()
+        formatter = logging.Formatter(LOG_FORMAT, datefmt='%Y-%m-%dT%H:%M:%S')
+        ch.setFormatter(formatter)
+        logger.addHandler(ch)
+    for handler in logger.handlers:
+        handler.setLevel(level if level else LOGGING_LEVEL)
     return logger
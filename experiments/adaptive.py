@@ -0,0 +1,126 @@
+import os
+import math
+from statistics import NormalDist, mean, stdev
+
+import config
+from experiments.cache import ResultCache
+from experiments.manifest import SweepManifest
+from experiments.run_experiments import _execute_sweep, _find_sweep_folder, _job_id, _make_folder
+from experiments.store import ResultsStore
+
+logger = config.get_logger(__name__, 20)
+
+
+def _critical_value(confidence: float, n: int) -> float:
+    try:
+        from scipy.stats import t
+        return float(t.ppf(0.5 + confidence / 2, n - 1))
+    except ImportError:
+        return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def confidence_interval(values: list[float], confidence: float = 0.95) -> tuple[float, float]:
+    """
+    Returns (mean, half-width) of the confidence interval of the mean, NaN if any of the values is NaN.
+    """
+    if any(math.isnan(value) for value in values):
+        return math.nan, math.nan
+    if len(values) < 2:
+        return (values[0] if values else math.nan), math.inf
+    return mean(values), _critical_value(confidence, len(values)) * stdev(values) / math.sqrt(len(values))
+
+
+def is_converged(results: list[dict], metrics: list[str], tolerance: float, confidence: float = 0.95) -> bool:
+    """
+    Half-width of every metric's CI has to be within `tolerance` relative to the mean
+    (absolute, if the mean is 0). NaN half-widths, e.g. of NaN metrics, are not converged.
+    """
+    for metric in metrics:
+        avg, half_width = confidence_interval([r[metric] for r in results], confidence)
+        if math.isnan(half_width) or half_width > tolerance * (abs(avg) if avg else 1):
+            return False
+    return True
+
+
+def summarize(results: list[dict], metrics: list[str], confidence: float = 0.95) -> dict:
+    summary = {'seeds': len(results)}
+    for metric in metrics:
+        avg, half_width = confidence_interval([r[metric] for r in results], confidence)
+        summary[metric] = {'mean': avg, 'ci': half_width}
+    return summary
+
+
+def run_adaptive_sweep(
+        params_list: list[dict],
+        metrics: list[str] | None = None,
+        tolerance: float = 0.05,
+        confidence: float = 0.95,
+        min_seeds: int = 5,
+        batch_size: int | None = None,
+        max_seeds: int | None = None,
+        budget: int | None = None,
+        experiment_name: str | None = None,
+        workers: int | None = None,
+        cache: ResultCache | None = None,
+        metrics_only: bool = True,
+) -> list[dict]:
+    """
+    Launches seeds from `config.SEEDS` for every params point until the CIs of `metrics` converge.
+    Each round adds `batch_size` seeds to the points that are not converged yet and runs them as one sweep,
+    so the state is kept in the sweep manifest and results store and an interrupted run continues on restart
+    in the latest sweep folder named `experiment_name`.
+
+    max_seeds: seeds limit per params point
+    budget: limit of total runs
+    """
+    metrics = metrics if metrics else ['spread', 'price_std']
+    seeds = config.SEEDS[:max_seeds] if max_seeds else config.SEEDS
+    batch_size = batch_size if batch_size else (workers if workers else os.cpu_count())
+    min_seeds = max(min_seeds, 2)
+    folder_name = None
+    if experiment_name:
+        try:
+            folder_name = _find_sweep_folder(experiment_name)
+            logger.info(f"Continuing adaptive sweep {folder_name}.")
+        except FileNotFoundError:
+            pass
+    folder_name = folder_name if folder_name else _make_folder(experiment_name)
+    manifest = SweepManifest(folder_name)
+    store = ResultsStore(folder_name)
+
+    launched = [sum(1 for seed in seeds if _job_id(seed, params) in manifest.jobs) for params in params_list]
+    converged = [False] * len(params_list)
+    rounds = 0
+    while True:
+        new_jobs = 0
+        for idx, params in enumerate(params_list):
+            results = store.query(params=params)
+            if len(results) >= min_seeds and is_converged(results, metrics, tolerance, confidence):
+                converged[idx] = True
+                continue
+            batch = max(min_seeds - launched[idx], batch_size)
+            if budget:
+                batch = min(batch, budget - len(manifest.jobs))
+            for seed in seeds[launched[idx]:launched[idx] + max(batch, 0)]:
+                manifest.add_job(_job_id(seed, params), seed, params)
+                launched[idx] += 1
+                new_jobs += 1
+        if not new_jobs and not manifest.unfinished():
+            break
+        rounds += 1
+        logger.info(f"Round {rounds}. New runs: {new_jobs}. Converged points: {sum(converged)}/{len(params_list)}")
+        manifest.save()
+        _execute_sweep(folder_name, manifest, workers, cache, metrics_only)
+        if not new_jobs:
+            break
+
+    summary = []
+    for params in params_list:
+        results = store.query(params=params)
+        point = summarize(results, metrics, confidence)
+        point.update(params=params,
+                     converged=len(results) >= min_seeds and is_converged(results, metrics, tolerance, confidence))
+        summary.append(point)
+    logger.info(f"Adaptive sweep finished. Runs: {len(manifest.jobs)}. "
+                f"Converged points: {sum(p['converged'] for p in summary)}/{len(params_list)}")
+    return summary
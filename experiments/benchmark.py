@@ -0,0 +1,158 @@
+import os
+import json
+import platform
+import subprocess
+import time
+from collections import defaultdict
+from functools import wraps
+from multiprocessing import TimeoutError, get_context
+
+import config
+from abm_model.profiling import COUNTERS
+from experiments.telemetry import peak_rss_mb
+
+logger = config.get_logger(__name__, 20)
+
+PHASES = ['agent_decisions', 'market_maker', 'matching', 'settlement', 'data_collection']
+
+
+def _timed(func, timings: dict, phase: str):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[phase] += time.perf_counter() - start
+    return wrapper
+
+
+def _instrument(model, timings: dict):
+    """
+    Scheduler phases come from the built-in `StepProfiler`, only data collection is wrapped here.
+    """
+    model.datacollector.collect = _timed(model.datacollector.collect, timings, 'data_collection')
+
+
+def run_case(agents: int, steps: int, fundamentalists_share: float = 0.5, tick_size: float = 0.05,
+             seed_index: int = 0) -> dict:
+    from abm_model.market_model import MarketModel
+    from experiments.run_experiments import _change_seed
+
+    _change_seed(config.SEEDS[seed_index])
+    fundamentalists = int(round(agents * fundamentalists_share))
+    timings = defaultdict(float)
+
+    start = time.perf_counter()
+    model = MarketModel(fundamentalists_number=fundamentalists, chartists_number=agents - fundamentalists,
+                        steps_number=steps, tick_size=tick_size, profile=True)
+    init_time = time.perf_counter() - start
+    _instrument(model, timings)
+
+    start = time.perf_counter()
+    model.run_model()
+    run_time = time.perf_counter() - start
+
+    profile = model.schedule.profiler.totals
+    timings.update(
+        agent_decisions=profile['ChartistAgent time'] + profile['FundamentalistAgent time'],
+        market_maker=profile['MarketMaker time'],
+        matching=profile['Matching time'],
+        settlement=profile['Settlement time'],
+    )
+    phases = {phase: round(timings[phase], 4) for phase in PHASES}
+    phases['other'] = round(run_time - sum(timings.values()), 4)
+    counters = {name: int(profile[name]) for name in COUNTERS}
+    return {
+        'agents': agents,
+        'steps': steps,
+        'fundamentalists_share': fundamentalists_share,
+        'tick_size': tick_size,
+        'init_time': round(init_time, 4),
+        'run_time': round(run_time, 4),
+        'steps_per_sec': round(steps / run_time, 4),
+        'agent_steps_per_sec': round(steps * agents / run_time, 2),
+        'peak_rss_mb': peak_rss_mb(),
+        'phases': phases,
+        'counters': counters,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return
+
+
+def run_benchmark(
+        agents: list[int] | None = None,
+        steps: list[int] | None = None,
+        fundamentalists_shares: list[float] | None = None,
+        max_agent_steps: int | None = 2_000_000,
+        timeout: float | None = 600.,
+        output: str | None = None,
+) -> dict:
+    """
+    Runs each case in a fresh interpreter, so peak RSS belongs to the case.
+    max_agent_steps: steps of large populations are cut down to keep agents * steps under the budget
+    timeout: seconds per case, slower cases are reported with `timed_out` and no metrics
+    """
+    agents = agents if agents else [100, 1_000, 10_000, 100_000]
+    steps = steps if steps else [100]
+    fundamentalists_shares = fundamentalists_shares if fundamentalists_shares else [0.5]
+
+    cases = []
+    for agents_number in agents:
+        for steps_number in steps:
+            if max_agent_steps:
+                steps_number = max(min(steps_number, max_agent_steps // agents_number), 2)
+            for share in fundamentalists_shares:
+                cases.append((agents_number, steps_number, share))
+
+    results = []
+    ctx = get_context('spawn')
+    for agents_number, steps_number, share in cases:
+        with ctx.Pool(1) as pool:
+            try:
+                result = pool.apply_async(run_case, (agents_number, steps_number, share)).get(timeout)
+            except TimeoutError:
+                logger.info(f"Agents: {agents_number}. Steps: {steps_number}. Fundamentalists: {share}. "
+                            f"Timed out after {timeout} seconds.")
+                results.append({'agents': agents_number, 'steps': steps_number, 'fundamentalists_share': share,
+                                'tick_size': 0.05, 'timed_out': True})
+                continue
+        logger.info(f"Agents: {agents_number}. Steps: {steps_number}. Fundamentalists: {share}. "
+                    f"Steps/sec: {result['steps_per_sec']}. Peak RSS: {result['peak_rss_mb']} MB.")
+        results.append(result)
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'results': results,
+    }
+    if output:
+        with open(output, 'w') as b_file:
+            json.dump(report, b_file, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MarketModel scaling benchmark.')
+    parser.add_argument('--agents', type=int, nargs='+')
+    parser.add_argument('--steps', type=int, nargs='+')
+    parser.add_argument('--fundamentalists-shares', type=float, nargs='+')
+    parser.add_argument('--max-agent-steps', type=int, default=2_000_000)
+    parser.add_argument('--timeout', type=float, default=600., help='Seconds per case.')
+    parser.add_argument('--output', default='benchmark.json')
+    args = parser.parse_args()
+    run_benchmark(args.agents, args.steps, args.fundamentalists_shares, args.max_agent_steps, args.timeout,
+                  args.output)
@@ -0,0 +1,159 @@
+import os
+import glob
+import hashlib
+import json
+import shutil
+import tempfile
+import time
+from functools import lru_cache
+
+import config
+from abm_model.chartist import ChartistAgent
+from abm_model.fundamentalist import FundamentalistAgent
+from abm_model.market_agent import MarketAgent
+from abm_model.market_maker import MarketMaker
+from abm_model.market_model import class_defaults
+from abm_model.news import NewsAgent
+from abm_model.scheduler import MarketScheduler
+
+logger = config.get_logger(__name__)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODEL_CODE_DIRS = ['abm_model', 'utils']
+CACHED_CLASSES = [MarketAgent, ChartistAgent, FundamentalistAgent, MarketMaker, NewsAgent, MarketScheduler]
+CACHED_FILES = ['model_data.csv', 'agents_data.csv']
+
+
+@lru_cache(maxsize=1)
+def model_code_version() -> str:
+    digest = hashlib.sha256()
+    for dir_name in MODEL_CODE_DIRS:
+        for path in sorted(glob.glob(os.path.join(ROOT_DIR, dir_name, '*.py'))):
+            digest.update(os.path.basename(path).encode())
+            with open(path, 'rb') as src:
+                digest.update(src.read())
+    return digest.hexdigest()[:16]
+
+
+def agents_class_config() -> dict:
+    """
+    Public class-level parameters of the model classes without the `*_config` overrides of the last model.
+    The overrides of a run are in its params, so the key doesn't depend on which job ran before.
+    """
+    class_config = {}
+    for cls in CACHED_CLASSES:
+        class_config[cls.__name__] = {
+            attr: value for attr, value in class_defaults(cls).items()
+            if not attr.startswith('_') and attr != 'RNG' and isinstance(value, (int, float, str, list, tuple))
+        }
+    return class_config
+
+
+def calc_run_key(params: dict, seed: int) -> str:
+    key_str = json.dumps({
+        'params': params,
+        'seed': str(seed),
+        'class_config': agents_class_config(),
+        'code_version': model_code_version(),
+    }, sort_keys=True)
+    return hashlib.sha256(key_str.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    Stores metrics and data files of finished runs under `<root>/<key[:2]>/<key>/`.
+    Entries are written to a temporary folder and renamed, so concurrent workers never see a partial entry.
+    """
+
+    def __init__(self, root: str = 'experiments_cache', max_age: float | None = None, max_size: int | None = None):
+        """
+        max_age: seconds since the last hit after which an entry is evicted
+        max_size: total cache size in bytes, least recently used entries are evicted first
+        """
+        self.root = root
+        self.max_age = max_age
+        self.max_size = max_size
+        os.makedirs(self.root, exist_ok=True)
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def __contains__(self, key: str):
+        return os.path.exists(os.path.join(self._entry_path(key), 'metrics.json'))
+
+    def _has_files(self, key: str) -> bool:
+        return all(os.path.exists(os.path.join(self._entry_path(key), f)) for f in CACHED_FILES)
+
+    def get(self, key: str, folder_name: str | None = None, prefix: str = '', with_files: bool = True) -> dict | None:
+        """
+        with_files: entries of metrics-only runs are a miss, the run has to produce the data files
+        """
+        entry = self._entry_path(key)
+        if with_files and not self._has_files(key): return
+        try:
+            with open(os.path.join(entry, 'metrics.json'), 'r') as m_file:
+                metrics = json.load(m_file)
+        except FileNotFoundError:
+            return
+        os.utime(entry)
+        if folder_name:
+            for file_name in CACHED_FILES:
+                src = os.path.join(entry, file_name)
+                dst = os.path.join(folder_name, prefix + file_name)
+                if os.path.exists(src) and not os.path.exists(dst):
+                    try:
+                        os.link(src, dst)
+                    except OSError:
+                        shutil.copyfile(src, dst)
+        logger.debug(f'Cache hit {key}.')
+        return metrics
+
+    def put(self, key: str, metrics: dict, files: dict[str, str] | None = None):
+        """
+        files: {name from CACHED_FILES: path to the file produced by the run}
+        """
+        entry = self._entry_path(key)
+        if os.path.exists(entry) and (self._has_files(key) or not files): return
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        tmp_entry = tempfile.mkdtemp(prefix='.tmp_', dir=os.path.dirname(entry))
+        for file_name, path in (files or {}).items():
+            shutil.copyfile(path, os.path.join(tmp_entry, file_name))
+        with open(os.path.join(tmp_entry, 'metrics.json'), 'w') as m_file:
+            json.dump(metrics, m_file)
+        if os.path.exists(entry):
+            shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.rename(tmp_entry, entry)
+        except OSError:
+            shutil.rmtree(tmp_entry, ignore_errors=True)
+        if self.max_age or self.max_size:
+            self.evict()
+
+    def _entries(self) -> list[tuple[str, float, int]]:
+        entries = []
+        for entry in glob.glob(os.path.join(self.root, '*', '*')):
+            if os.path.basename(entry).startswith('.tmp_'): continue
+            size = sum(os.path.getsize(os.path.join(entry, f)) for f in os.listdir(entry))
+            entries.append((entry, os.path.getmtime(entry), size))
+        return entries
+
+    def evict(self, max_age: float | None = None, max_size: int | None = None) -> int:
+        max_age = max_age if max_age else self.max_age
+        max_size = max_size if max_size else self.max_size
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        to_remove = []
+        if max_age:
+            now = time.time()
+            to_remove.extend(e for e in entries if now - e[1] > max_age)
+            entries = [e for e in entries if now - e[1] <= max_age]
+        if max_size:
+            ttl_size = sum(e[2] for e in entries)
+            for entry in entries:
+                if ttl_size <= max_size: break
+                to_remove.append(entry)
+                ttl_size -= entry[2]
+        for entry, _, _ in to_remove:
+            shutil.rmtree(entry, ignore_errors=True)
+        if to_remove:
+            logger.info(f'Evicted {len(to_remove)} cache entries.')
+        return len(to_remove)
@@ -0,0 +1,186 @@
+import copy
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+import config
+from abm_model.chartist import ChartistAgent
+from abm_model.fundamentalist import FundamentalistAgent
+from abm_model.market_maker import MarketMaker
+from abm_model.scheduler import MarketScheduler
+from experiments.cache import ResultCache
+from experiments.manifest import SweepManifest
+from experiments.run_experiments import _execute_sweep, _job_id, _make_folder
+from experiments.store import ResultsStore
+
+logger = config.get_logger(__name__, 20)
+
+CONFIG_CLASSES = {
+    'chartists_config': ChartistAgent,
+    'fundamentalists_config': FundamentalistAgent,
+    'scheduler_config': MarketScheduler,
+    'market_maker_config': MarketMaker,
+}
+
+
+def point_to_params(base_params: dict, names: list[str], point: np.ndarray) -> dict:
+    """
+    names: '<config kwarg>.<class attribute>[.<list index>]',
+    e.g. 'chartists_config.majority_importance', 'fundamentalists_config.chi_market_range.1'
+    """
+    params = copy.deepcopy(base_params)
+    for name, value in zip(names, point):
+        section, attr, *idx = name.split('.')
+        if section not in CONFIG_CLASSES:
+            raise ValueError(f"Unexpected config '{section}'. Expected one from `{', '.join(CONFIG_CLASSES)}`.")
+        section_config = params.setdefault(section, {})
+        if idx:
+            current = section_config.get(attr, getattr(CONFIG_CLASSES[section], attr))
+            section_config[attr] = list(current)
+            section_config[attr][int(idx[0])] = float(value)
+        else:
+            section_config[attr] = float(value)
+    return params
+
+
+def calc_loss(results: list[dict], targets: dict[str, float]) -> float:
+    """
+    Mean over seeds of the squared relative distances of metrics to their targets.
+    """
+    if not results: return math.nan
+    losses = [sum(((r[metric] - target) / (target if target else 1)) ** 2 for metric, target in targets.items())
+              for r in results]
+    return float(np.mean(losses))
+
+
+class GaussianProcess:
+    """
+    GP regression with an RBF kernel on [0, 1]-scaled inputs. Small enough to refit on every batch.
+    """
+
+    def __init__(self, length_scale: float = 0.3, noise: float = 1e-4):
+        self.length_scale = length_scale
+        self.noise = noise
+
+    def _kernel(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        sq_dist = ((a[:, None, :] - b[None, :, :]) ** 2).sum(axis=2)
+        return np.exp(-0.5 * sq_dist / self.length_scale ** 2)
+
+    def fit(self, x: np.ndarray, y: np.ndarray):
+        self.x = x
+        self.y_mean, self.y_std = y.mean(), (y.std() if y.std() > 0 else 1.)
+        y_scaled = (y - self.y_mean) / self.y_std
+        k = self._kernel(x, x) + self.noise * np.eye(len(x))
+        self.chol = np.linalg.cholesky(k)
+        self.alpha = np.linalg.solve(self.chol.T, np.linalg.solve(self.chol, y_scaled))
+        return self
+
+    def predict(self, x: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        k_star = self._kernel(x, self.x)
+        mean = k_star @ self.alpha
+        v = np.linalg.solve(self.chol, k_star.T)
+        var = np.maximum(1. - (v ** 2).sum(axis=0), 1e-12)
+        return mean * self.y_std + self.y_mean, np.sqrt(var) * self.y_std
+
+
+def expected_improvement(mean: np.ndarray, std: np.ndarray, best: float, xi: float = 0.01) -> np.ndarray:
+    """
+    EI for minimization.
+    """
+    norm = NormalDist()
+    z = (best - mean - xi) / std
+    cdf = np.array([norm.cdf(v) for v in z])
+    pdf = np.array([norm.pdf(v) for v in z])
+    return (best - mean - xi) * cdf + std * pdf
+
+
+def propose_batch(model: GaussianProcess, x: np.ndarray, y: np.ndarray, batch_size: int,
+                  rng: np.random.Generator, candidates: int = 2000) -> np.ndarray:
+    """
+    Picks points with the best EI one by one; every pick is added to the GP with its predicted loss
+    (kriging believer), so a batch doesn't pile up at one optimum.
+    """
+    x_fit, y_fit = x.copy(), y.copy()
+    pool = rng.random((candidates, x.shape[1]))
+    batch = []
+    for _ in range(batch_size):
+        model.fit(x_fit, y_fit)
+        mean, std = model.predict(pool)
+        idx = int(np.argmax(expected_improvement(mean, std, y_fit.min())))
+        batch.append(pool[idx])
+        x_fit = np.vstack([x_fit, pool[idx]])
+        y_fit = np.append(y_fit, mean[idx])
+        pool = np.delete(pool, idx, axis=0)
+    return np.array(batch)
+
+
+def calibrate(
+        space: dict[str, tuple[float, float]],
+        targets: dict[str, float],
+        base_params: dict,
+        seeds_per_point: int = 3,
+        initial_points: int = 8,
+        batch_size: int = 4,
+        iterations: int = 5,
+        experiment_name: str | None = None,
+        workers: int | None = None,
+        cache: ResultCache | None = None,
+        seed: int | None = None,
+) -> dict:
+    """
+    Bayesian-optimization loop: runs an initial random design, then fits a GP to the loss of every evaluated point
+    (taken from the sweep's results store) and runs the `batch_size` points with the highest expected improvement.
+
+    space: {parameter name (see `point_to_params`): (low, high)}
+    targets: {metric from `OnlineMetrics.as_dict`: target value}, e.g. stylized facts like
+        {'returns_kurtosis': 3., 'volatility_clustering': 0.2}
+    """
+    names = list(space)
+    low = np.array([space[name][0] for name in space], dtype=float)
+    high = np.array([space[name][1] for name in space], dtype=float)
+    rng = np.random.default_rng(seed if seed else config.RANDOM_SEED)
+    base_params = dict(base_params, extended_metrics=True)
+    seeds = config.SEEDS[:seeds_per_point]
+
+    folder_name = _make_folder(experiment_name)
+    manifest = SweepManifest(folder_name)
+    store = ResultsStore(folder_name)
+    x_all, y_all, params_all = [], [], []
+
+    def evaluate(batch: np.ndarray):
+        batch_params = [point_to_params(base_params, names, low + point * (high - low)) for point in batch]
+        for params in batch_params:
+            for run_seed in seeds:
+                job_id = _job_id(run_seed, params)
+                if job_id not in manifest.jobs:  # a point evaluated before in the same folder
+                    manifest.add_job(job_id, run_seed, params)
+        manifest.save()
+        _execute_sweep(folder_name, manifest, workers, cache, metrics_only=True)
+        for point, params in zip(batch, batch_params):
+            results = store.query(params=params)
+            if not results:
+                raise RuntimeError(f'No results for calibration point {params}, see failed jobs in {folder_name}.')
+            loss = calc_loss(results, targets)
+            if math.isnan(loss):
+                logger.warning(f'NaN loss of calibration point {params}, it is left out of the surrogate.')
+                continue
+            x_all.append(point)
+            y_all.append(loss)
+            params_all.append(params)
+
+    evaluate(rng.random((initial_points, len(names))))
+    model = GaussianProcess()
+    for iteration in range(iterations):
+        if len(y_all) < 2:
+            raise ValueError(f'Not enough successful runs to fit the surrogate. Got {len(y_all)}.')
+        batch = propose_batch(model, np.array(x_all), np.array(y_all), batch_size, rng)
+        evaluate(batch)
+        logger.info(f'Iteration {iteration + 1}/{iterations}. Points: {len(y_all)}. Best loss: {min(y_all):.6f}')
+
+    best = int(np.argmin(y_all))
+    return {
+        'params': params_all[best],
+        'loss': y_all[best],
+        'history': [{'params': p, 'loss': l} for p, l in zip(params_all, y_all)],
+    }
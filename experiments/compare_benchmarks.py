@@ -0,0 +1,53 @@
+import json
+
+CASE_KEYS = ['agents', 'steps', 'fundamentalists_share', 'tick_size']
+# metric: True if higher is better
+METRICS = {'steps_per_sec': True, 'agent_steps_per_sec': True, 'peak_rss_mb': False}
+
+
+def _load(path: str) -> dict[tuple, dict]:
+    with open(path, 'r') as b_file:
+        report = json.load(b_file)
+    return {tuple(r[k] for k in CASE_KEYS): r for r in report['results'] if not r.get('timed_out')}
+
+
+def compare(baseline_path: str, current_path: str, threshold: float = 0.1) -> list[dict]:
+    """
+    Returns a row per (case, metric) present in both files. A row is a regression if the metric got worse
+    by more than `threshold` relative to the baseline. Timed out cases are skipped.
+    """
+    baseline, current = _load(baseline_path), _load(current_path)
+    rows = []
+    for case in sorted(baseline.keys() & current.keys()):
+        for metric, higher_is_better in METRICS.items():
+            old, new = baseline[case][metric], current[case][metric]
+            change = (new - old) / old if old else 0.
+            worse = -change if higher_is_better else change
+            rows.append({
+                'case': dict(zip(CASE_KEYS, case)),
+                'metric': metric,
+                'baseline': old,
+                'current': new,
+                'change': round(change, 4),
+                'regression': worse > threshold,
+            })
+    return rows
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Flags regressions between two benchmark result files.')
+    parser.add_argument('baseline')
+    parser.add_argument('current')
+    parser.add_argument('--threshold', type=float, default=0.1, help='Relative change considered a regression.')
+    args = parser.parse_args()
+
+    rows = compare(args.baseline, args.current, args.threshold)
+    for row in rows:
+        case = ' '.join(f'{k}={v}' for k, v in row['case'].items())
+        flag = 'REGRESSION' if row['regression'] else 'ok'
+        print(f"{flag:<10} {case:<60} {row['metric']:<20} {row['baseline']:>12} -> {row['current']:>12} "
+              f"({row['change']:+.1%})")
+    sys.exit(1 if any(row['regression'] for row in rows) else 0)
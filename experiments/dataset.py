@@ -0,0 +1,225 @@
+import os
+import csv
+import glob
+import json
+
+import numpy as np
+
+import config
+from experiments.manifest import atomic_write_json
+from experiments.store import calc_params_key
+
+logger = config.get_logger(__name__, 20)
+
+TABLES = ['model', 'agents']
+INDEX_NAME = 'index.json'
+
+
+def _read_table(path: str, table: str):
+    import pandas as pd
+
+    with open(path, 'r', newline='') as d_file:
+        reader = csv.reader(d_file)
+        header = next(reader)
+        first_row = next(reader, header)
+    if table == 'agents' and len(first_row) == len(header) + 1:
+        # agents CSVs are written with a (Step, AgentID) index but a single index label
+        return pd.read_csv(path, header=None, skiprows=1, names=['Step', 'AgentID'] + header[1:], low_memory=False)
+    return pd.read_csv(path, low_memory=False)
+
+
+def _column_kind(values) -> str:
+    import pandas as pd
+
+    if pd.api.types.is_bool_dtype(values) or pd.api.types.is_float_dtype(values):
+        return 'f8'
+    if pd.api.types.is_integer_dtype(values):
+        return 'i8'
+    if set(values.dropna().map(str).unique()) <= {'True', 'False'}:
+        return 'f8'  # booleans with gaps, e.g. `Is optimist` of non-chartists
+    return 'category'
+
+
+def _to_array(values, kind: str, categories: list[str]) -> np.ndarray:
+    if kind == 'category':
+        codes = {name: code for code, name in enumerate(categories)}
+        for name in values.dropna().map(str).unique():
+            if name not in codes:
+                codes[name] = len(categories)
+                categories.append(name)
+        return values.map(lambda x: codes[str(x)] if x == x else -1).to_numpy(dtype=np.int32)
+    if kind == 'f8' and values.dtype == object:
+        values = values.map({True: 1., False: 0., 'True': 1., 'False': 0.})
+    return values.to_numpy(dtype=kind)
+
+
+def _widen_to_float(meta: dict, output: str, files: dict, key: tuple[str, str]):
+    """
+    Rewrites an `i8` column as `f8`, once a later run has gaps or fractions in it.
+    """
+    path = os.path.join(output, meta['file'])
+    files[key].close()
+    np.fromfile(path, dtype='i8').astype('f8').tofile(path)
+    files[key] = open(path, 'ab')
+    meta['kind'] = 'f8'
+
+
+def _discover_runs(folder_name: str) -> list[tuple[str, int, dict]]:
+    runs = []
+    for path in sorted(glob.glob(os.path.join(folder_name, '*_params.json'))):
+        run_id = os.path.basename(path)[:-len('_params.json')]
+        with open(path, 'r') as p_file:
+            params = json.load(p_file)
+        runs.append((run_id, int(run_id.split('_')[0]), params))
+    return runs
+
+
+def consolidate(folder_name: str, output: str | None = None, tables: list[str] | None = None) -> str:
+    """
+    Packs the per-run CSV files of a sweep folder into one columnar dataset (default `<folder>/dataset`):
+    a raw binary file per table column with the runs concatenated, and index.json with run offsets, seeds
+    and params. Each CSV is read once and appended, memory use is bounded by the largest run.
+    Runs without data files (metrics-only) are indexed without rows.
+    """
+    output = output if output else os.path.join(folder_name, 'dataset')
+    tables = tables if tables else TABLES
+    os.makedirs(output, exist_ok=True)
+
+    columns: dict[str, dict[str, dict]] = {table: {} for table in tables}
+    lengths = {table: 0 for table in tables}
+    runs = []
+    files = {}
+    try:
+        for run_id, seed, params in _discover_runs(folder_name):
+            run = {'run_id': run_id, 'seed': seed, 'params_key': calc_params_key(params), 'params': params}
+            for table in tables:
+                path = os.path.join(folder_name, f'{run_id}_{table}_data.csv')
+                if not os.path.exists(path):
+                    run[table] = [lengths[table], lengths[table]]
+                    continue
+                data = _read_table(path, table)
+                for name in data.columns:
+                    meta = columns[table].get(name)
+                    if meta is None:
+                        meta = columns[table][name] = {'file': f'{table}_{len(columns[table])}.bin',
+                                                       'kind': _column_kind(data[name]), 'categories': []}
+                        if lengths[table]:  # column missing in earlier runs
+                            meta['offset'] = lengths[table]
+                        files[(table, name)] = open(os.path.join(output, meta['file']), 'wb')
+                    elif meta['kind'] == 'i8' and _column_kind(data[name]) == 'f8':
+                        _widen_to_float(meta, output, files, (table, name))
+                    values = _to_array(data[name], meta['kind'], meta['categories'])
+                    files[(table, name)].write(values.tobytes())
+                for name, meta in columns[table].items():
+                    if name not in data.columns:  # keep the columns aligned, NaN or -1 (no category)
+                        if meta['kind'] == 'i8':
+                            _widen_to_float(meta, output, files, (table, name))
+                        fill = np.full(len(data), -1 if meta['kind'] == 'category' else np.nan)
+                        files[(table, name)].write(fill.astype('i4' if meta['kind'] == 'category' else meta['kind'])
+                                                   .tobytes())
+                run[table] = [lengths[table], lengths[table] + len(data)]
+                lengths[table] += len(data)
+            runs.append(run)
+    finally:
+        for d_file in files.values():
+            d_file.close()
+
+    for table in tables:
+        for meta in columns[table].values():
+            meta['dtype'] = 'i4' if meta['kind'] == 'category' else meta['kind']
+    atomic_write_json(os.path.join(output, INDEX_NAME), {'runs': runs, 'columns': columns, 'lengths': lengths})
+    logger.info(f"Dataset {output}: {len(runs)} runs, rows: {lengths}.")
+    return output
+
+
+class SweepDataset:
+    """
+    Lazy reader of a `consolidate`d sweep. Opening reads only the index, columns are memory-mapped on first
+    use and `series` returns views of the selected runs, so nothing else is read from disk.
+    """
+
+    def __init__(self, path: str):
+        if os.path.exists(os.path.join(path, 'dataset', INDEX_NAME)):
+            path = os.path.join(path, 'dataset')
+        self.path = path
+        with open(os.path.join(path, INDEX_NAME), 'r') as i_file:
+            index = json.load(i_file)
+        self.runs: list[dict] = index['runs']
+        self.columns: dict[str, dict[str, dict]] = index['columns']
+        self.lengths: dict[str, int] = index['lengths']
+        self.__runs = {run['run_id']: run for run in self.runs}
+        self.__arrays: dict[tuple[str, str], np.ndarray] = {}
+
+    def __len__(self):
+        return len(self.runs)
+
+    def __repr__(self):
+        cls = type(self).__name__
+        return f'{cls}(path={self.path}, runs={len(self.runs)}, rows={self.lengths})'
+
+    def select(self, seed: int | None = None, params: dict | None = None, **param_values) -> list[str]:
+        """
+        Run ids by seed index, exact params, and/or single param values, e.g. `select(tick_size=0.05)`.
+        """
+        params_key = calc_params_key(params) if params is not None else None
+        return [run['run_id'] for run in self.runs
+                if (seed is None or run['seed'] == seed)
+                and (params_key is None or run['params_key'] == params_key)
+                and all(run['params'].get(name) == value for name, value in param_values.items())]
+
+    def __column(self, table: str, name: str) -> np.ndarray:
+        key = (table, name)
+        if key not in self.__arrays:
+            meta = self.columns[table][name]
+            length = self.lengths[table] - meta.get('offset', 0)
+            self.__arrays[key] = (np.memmap(os.path.join(self.path, meta['file']), dtype=meta['dtype'], mode='r',
+                                            shape=(length,)) if length else np.empty(0, dtype=meta['dtype']))
+        return self.__arrays[key]
+
+    def series(self, column: str, run_ids: list[str] | None = None, table: str = 'model') -> dict[str, np.ndarray]:
+        """
+        {run_id: values of `column`}, memory-mapped views. Category columns are codes, see `categories`.
+        """
+        data = self.__column(table, column)
+        offset = self.columns[table][column].get('offset', 0)
+        run_ids = run_ids if run_ids is not None else list(self.__runs)
+        result = {}
+        for run_id in run_ids:
+            start, end = self.__runs[run_id][table]
+            result[run_id] = data[max(start - offset, 0):max(end - offset, 0)]
+        return result
+
+    def categories(self, column: str, table: str = 'agents') -> list[str]:
+        return self.columns[table][column]['categories']
+
+    def to_dataframe(self, run_ids: list[str] | None = None, columns: list[str] | None = None, table: str = 'model'):
+        """
+        Rows of the selected runs only, with a `run_id` column.
+        """
+        import pandas as pd
+
+        run_ids = run_ids if run_ids is not None else list(self.__runs)
+        columns = columns if columns else list(self.columns[table])
+        frames = []
+        for run_id in run_ids:
+            start, end = self.__runs[run_id][table]
+            if start == end: continue
+            frame = {'run_id': run_id}
+            for column in columns:
+                values = np.asarray(self.series(column, [run_id], table)[run_id])
+                if self.columns[table][column]['kind'] == 'category':
+                    values = pd.Categorical.from_codes(values, categories=self.categories(column, table))
+                frame[column] = values
+            frames.append(pd.DataFrame(frame))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['run_id'] + columns)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Packs sweep CSV files into a memory-mapped dataset.')
+    parser.add_argument('folder')
+    parser.add_argument('--output')
+    parser.add_argument('--tables', nargs='+', choices=TABLES)
+    args = parser.parse_args()
+    print(SweepDataset(consolidate(args.folder, args.output, args.tables)))
@@ -0,0 +1,118 @@
+import os
+import hashlib
+import json
+
+import config
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'golden_trajectories.json')
+
+# name: (seed index in config.SEEDS, MarketModel params)
+CONFIGS = {
+    'balanced': (0, {'fundamentalists_number': 20, 'chartists_number': 20, 'steps_number': 40, 'tick_size': 0.05}),
+    'fundamentalists': (1, {'fundamentalists_number': 40, 'chartists_number': 5, 'steps_number': 40,
+                            'tick_size': 0.01}),
+    'chartists': (2, {'fundamentalists_number': 5, 'chartists_number': 40, 'steps_number': 40, 'tick_size': 0.5}),
+    'news': (3, {'fundamentalists_number': 15, 'chartists_number': 15, 'steps_number': 60, 'tick_size': 0.1,
+                 'scheduler_config': {'news_lambda': 0.9}}),
+}
+
+
+def _row_digest(prev: str, row: list) -> str:
+    return hashlib.sha256((prev + repr(row)).encode()).hexdigest()
+
+
+def trajectory(seed_index: int, params: dict, **model_kwargs) -> dict:
+    """
+    Runs the model and returns its reporter rows (`Price` among them) with a chained digest per step,
+    so the first divergent step is found by comparing digests only.
+    model_kwargs: options which must not change results, e.g. `price_window`, `profile`
+    """
+    if not model_kwargs.get('collect_data', True):
+        raise ValueError('Trajectories are read from the DataCollector, `collect_data` must be True.')
+    from abm_model.market_model import MarketModel, reset_class_config
+    from experiments.run_experiments import _change_seed
+
+    _change_seed(config.SEEDS[seed_index])
+    try:
+        model = MarketModel(**params, **model_kwargs)
+        model.run_model()
+    finally:
+        reset_class_config()  # e.g. `news_lambda` of the 'news' config must not leak into later models
+
+    data = model.datacollector.get_model_vars_dataframe()
+    columns = [c for c in data.columns if not c.startswith('Profile:')]
+    rows = [[v.item() if hasattr(v, 'item') else v for v in row] for row in data[columns].itertuples(index=False)]
+    digests, digest = [], ''
+    for row in rows:
+        digest = _row_digest(digest, row)
+        digests.append(digest)
+    return {'columns': columns, 'rows': rows, 'digests': digests, 'digest': digest}
+
+
+def first_divergence(golden: dict, current: dict) -> dict | None:
+    """
+    First step whose chained digest differs, with the columns that changed at it.
+    """
+    if golden['columns'] != current['columns']:
+        return {'step': None, 'reason': f"columns differ: {golden['columns']} != {current['columns']}"}
+    for step, (old, new) in enumerate(zip(golden['digests'], current['digests'])):
+        if old == new: continue
+        changes = {column: {'golden': o, 'current': n}
+                   for column, o, n in zip(golden['columns'], golden['rows'][step], current['rows'][step]) if o != n}
+        return {'step': step, 'changes': changes}
+    if len(golden['digests']) != len(current['digests']):
+        return {'step': min(len(golden['digests']), len(current['digests'])),
+                'reason': f"length differs: {len(golden['digests'])} != {len(current['digests'])}"}
+
+
+def update_golden(path: str = GOLDEN_PATH, **model_kwargs):
+    golden = {name: dict(seed=seed, params=params, **trajectory(seed, params, **model_kwargs))
+              for name, (seed, params) in CONFIGS.items()}
+    with open(path, 'w') as g_file:
+        json.dump(golden, g_file)
+
+
+def check(path: str = GOLDEN_PATH, **model_kwargs) -> dict[str, dict | None]:
+    """
+    Returns {config name: None if bit-identical to the golden trajectory, else its first divergence}.
+    """
+    with open(path, 'r') as g_file:
+        golden = json.load(g_file)
+    report = {}
+    for name, (seed, params) in CONFIGS.items():
+        if name not in golden:
+            report[name] = {'step': None, 'reason': 'no golden trajectory, run `update`'}
+            continue
+        current = trajectory(seed, params, **model_kwargs)
+        report[name] = None if current['digest'] == golden[name]['digest'] else first_divergence(golden[name], current)
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Golden-trajectory determinism checker.')
+    parser.add_argument('command', choices=['check', 'update'])
+    parser.add_argument('--golden', default=GOLDEN_PATH)
+    parser.add_argument('--model-kwargs', type=json.loads, default={},
+                        help='JSON of MarketModel options to verify, e.g. \'{"price_window": 2}\'.')
+    args = parser.parse_args()
+
+    if args.command == 'update':
+        update_golden(args.golden, **args.model_kwargs)
+        print(f'Golden trajectories written to {args.golden}')
+        sys.exit(0)
+
+    failed = False
+    for name, divergence in check(args.golden, **args.model_kwargs).items():
+        if divergence is None:
+            print(f'{name}: identical')
+            continue
+        failed = True
+        print(f"{name}: DIVERGED at step {divergence['step']}")
+        if 'reason' in divergence:
+            print(f"    {divergence['reason']}")
+        for column, values in divergence.get('changes', {}).items():
+            print(f"    {column}: {values['golden']!r} -> {values['current']!r}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,80 @@
+import os
+import json
+import tempfile
+from enum import Enum
+
+
+class JobStatus(str, Enum):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+
+def atomic_write_json(path: str, data):
+    dir_name = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix='.tmp_', dir=dir_name)
+    try:
+        with os.fdopen(fd, 'w') as tmp_file:
+            json.dump(data, tmp_file)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class SweepManifest:
+    """
+    Status of every job of a sweep, stored in `<folder>/manifest.json`.
+    The file is replaced atomically on each update, so a crash leaves either the old or the new state.
+    Jobs which were running when the sweep died are pending again after `load`.
+    `options` keeps sweep-wide settings which a resumed sweep has to reuse, e.g. `common_shocks`.
+    """
+    file_name = 'manifest.json'
+
+    def __init__(self, folder_name: str):
+        self.folder_name = folder_name
+        self.path = os.path.join(folder_name, type(self).file_name)
+        self.jobs: dict[str, dict] = {}
+        self.options: dict = {}
+        if os.path.exists(self.path):
+            self.load()
+
+    def load(self):
+        with open(self.path, 'r') as m_file:
+            data = json.load(m_file)
+        if set(data) == {'options', 'jobs'}:
+            self.options, self.jobs = data['options'], data['jobs']
+        else:  # manifests written before sweep options were saved
+            self.jobs = data
+        for job in self.jobs.values():
+            if job['status'] == JobStatus.RUNNING:
+                job['status'] = JobStatus.PENDING.value
+
+    def save(self):
+        atomic_write_json(self.path, {'options': self.options, 'jobs': self.jobs})
+
+    def add_job(self, job_id: str, seed: int, params: dict):
+        if job_id in self.jobs:
+            raise ValueError(f"Job {job_id} is already in the manifest.")
+        self.jobs[job_id] = {'seed': str(seed), 'params': params, 'status': JobStatus.PENDING.value}
+
+    def set_status(self, job_id: str, status: JobStatus, error: str | None = None):
+        job = self.jobs[job_id]
+        job['status'] = status.value
+        if error is not None:
+            job['error'] = error
+        self.save()
+
+    def unfinished(self) -> list[tuple[str, int, dict]]:
+        return [(job_id, int(job['seed']), job['params']) for job_id, job in self.jobs.items()
+                if job['status'] != JobStatus.DONE]
+
+    def counts(self) -> dict[str, int]:
+        counts = {status.value: 0 for status in JobStatus}
+        for job in self.jobs.values():
+            counts[job['status']] += 1
+        return counts
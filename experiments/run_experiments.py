@@ -1,16 +1,28 @@
 import os
 import datetime
+import glob
 import hashlib
 import json
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from time import time
 
 import config
-from abm_model.market_model import MarketModel
+from abm_model.market_model import MarketModel, class_defaults
 from abm_model.market_agent import MarketAgent
-from experiments.mertics import calculate_metrics
+from abm_model.news import NewsAgent
+from abm_model.scheduler import MarketScheduler
+from abm_model.shocks import ShockPaths, generate_shocks
+from experiments.cache import ResultCache, calc_run_key
+from experiments.manifest import JobStatus, SweepManifest
+from experiments.series import SeriesBlock
+from experiments.store import ResultsStore, calc_params_key
+from experiments.telemetry import SweepTelemetry, timed_run
 
 logger = config.get_logger(__name__, 20)
 
+COMMON_SHOCKS = ['news', 'all']
+
 
 def _floor_minutes_to_30(dt):
     year, month, day, hour, minute = dt.year, dt.month, dt.day, dt.hour, dt.minute
@@ -18,18 +30,33 @@ def _floor_minutes_to_30(dt):
     return datetime.datetime(year, month, day, hour, floored_minute, 0, 0)
 
 
-# def _calc_hash(params):
-#     params_str = json.dumps(params, sort_keys=True)
-#     hex_digest = hashlib.md5(params_str.encode()).hexdigest()
-#     return int(hex_digest, base=16) % 1000
+def _calc_hash(params):
+    params_str = json.dumps(params, sort_keys=True)
+    hex_digest = hashlib.md5(params_str.encode()).hexdigest()
+    return int(hex_digest, base=16) % 1000
 
 
 def _change_seed(new_seed):
     config.RANDOM_SEED = new_seed
     MarketAgent.update_rng(new_seed)
+    NewsAgent.update_rng(new_seed)
+
+
+def _make_folder(experiment_name: str | None = None) -> str:
+    dir_path = 'experiments_data'
+    dttm = _floor_minutes_to_30(datetime.datetime.utcnow()).strftime('%Y%m%dT%H%M')
+    folder_name = os.path.join(dir_path, dttm + '_' + experiment_name) if experiment_name else os.path.join(dir_path, dttm)
+    os.makedirs(folder_name, exist_ok=True)
+    return folder_name
 
 
-def run_experiment(params: dict, folder_name: str | None = None):
+def run_experiment(params: dict, folder_name: str | None = None, cache: ResultCache | None = None,
+                   metrics_only: bool = False, series: SeriesBlock | None = None, shocks: ShockPaths | None = None):
+    """
+    metrics_only: skip CSV files (and DataCollector unless `series`), metrics are computed online during the run
+    series: write the model reporters into the sweep's shared block
+    shocks: common news (and trader orders) of the seed, see `generate_shocks`
+    """
     if not folder_name:
         dir_path = 'experiments_data'
         dttm = _floor_minutes_to_30(datetime.datetime.utcnow()).strftime('%Y%m%dT%H%M')
@@ -37,53 +64,270 @@ def run_experiment(params: dict, folder_name: str | None = None):
         if not os.path.exists(folder_name):
             os.mkdir(folder_name)
 
-    params_hash = 0 # _calc_hash(params)
-    model = MarketModel(**params)
-    model.run_model()
-
+    params_hash = _calc_hash(params)
     seed = config.SEEDS.index(config.RANDOM_SEED)
-    with open(os.path.join(folder_name, f'{seed}_{params_hash}_params.json'), 'w') as p_file:
+    run_id = _job_id(config.RANDOM_SEED, params)
+    with open(os.path.join(folder_name, f'{run_id}_params.json'), 'w') as p_file:
         json.dump(params, p_file)
 
-    with open(os.path.join(folder_name, f'{seed}_{params_hash}_model_data.csv'), 'w') as m_file:
-        model.datacollector.get_model_vars_dataframe().to_csv(m_file, index_label='Step')
+    run_key = None
+    if cache:
+        key_params = params if shocks is None else dict(params, common_shocks=_shocks_mode(shocks))
+        run_key = calc_run_key(key_params, config.RANDOM_SEED)
+    if cache:
+        metrics = cache.get(run_key, folder_name=folder_name, prefix=f'{run_id}_',
+                            with_files=not metrics_only or series is not None)
+        if metrics:
+            if series is not None:
+                import pandas as pd
+                series.write(run_id, pd.read_csv(os.path.join(folder_name, f'{run_id}_model_data.csv')))
+            metrics.update(seed=seed)
+            return metrics
 
-    with open(os.path.join(folder_name, f'{seed}_{params_hash}_agents_data.csv'), 'w') as a_file:
-        model.datacollector.get_agent_vars_dataframe().to_csv(a_file, index_label='Step')
+    model = MarketModel(**params, collect_data=not metrics_only or series is not None, shocks=shocks)
+    model.run_model()
+    if series is not None:
+        series.write(run_id, model.datacollector.get_model_vars_dataframe())
 
-    metrics = calculate_metrics(model.datacollector.get_model_vars_dataframe())
+    files = {}
+    if not metrics_only:
+        for name, data in [('model', model.datacollector.get_model_vars_dataframe()),
+                           ('agents', model.datacollector.get_agent_vars_dataframe())]:
+            files[f'{name}_data.csv'] = os.path.join(folder_name, f'{run_id}_{name}_data.csv')
+            with open(files[f'{name}_data.csv'], 'w') as d_file:
+                data.to_csv(d_file, index_label='Step')
+
+    metrics = model.metrics.as_dict()
     metrics.update(
         tick_size=params.get('tick_size'),
-        # params_id=int(params_hash),
+        params_id=int(params_hash),
         seed=seed
     )
+    if cache:
+        cache.put(run_key, metrics, files=files)
     return metrics
 
 
 def run_experiments(params_list: list[dict], experiment_name: str | None = None):
-    dir_path = 'experiments_data'
-    dttm = _floor_minutes_to_30(datetime.datetime.utcnow()).strftime('%Y%m%dT%H%M')
-    folder_name = os.path.join(dir_path, dttm + '_' + experiment_name) if experiment_name else os.path.join(dir_path, dttm)
-
-    if not os.path.exists(folder_name):
-        os.mkdir(folder_name)
+    folder_name = _make_folder(experiment_name)
 
     logger.info(f"Starting {len(params_list)} experiments. Seed: {config.SEEDS.index(config.RANDOM_SEED)}")
     start = time()
     results = [run_experiment(param, folder_name=folder_name) for param in params_list]
     logger.info(f"Experiments finished. Time spent: {round(time() - start, 1)} seconds")
 
-    data = []
-    if os.path.exists(os.path.join(folder_name, 'metrics.json')):
-        with open(os.path.join(folder_name, 'metrics.json'), 'r') as r_file:
-            data = json.load(r_file)
-    data.extend(results)
-    with open(os.path.join(folder_name, 'metrics.json'), 'w') as w_file:
-        json.dump(data, w_file)
+    ResultsStore(folder_name).extend([(metrics, params, config.RANDOM_SEED)
+                                      for metrics, params in zip(results, params_list)])
+
+
+def _shocks_mode(shocks: ShockPaths) -> str:
+    return 'news' if shocks.activation is None else 'all'
+
+
+def _prepare_shocks(folder_name: str, manifest: SweepManifest, common_shocks: str):
+    """
+    Draws the shock paths of every seed once and saves them in the sweep folder, all jobs of the seed load them.
+    'news' shares news timing and values, 'all' also the traders' order in every step.
+    """
+    if common_shocks not in COMMON_SHOCKS:
+        raise ValueError(f"`common_shocks` must be one of {COMMON_SHOCKS}. Got {str(common_shocks)}")
+    seeds_params = defaultdict(list)
+    for job in manifest.jobs.values():
+        seeds_params[int(job['seed'])].append(job['params'])
+    for seed, params_list in seeds_params.items():
+        name = str(config.SEEDS.index(seed))
+        news_lambdas = {(params.get('scheduler_config') or {}).get('news_lambda',
+                                                                   class_defaults(MarketScheduler)['news_lambda'])
+                        for params in params_list}
+        if len(news_lambdas) > 1:
+            raise ValueError(f"Common shocks need one `news_lambda` per seed. Got {sorted(news_lambdas)}")
+        news_lambda = float(news_lambdas.pop())
+        traders_number = None
+        if common_shocks == 'all':
+            traders = {params['fundamentalists_number'] + params['chartists_number'] for params in params_list}
+            if len(traders) > 1:
+                raise ValueError(f"Common trader orders need one number of traders per seed. Got {sorted(traders)}")
+            traders_number = traders.pop()
+        steps_number = max(int(params['steps_number']) for params in params_list)
+        saved = ShockPaths.load_info(folder_name, name)
+        if (saved is not None and saved['steps'] >= steps_number and saved['news_lambda'] == news_lambda
+                and saved['traders_number'] == traders_number):
+            continue
+        # paths are drawn step by step, longer paths of the same inputs extend the saved ones
+        generate_shocks(seed, steps_number, news_lambda, traders_number).save(folder_name, name, news_lambda)
+
+
+def _run_job(seed: int, params: dict, folder_name: str, cache: ResultCache | None = None,
+             metrics_only: bool = False, series: SeriesBlock | None = None, common_shocks: str | None = None) -> dict:
+    _change_seed(seed)
+    shocks = ShockPaths.load(folder_name, str(config.SEEDS.index(seed))) if common_shocks else None
+    return run_experiment(params, folder_name=folder_name, cache=cache, metrics_only=metrics_only, series=series,
+                          shocks=shocks)
+
+
+def _check_seeds(seeds: list[int]):
+    """
+    Files, job ids and results are labeled by the seed's index in `config.SEEDS`.
+    """
+    unknown = [seed for seed in seeds if seed not in config.SEEDS]
+    if unknown:
+        raise ValueError(f"Seeds must be from `config.SEEDS`. Got {unknown}")
+
+
+def _job_id(seed: int, params: dict) -> str:
+    """
+    Also the prefix of the run's files. Keyed by the full params digest, `_calc_hash` is a short display id.
+    """
+    return f'{config.SEEDS.index(seed)}_{calc_params_key(params)}'
+
+
+def _find_sweep_folder(experiment_name: str) -> str:
+    dir_path = 'experiments_data'
+    folders = sorted(glob.glob(os.path.join(dir_path, f'*_{experiment_name}', SweepManifest.file_name)))
+    if not folders:
+        raise FileNotFoundError(f"No sweep manifest found for experiment '{experiment_name}' in {dir_path}.")
+    return os.path.dirname(folders[-1])
+
+
+def _sweep_common_shocks(manifest: SweepManifest, common_shocks: str | None) -> str | None:
+    """
+    The mode of the sweep's first run is saved in its manifest, later runs of the sweep keep it.
+    Manifests written before the mode was saved take the given one.
+    """
+    if 'common_shocks' not in manifest.options:
+        manifest.options['common_shocks'] = common_shocks
+        manifest.save()
+        return common_shocks
+    saved = manifest.options['common_shocks']
+    if common_shocks is not None and common_shocks != saved:
+        raise ValueError(f"The sweep in {manifest.folder_name} runs with `common_shocks`={saved!r}. "
+                         f"Got {common_shocks!r}")
+    return saved
+
+
+def _run_job_timed(seed: int, params: dict, folder_name: str, cache: ResultCache | None = None,
+                   metrics_only: bool = False, series: SeriesBlock | None = None,
+                   common_shocks: str | None = None) -> tuple[dict, dict]:
+    return timed_run(_run_job, seed, params, folder_name, cache, metrics_only, series, common_shocks,
+                     steps=params.get('steps_number', 0))
+
+
+def _execute_sweep(folder_name: str, manifest: SweepManifest, workers: int | None = None,
+                   cache: ResultCache | None = None, metrics_only: bool = False, series: bool = False,
+                   status_port: int | None = None, common_shocks: str | None = None) -> list[dict]:
+    workers = workers if workers else os.cpu_count()
+    common_shocks = _sweep_common_shocks(manifest, common_shocks)
+    store = ResultsStore(folder_name)
+    jobs = manifest.unfinished()
+    block = None
+    if series:
+        steps = max(int(job['params']['steps_number']) for job in manifest.jobs.values()) + 1
+        block = SeriesBlock.create(folder_name, list(manifest.jobs), steps)
+    if common_shocks:
+        _prepare_shocks(folder_name, manifest, common_shocks)
+    telemetry = SweepTelemetry(folder_name, len(manifest.jobs), pending=len(jobs), workers=workers,
+                               port=status_port)
+    logger.info(f"Starting sweep of {len(jobs)} experiments ({len(manifest.jobs)} total). Workers: {workers}")
+    start = time()
+    done = 0
+
+    def on_done(job_id: str, result: tuple[dict, dict] | None = None, error: BaseException | None = None):
+        nonlocal done
+        done += 1
+        if error:
+            logger.error(f"Job {job_id} failed: {error!r}")
+            manifest.set_status(job_id, JobStatus.FAILED, error=repr(error))
+            telemetry.job_failed(job_id, repr(error))
+        else:
+            metrics, info = result
+            job = manifest.jobs[job_id]
+            store.append(metrics, job['params'], job['seed'])
+            manifest.set_status(job_id, JobStatus.DONE)
+            telemetry.job_done(job_id, info)
+        eta = telemetry.status()['eta']
+        logger.info(f"Done {done}/{len(jobs)}. Time spent: {round(time() - start, 1)} seconds. "
+                    f"ETA: {eta} seconds.")
+
+    with telemetry:
+        if workers == 1:
+            for job_id, seed, params in jobs:
+                manifest.set_status(job_id, JobStatus.RUNNING)
+                try:
+                    on_done(job_id, result=_run_job_timed(seed, params, folder_name, cache, metrics_only, block,
+                                                          common_shocks))
+                except Exception as error:
+                    on_done(job_id, error=error)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {}
+                for job_id, seed, params in jobs:
+                    futures[executor.submit(_run_job_timed, seed, params, folder_name, cache, metrics_only,
+                                            block, common_shocks)] = job_id
+                    manifest.jobs[job_id]['status'] = JobStatus.RUNNING.value
+                manifest.save()
+                for future in as_completed(futures):
+                    try:
+                        on_done(futures[future], result=future.result())
+                    except Exception as error:
+                        on_done(futures[future], error=error)
+    logger.info(f"Sweep finished. Time spent: {round(time() - start, 1)} seconds. Jobs: {manifest.counts()}")
+
+    store.export_json(os.path.join(folder_name, 'metrics.json'))
+    return store.query()
+
+
+def run_sweep(
+        params_list: list[dict],
+        seeds: list[int] | None = None,
+        experiment_name: str | None = None,
+        workers: int | None = None,
+        cache: ResultCache | None = None,
+        metrics_only: bool = False,
+        series: bool = False,
+        status_port: int | None = None,
+        common_shocks: str | None = None,
+) -> list[dict]:
+    """
+    Runs every (seed, params) pair as an independent job on a process pool.
+    RNGs are reset from the job's seed, so results don't depend on the job order or on the worker.
+    Only the parent process writes the results store and the sweep manifest;
+    metrics.json is exported from the store once the sweep is finished.
+    Jobs found in `cache` are not simulated again.
+    With `metrics_only` runs keep no per-step data and write no CSV files.
+    With `series` the model reporters of all runs are written to a memory-mapped `SeriesBlock` in the folder.
+    Progress is written to status.json in the folder and, with `status_port`, served over local HTTP.
+    With `common_shocks` ('news' or 'all') every seed's news, and with 'all' its traders' orders, are drawn
+    once and shared by all params of the seed (common random numbers), so params effects need fewer seeds.
+    """
+    seeds = seeds if seeds else config.SEEDS
+    _check_seeds(seeds)
+    folder_name = _make_folder(experiment_name)
+    manifest = SweepManifest(folder_name)
+    existing = set(manifest.jobs)  # the folder of a sweep started within the same 30 minutes
+    for seed in seeds:
+        for params in params_list:
+            job_id = _job_id(seed, params)
+            if job_id not in existing:
+                manifest.add_job(job_id, seed, params)
+    manifest.save()
+    return _execute_sweep(folder_name, manifest, workers, cache, metrics_only, series, status_port, common_shocks)
+
+
+def resume_sweep(experiment_name: str, workers: int | None = None, cache: ResultCache | None = None,
+                 metrics_only: bool = False, series: bool = False, status_port: int | None = None,
+                 common_shocks: str | None = None) -> list[dict]:
+    """
+    Finishes pending and failed jobs of the latest sweep named `experiment_name`, in its original folder,
+    with the sweep's own `common_shocks` (passing a different one raises ValueError).
+    """
+    folder_name = _find_sweep_folder(experiment_name)
+    logger.info(f"Resuming sweep {folder_name}.")
+    return _execute_sweep(folder_name, SweepManifest(folder_name), workers, cache, metrics_only, series,
+                          status_port, common_shocks)
 
 
 if __name__ == '__main__':
-    import copy
+    import sys
     # from time import sleep
     # while True:
     #     now = datetime.datetime.now()
@@ -105,10 +349,8 @@ if __name__ == '__main__':
     ttl_experiments = len(params) * len(config.SEEDS)
     print(f"Total number of experiments: {ttl_experiments}")
     tick = time()
-    done_exp = 0
-    for seed in config.SEEDS:
-        _change_seed(seed)
-        run_experiments(params, 'final')
-        done_exp += len(params)
-        print(f"Done {done_exp}/{ttl_experiments}. Time spent: {round(time() - tick, 1)} seconds.")
+    if len(sys.argv) > 1 and sys.argv[1] == '--resume':
+        resume_sweep('final', cache=ResultCache())
+    else:
+        run_sweep(params, config.SEEDS, 'final', cache=ResultCache())
     print(f'Total time spent: {round(time() - tick)} seconds.')
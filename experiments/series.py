@@ -0,0 +1,120 @@
+import os
+import json
+import warnings
+
+import numpy as np
+
+from abm_model.market_model import MODEL_REPORTERS
+from experiments.manifest import atomic_write_json
+
+
+class SeriesBlock:
+    """
+    Model reporters of every sweep job in one (job, step, column) float64 block, a memory-mapped .npy file
+    in the sweep folder. Each worker writes its run in place, the parent and analysis code read the block
+    without unpickling or parsing CSV. Jobs not run yet and steps after a shorter run are NaN.
+    """
+    file_name = 'series.npy'
+    index_name = 'series.json'
+
+    def __init__(self, folder_name: str):
+        self.folder_name = folder_name
+        self.path = os.path.join(folder_name, self.file_name)
+        with open(os.path.join(folder_name, self.index_name), 'r') as i_file:
+            index = json.load(i_file)
+        self.job_ids: list[str] = index['job_ids']
+        self.columns: list[str] = index['columns']
+        self.steps: int = index['steps']
+        self.__job_idx = {job_id: idx for idx, job_id in enumerate(self.job_ids)}
+        self.__column_idx = {column: idx for idx, column in enumerate(self.columns)}
+
+    @classmethod
+    def create(cls, folder_name: str, job_ids: list[str], steps: int, columns: list[str] | None = None):
+        """
+        Preallocates the block, an existing block with the same jobs is reused (resumed sweeps).
+        If the jobs, steps or columns differ (e.g. a sweep extended in its folder), the rows of jobs already in
+        the block are carried over for the common steps and columns.
+        steps: the longest run, including the initial state
+        """
+        columns = columns if columns else MODEL_REPORTERS
+        index = {'job_ids': list(job_ids), 'columns': list(columns), 'steps': int(steps)}
+        index_path = os.path.join(folder_name, cls.index_name)
+        path = os.path.join(folder_name, cls.file_name)
+        old = None
+        if os.path.exists(index_path) and os.path.exists(path):
+            with open(index_path, 'r') as i_file:
+                if json.load(i_file) == index:
+                    return cls(folder_name)
+            old = cls(folder_name)
+
+        tmp_path = os.path.join(folder_name, '.tmp_' + cls.file_name)
+        block = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64,
+                                          shape=(len(job_ids), steps, len(columns)))
+        block[:] = np.nan
+        if old is not None:
+            old_block = old.array()
+            if old_block.shape != (len(old.job_ids), old.steps, len(old.columns)):
+                raise ValueError(f'{path} does not match {index_path}, the series block is inconsistent.')
+            common_steps = min(old.steps, steps)
+            column_pairs = [(new_idx, old.columns.index(column)) for new_idx, column in enumerate(columns)
+                            if column in old.columns]
+            for new_idx, job_id in enumerate(job_ids):
+                if job_id not in old.job_ids: continue
+                old_idx = old.job_ids.index(job_id)
+                for new_column, old_column in column_pairs:
+                    block[new_idx, :common_steps, new_column] = old_block[old_idx, :common_steps, old_column]
+            del old_block
+        block.flush()
+        del block
+        os.replace(tmp_path, path)
+        atomic_write_json(index_path, index)
+        return cls(folder_name)
+
+    def __len__(self):
+        return len(self.job_ids)
+
+    def __repr__(self):
+        cls = type(self).__name__
+        return f'{cls}(jobs={len(self.job_ids)}, steps={self.steps}, columns={len(self.columns)})'
+
+    def write(self, job_id: str, data):
+        """
+        data: DataFrame of model reporters, a row per step
+        """
+        values = data[self.columns].to_numpy(dtype=np.float64)[:self.steps]
+        block = np.load(self.path, mmap_mode='r+')
+        block[self.__job_idx[job_id], :len(values)] = values
+        block.flush()
+        del block
+
+    def array(self) -> np.ndarray:
+        """
+        Read-only view of the whole block, (job, step, column).
+        """
+        return np.load(self.path, mmap_mode='r')
+
+    def column(self, name: str, job_ids: list[str] | None = None) -> np.ndarray:
+        """
+        (job, step) array of one reporter, for all jobs or for `job_ids` in their order.
+        """
+        block = self.array()
+        if job_ids is None:
+            return block[:, :, self.__column_idx[name]]
+        return block[[self.__job_idx[job_id] for job_id in job_ids], :, self.__column_idx[name]]
+
+    def cross_run_stats(self, name: str, job_ids: list[str] | None = None,
+                        quantiles: tuple[float, ...] = (0.05, 0.5, 0.95)) -> dict[str, np.ndarray]:
+        """
+        Per-step statistics of one reporter across runs, jobs without data are ignored.
+        """
+        values = self.column(name, job_ids)
+        values = values[~np.isnan(values).all(axis=1)]
+        stats = {'runs': np.count_nonzero(~np.isnan(values), axis=0)}
+        if not len(values):
+            return dict(stats, mean=np.full(self.steps, np.nan), std=np.full(self.steps, np.nan))
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # steps no run reached
+            stats.update(mean=np.nanmean(values, axis=0), std=np.nanstd(values, axis=0))
+            for q, row in zip(quantiles, np.nanquantile(values, quantiles, axis=0)):
+                stats[f'q{q:g}'] = row
+        return stats
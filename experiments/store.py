@@ -0,0 +1,116 @@
+import os
+import hashlib
+import json
+import sqlite3
+import time
+
+import config
+
+logger = config.get_logger(__name__)
+
+
+def calc_params_key(params: dict) -> str:
+    return hashlib.md5(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+class ResultsStore:
+    """
+    SQLite table of run metrics, one row per (seed, params).
+    Rows are appended in their own transactions, so many writers can share one file without losing results,
+    and seed or params lookups go through indexes instead of reading every result.
+    """
+    file_name = 'results.sqlite'
+
+    def __init__(self, path: str, timeout: float = 60.):
+        if os.path.isdir(path):
+            path = os.path.join(path, type(self).file_name)
+        self.path = path
+        self.timeout = timeout
+        self.__conn: sqlite3.Connection | None = None
+        self.__pid: int | None = None
+        self._create()
+
+    def __getstate__(self):
+        return {'path': self.path, 'timeout': self.timeout}
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self.__conn is None or self.__pid != os.getpid():
+            self.__conn = sqlite3.connect(self.path, timeout=self.timeout)
+            self.__conn.execute('PRAGMA journal_mode=WAL')
+            self.__pid = os.getpid()
+        return self.__conn
+
+    def _create(self):
+        with self.conn:
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    seed INTEGER NOT NULL,
+                    seed_value TEXT,
+                    params_key TEXT NOT NULL,
+                    params_id INTEGER,
+                    tick_size REAL,
+                    params TEXT NOT NULL,
+                    metrics TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    PRIMARY KEY (seed, params_key)
+                )""")
+            self.conn.execute('CREATE INDEX IF NOT EXISTS results_params ON results (params_key)')
+
+    def append(self, metrics: dict, params: dict, seed_value: int | None = None):
+        self.extend([(metrics, params, seed_value)])
+
+    def extend(self, rows: list[tuple[dict, dict, int | None]]):
+        with self.conn:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(metrics['seed'], str(seed_value) if seed_value else None, calc_params_key(params),
+                  metrics.get('params_id'), params.get('tick_size'), json.dumps(params, sort_keys=True),
+                  json.dumps(metrics), time.time())
+                 for metrics, params, seed_value in rows]
+            )
+
+    def query(self, seed: int | None = None, params: dict | None = None) -> list[dict]:
+        """
+        seed: index in `config.SEEDS`
+        """
+        conditions, args = [], []
+        if seed is not None:
+            conditions.append('seed = ?')
+            args.append(seed)
+        if params is not None:
+            conditions.append('params_key = ?')
+            args.append(calc_params_key(params))
+        where = f' WHERE {" AND ".join(conditions)}' if conditions else ''
+        rows = self.conn.execute(f'SELECT metrics FROM results{where} ORDER BY seed, params_id', args)
+        return [json.loads(metrics) for metrics, in rows]
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM results').fetchone()[0]
+
+    def to_dataframe(self, seed: int | None = None, params: dict | None = None):
+        import pandas as pd
+
+        return pd.DataFrame(self.query(seed=seed, params=params))
+
+    def export_json(self, path: str):
+        from experiments.manifest import atomic_write_json
+
+        atomic_write_json(path, self.query())
+
+
+def load_metrics(folder_name: str):
+    """
+    DataFrame with the metrics of every run in the experiment folder.
+    Falls back to metrics.json for folders written before the results store existed.
+    """
+    store_path = os.path.join(folder_name, ResultsStore.file_name)
+    if os.path.exists(store_path):
+        return ResultsStore(store_path).to_dataframe()
+    import pandas as pd
+
+    with open(os.path.join(folder_name, 'metrics.json'), 'r') as m_file:
+        return pd.DataFrame(json.load(m_file))
@@ -0,0 +1,152 @@
+import os
+import json
+import platform
+import resource
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+from experiments.manifest import atomic_write_json
+
+logger = config.get_logger(__name__, 20)
+
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 ** 2 if platform.system() == 'Darwin' else 1024), 1)
+
+
+def timed_run(func, *args, steps: int = 0) -> tuple[object, dict]:
+    """
+    Runs `func(*args)` in a worker and returns its result with the run info `SweepTelemetry` expects.
+    Peak RSS is the worker's high-water mark after the run.
+    """
+    start = time.perf_counter()
+    result = func(*args)
+    wall_time = time.perf_counter() - start
+    return result, {'pid': os.getpid(), 'wall_time': round(wall_time, 4), 'steps': int(steps),
+                    'peak_rss_mb': peak_rss_mb()}
+
+
+class SweepTelemetry:
+    """
+    Progress of a sweep: job counts, ETA, steps/sec per worker and wall time and peak memory per run.
+    The status is written to `status.json` in the sweep folder every `interval` seconds and,
+    with `port`, served as JSON on http://127.0.0.1:<port>/ (port 0 picks a free one, see `address`).
+    """
+    file_name = 'status.json'
+
+    def __init__(self, folder_name: str, total: int, pending: int | None = None, workers: int = 1,
+                 interval: float = 5., port: int | None = None):
+        self.path = os.path.join(folder_name, self.file_name)
+        self.total = total
+        self.workers = workers
+        self.interval = interval
+        self.port = port
+        self.started = time.time()
+        self.__session_jobs = total if pending is None else pending
+        self.__done = self.__failed = 0
+        self.__runs: dict[str, dict] = {}
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread: threading.Thread | None = None
+        self.__server: ThreadingHTTPServer | None = None
+
+    @property
+    def address(self) -> tuple[str, int] | None:
+        return self.__server.server_address if self.__server else None
+
+    def job_done(self, job_id: str, info: dict | None = None):
+        with self.__lock:
+            self.__done += 1
+            self.__runs[job_id] = dict(info or {}, status='done')
+
+    def job_failed(self, job_id: str, error: str | None = None):
+        with self.__lock:
+            self.__failed += 1
+            self.__runs[job_id] = {'status': 'failed', 'error': error}
+
+    def status(self) -> dict:
+        with self.__lock:
+            finished = self.__done + self.__failed
+            remaining = self.__session_jobs - finished
+            elapsed = time.time() - self.started
+            workers = defaultdict(lambda: {'runs': 0, 'steps': 0, 'wall_time': 0.})
+            for run in self.__runs.values():
+                if run['status'] != 'done' or 'pid' not in run: continue
+                worker = workers[str(run['pid'])]
+                worker['runs'] += 1
+                worker['steps'] += run['steps']
+                worker['wall_time'] += run['wall_time']
+            for worker in workers.values():
+                worker['steps_per_sec'] = round(worker['steps'] / worker['wall_time'], 2) if worker['wall_time'] else None
+                worker['wall_time'] = round(worker['wall_time'], 2)
+            return {
+                'updated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'elapsed': round(elapsed, 1),
+                'jobs': {
+                    'total': self.total,
+                    'done': self.__done,
+                    'failed': self.__failed,
+                    'pending': remaining,
+                    'finished before': self.total - self.__session_jobs,
+                },
+                'eta': round(elapsed / finished * remaining, 1) if finished else None,
+                'workers': dict(workers),
+                'runs': dict(self.__runs),
+            }
+
+    def write(self):
+        atomic_write_json(self.path, self.status())
+
+    def __loop(self):
+        while not self.__stop.wait(self.interval):
+            try:
+                self.write()
+            except OSError as error:
+                logger.warning(f'Status file was not written: {error!r}')
+
+    def __serve(self):
+        telemetry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(telemetry.status()).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        logger.info(f'Sweep status on http://{self.address[0]}:{self.address[1]}/')
+
+    def start(self):
+        self.write()
+        self.__thread = threading.Thread(target=self.__loop, daemon=True)
+        self.__thread.start()
+        if self.port is not None:
+            self.__serve()
+        return self
+
+    def stop(self):
+        self.__stop.set()
+        if self.__thread:
+            self.__thread.join()
+        if self.__server:
+            self.__server.shutdown()
+            self.__server.server_close()
+        self.write()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
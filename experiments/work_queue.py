@@ -0,0 +1,217 @@
+import os
+import glob
+import json
+import socket
+import threading
+import time
+from multiprocessing import Process
+
+import config
+from experiments.cache import ResultCache
+from experiments.manifest import atomic_write_json
+from experiments.run_experiments import _check_seeds, _job_id, _make_folder, _run_job
+from experiments.store import ResultsStore
+
+logger = config.get_logger(__name__, 20)
+
+STATES = ['pending', 'claimed', 'done', 'failed']
+
+
+class WorkQueue:
+    """
+    Job queue kept as files in `<folder>/queue/{pending,claimed,done,failed}`, for workers on any node
+    sharing the filesystem. A job is claimed by renaming its file from `pending` to `claimed`: rename is atomic,
+    so exactly one worker wins. Claims are refreshed by a heartbeat and moved back to `pending` once stale.
+    """
+
+    def __init__(self, folder_name: str):
+        self.folder_name = folder_name
+        self.queue_dir = os.path.join(folder_name, 'queue')
+        for state in STATES:
+            os.makedirs(os.path.join(self.queue_dir, state), exist_ok=True)
+        self.owner = f'{socket.gethostname()}-{os.getpid()}'
+
+    def _path(self, state: str, name: str) -> str:
+        return os.path.join(self.queue_dir, state, name)
+
+    def _files(self, state: str) -> list[str]:
+        return sorted(glob.glob(self._path(state, '*.json')))
+
+    def submit(self, params_list: list[dict], seeds: list[int] | None = None) -> int:
+        seeds = seeds if seeds else config.SEEDS
+        _check_seeds(seeds)
+        submitted = 0
+        for seed in seeds:
+            for params in params_list:
+                job_id = _job_id(seed, params)
+                if any(os.path.exists(self._path(state, f'{job_id}.json')) for state in ['pending', 'done']):
+                    continue
+                if glob.glob(self._path('claimed', f'{job_id}@*.json')):
+                    continue
+                atomic_write_json(self._path('pending', f'{job_id}.json'),
+                                  {'job_id': job_id, 'seed': str(seed), 'params': params})
+                submitted += 1
+        return submitted
+
+    def claim(self) -> tuple[dict, str] | None:
+        """
+        Returns the job and the path of its claim file.
+        """
+        for path in self._files('pending'):
+            job_id = os.path.basename(path)[:-len('.json')]
+            claim_path = self._path('claimed', f'{job_id}@{self.owner}.json')
+            try:
+                os.utime(path)  # rename keeps mtime, an old pending file would be a stale claim at once
+                os.rename(path, claim_path)
+                with open(claim_path, 'r') as j_file:
+                    return json.load(j_file), claim_path
+            except FileNotFoundError:  # claimed by another worker or recovered in between
+                continue
+
+    def complete(self, job: dict, claim_path: str, metrics: dict):
+        atomic_write_json(self._path('done', f'{job["job_id"]}.json'), dict(job, metrics=metrics))
+        self._release(claim_path)
+
+    def fail(self, job: dict, claim_path: str, error: BaseException):
+        atomic_write_json(self._path('failed', f'{job["job_id"]}.json'), dict(job, error=repr(error)))
+        self._release(claim_path)
+
+    @staticmethod
+    def _release(claim_path: str):
+        try:
+            os.remove(claim_path)
+        except FileNotFoundError:
+            pass
+
+    def retry_failed(self) -> int:
+        failed = self._files('failed')
+        for path in failed:
+            os.rename(path, self._path('pending', os.path.basename(path)))
+        return len(failed)
+
+    def recover_stale(self, stale_after: float = 600.) -> int:
+        """
+        Moves claims without a heartbeat for `stale_after` seconds back to pending.
+        """
+        recovered = 0
+        now = time.time()
+        for path in self._files('claimed'):
+            try:
+                if now - os.path.getmtime(path) < stale_after: continue
+                job_id = os.path.basename(path).split('@')[0]
+                if os.path.exists(self._path('done', f'{job_id}.json')):
+                    os.remove(path)
+                    continue
+                os.rename(path, self._path('pending', f'{job_id}.json'))
+                recovered += 1
+            except FileNotFoundError:
+                continue
+        if recovered:
+            logger.info(f'Recovered {recovered} stale jobs.')
+        return recovered
+
+    def counts(self) -> dict[str, int]:
+        return {state: len(self._files(state)) for state in STATES}
+
+    def collect(self) -> ResultsStore:
+        """
+        Loads results of done jobs into the folder's results store and exports metrics.json.
+        Should be called by a single process, when workers are finished.
+        """
+        store = ResultsStore(self.folder_name)
+        rows = []
+        for path in self._files('done'):
+            with open(path, 'r') as j_file:
+                job = json.load(j_file)
+            rows.append((job['metrics'], job['params'], job['seed']))
+        store.extend(rows)
+        store.export_json(os.path.join(self.folder_name, 'metrics.json'))
+        return store
+
+
+def _heartbeat(claim_path: str, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            os.utime(claim_path)
+        except FileNotFoundError:
+            return
+
+
+def _worker_loop(folder_name: str, cache: ResultCache | None, metrics_only: bool, heartbeat: float,
+                 stale_after: float):
+    queue = WorkQueue(folder_name)
+    done = 0
+    while True:
+        queue.recover_stale(stale_after)
+        claimed = queue.claim()
+        if not claimed: break
+        job, claim_path = claimed
+        stop = threading.Event()
+        beat = threading.Thread(target=_heartbeat, args=(claim_path, heartbeat, stop), daemon=True)
+        beat.start()
+        try:
+            metrics = _run_job(int(job['seed']), job['params'], folder_name, cache, metrics_only)
+        except Exception as error:
+            logger.error(f"Job {job['job_id']} failed: {error!r}")
+            queue.fail(job, claim_path, error)
+        else:
+            queue.complete(job, claim_path, metrics)
+            done += 1
+        finally:
+            stop.set()
+            beat.join()
+    logger.info(f'Worker {queue.owner} finished. Jobs done: {done}.')
+
+
+def run_worker(folder_name: str, workers: int = 1, cache: ResultCache | None = None, metrics_only: bool = False,
+               heartbeat: float = 30., stale_after: float = 600.):
+    """
+    Runs `workers` processes on this node, each claiming jobs from the queue until it is empty.
+    `stale_after` has to be well above `heartbeat`.
+    """
+    if workers == 1:
+        _worker_loop(folder_name, cache, metrics_only, heartbeat, stale_after)
+        return
+    processes = [Process(target=_worker_loop, args=(folder_name, cache, metrics_only, heartbeat, stale_after))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Shared-filesystem sweep queue.')
+    parser.add_argument('command', choices=['submit', 'worker', 'recover', 'retry', 'collect', 'status'])
+    parser.add_argument('--folder', help='Sweep folder on the shared filesystem.')
+    parser.add_argument('--name', help='Experiment name of a new sweep folder (submit).')
+    parser.add_argument('--tick-sizes', type=float, nargs='+', default=[0.01, 0.05, 0.1, 0.2, 0.5])
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--metrics-only', action='store_true')
+    parser.add_argument('--cache', help='Result cache directory on the shared filesystem.')
+    parser.add_argument('--stale-after', type=float, default=600.)
+    args = parser.parse_args()
+
+    match args.command:
+        case 'submit':
+            folder = args.folder if args.folder else _make_folder(args.name)
+            params = [{
+                'fundamentalists_number': 100,
+                'chartists_number': 100,
+                'steps_number': 252,
+                'tick_size': tick_size,
+            } for tick_size in args.tick_sizes]
+            print(f'Submitted {WorkQueue(folder).submit(params)} jobs to {folder}')
+        case 'worker':
+            run_worker(args.folder, args.workers, ResultCache(args.cache) if args.cache else None,
+                       args.metrics_only, stale_after=args.stale_after)
+        case 'recover':
+            print(f'Recovered {WorkQueue(args.folder).recover_stale(args.stale_after)} jobs')
+        case 'retry':
+            print(f'Moved {WorkQueue(args.folder).retry_failed()} failed jobs to pending')
+        case 'collect':
+            print(f'Collected {len(WorkQueue(args.folder).collect())} results')
+        case 'status':
+            print(WorkQueue(args.folder).counts())
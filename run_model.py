@@ -1,15 +1,130 @@
-from abm_model.market_model import MarketModel
+import argparse
+import json
+import logging
+import os
+import sys
 
+import config
 
-def run():
-    model = MarketModel(
-        fundamentalists_number=0,
-        chartists_number=1,
-        steps_number=30,
-        initial_market_price=100.,
-    )
+# Model, mesa and pandas are imported inside the commands: `--help` and argument errors return at once,
+# and `--log-level` is applied before the model modules create their loggers.
+
+
+def _add_model_args(parser: argparse.ArgumentParser, defaults: dict):
+    parser.add_argument('--fundamentalists', type=int, default=defaults['fundamentalists_number'])
+    parser.add_argument('--chartists', type=int, default=defaults['chartists_number'])
+    parser.add_argument('--steps', type=int, default=defaults['steps_number'])
+    parser.add_argument('--initial-price', type=float, default=100.)
+    parser.add_argument('--fundamentalists-config', type=json.loads, help='JSON of FundamentalistAgent attributes.')
+    parser.add_argument('--chartists-config', type=json.loads, help='JSON of ChartistAgent attributes.')
+    parser.add_argument('--scheduler-config', type=json.loads, help='JSON of MarketScheduler attributes.')
+    parser.add_argument('--market-makers', type=int, default=1)
+    parser.add_argument('--market-maker-config', type=json.loads,
+                        help='JSON of MarketMaker attributes, e.g. \'{"quote_levels": 3, "incremental_quotes": true}\'.')
+
+
+def _model_params(args: argparse.Namespace) -> dict:
+    params = {
+        'fundamentalists_number': args.fundamentalists,
+        'chartists_number': args.chartists,
+        'steps_number': args.steps,
+        'initial_market_price': args.initial_price,
+    }
+    if args.market_makers != 1:
+        params['market_makers_number'] = args.market_makers
+    for name in ['fundamentalists_config', 'chartists_config', 'scheduler_config', 'market_maker_config']:
+        if getattr(args, name):
+            params[name] = getattr(args, name)
+    return params
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Agent-based model of a financial market.')
+    parser.add_argument('--log-level', default=logging.getLevelName(config.LOGGING_LEVEL),
+                        choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'])
+    commands = parser.add_subparsers(dest='command')
+
+    single = commands.add_parser('run', help='Single model run, metrics-only unless --export or --show.')
+    _add_model_args(single, {'fundamentalists_number': 0, 'chartists_number': 1, 'steps_number': 30})
+    single.add_argument('--tick-size', type=float, default=0.05)
+    single.add_argument('--seed', type=int, help='Index in config.SEEDS.')
+    single.add_argument('--extended-metrics', action='store_true')
+    single.add_argument('--decision-workers', type=int,
+                        help='Traders decide on a step-start market snapshot in this many processes.')
+    single.add_argument('--decision-batch', type=int, help='With --decision-workers, re-snapshot every N traders.')
+    single.add_argument('--export', nargs='+', choices=['model', 'agents'], default=[],
+                        help='Write DataCollector data to CSV in --output-dir.')
+    single.add_argument('--output-dir', default='.')
+    single.add_argument('--show', action='store_true', help='Print model data.')
+
+    sweep = commands.add_parser('sweep', help='Seeds x tick sizes sweep on a process pool.')
+    _add_model_args(sweep, {'fundamentalists_number': 100, 'chartists_number': 100, 'steps_number': 252})
+    sweep.add_argument('--tick-sizes', type=float, nargs='+', default=[0.01, 0.05, 0.1, 0.2, 0.5])
+    sweep.add_argument('--seeds', type=int, default=len(config.SEEDS), help='Number of config.SEEDS to use.')
+    sweep.add_argument('--name', help='Experiment name.')
+    sweep.add_argument('--workers', type=int)
+    sweep.add_argument('--metrics-only', action='store_true', help='Skip DataCollector, compute metrics online.')
+    sweep.add_argument('--cache', help='Result cache directory.')
+    sweep.add_argument('--resume', action='store_true', help='Finish pending jobs of the sweep --name.')
+    sweep.add_argument('--status-port', type=int, help='Serve sweep progress on http://127.0.0.1:<port>/.')
+    sweep.add_argument('--common-shocks', choices=['news', 'all'],
+                       help='Share news (and with "all" trader orders) of a seed across params.')
+    sweep.add_argument('--series', action='store_true',
+                       help='Write model reporters of all runs to a memory-mapped series.npy block.')
+    return parser
+
+
+def _run_single(args: argparse.Namespace):
+    from abm_model.market_model import MarketModel
+
+    if args.seed is not None:
+        from experiments.run_experiments import _change_seed
+        _change_seed(config.SEEDS[args.seed])
+
+    metrics_only = not (args.export or args.show)
+    model = MarketModel(**_model_params(args), tick_size=args.tick_size, collect_data=not metrics_only,
+                        extended_metrics=args.extended_metrics, decision_workers=args.decision_workers,
+                        decision_batch=args.decision_batch)
     model.run_model()
-    print(model.datacollector.get_model_vars_dataframe())
+    print(json.dumps(model.metrics.as_dict()))
+
+    if args.show:
+        print(model.datacollector.get_model_vars_dataframe())
+    for name in args.export:
+        data = (model.datacollector.get_model_vars_dataframe() if name == 'model'
+                else model.datacollector.get_agent_vars_dataframe())
+        data.to_csv(os.path.join(args.output_dir, f'{name}_data.csv'), index_label='Step')
+
+
+def _run_sweep(args: argparse.Namespace):
+    from experiments.cache import ResultCache
+    from experiments.run_experiments import resume_sweep, run_sweep
+
+    cache = ResultCache(args.cache) if args.cache else None
+    if args.resume:
+        if not args.name:
+            raise ValueError('`--name` is required to resume a sweep.')
+        resume_sweep(args.name, args.workers, cache, args.metrics_only, args.series, args.status_port,
+                     args.common_shocks)
+        return
+    params = [dict(_model_params(args), tick_size=tick_size) for tick_size in args.tick_sizes]
+    run_sweep(params, config.SEEDS[:args.seeds], args.name, args.workers, cache, args.metrics_only, args.series,
+              args.status_port, args.common_shocks)
+
+
+def run(argv: list[str] | None = None):
+    argv = sys.argv[1:] if argv is None else argv
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if args.command is None:
+        args = parser.parse_args(argv + ['run', '--show'])
+    config.LOGGING_LEVEL = logging.getLevelName(args.log_level)
+
+    match args.command:
+        case 'run':
+            _run_single(args)
+        case 'sweep':
+            _run_sweep(args)
 
 
 if __name__ == '__main__':
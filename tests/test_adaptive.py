@@ -0,0 +1,10 @@
+import math
+
+from experiments.adaptive import is_converged
+
+
+def test_nan_half_width_is_not_converged():
+    results = [{'spread': 0.1}, {'spread': 0.1}, {'spread': 0.1}]
+    assert is_converged(results, ['spread'], tolerance=0.05)
+    assert not is_converged(results + [{'spread': math.nan}], ['spread'], tolerance=0.05)
+    assert not is_converged(results[:1], ['spread'], tolerance=0.05)
@@ -0,0 +1,44 @@
+import os
+import time
+
+from abm_model.market_model import MarketModel
+from experiments.cache import ResultCache, calc_run_key
+
+PARAMS = {'fundamentalists_number': 5, 'chartists_number': 5, 'steps_number': 5, 'tick_size': 0.05}
+
+
+def test_key_is_stable_across_models():
+    key = calc_run_key(PARAMS, 1)
+    MarketModel(**PARAMS, scheduler_config={'news_lambda': 0.9})
+    assert calc_run_key(PARAMS, 1) == key
+    assert calc_run_key(dict(PARAMS, scheduler_config={'news_lambda': 0.9}), 1) != key
+    assert calc_run_key(PARAMS, 2) != key
+    MarketModel(**PARAMS)
+    assert calc_run_key(PARAMS, 1) == key
+
+
+def test_hit_and_miss(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    key = calc_run_key(PARAMS, 1)
+    assert cache.get(key, with_files=False) is None
+    cache.put(key, {'spread': 0.1})
+    assert key in cache
+    assert cache.get(key, with_files=False) == {'spread': 0.1}
+    assert cache.get(key) is None  # metrics-only entry, the data files are missing
+    assert cache.get(calc_run_key(PARAMS, 2), with_files=False) is None
+
+
+def test_eviction_by_age_and_size(tmp_path):
+    cache = ResultCache(str(tmp_path / 'cache'))
+    keys = [calc_run_key(PARAMS, seed) for seed in range(3)]
+    now = time.time()
+    for age, key in zip([300, 200, 100], keys):
+        cache.put(key, {'spread': 0.1})
+        os.utime(cache._entry_path(key), (now - age, now - age))
+    assert cache.evict(max_age=250) == 1
+    assert keys[0] not in cache and keys[1] in cache
+
+    cache.get(keys[1], with_files=False)  # the hit makes the older entry the most recently used
+    size = sum(entry[2] for entry in cache._entries())
+    assert cache.evict(max_size=size - 1) == 1
+    assert keys[1] in cache and keys[2] not in cache
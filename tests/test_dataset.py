@@ -0,0 +1,42 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from experiments.dataset import SweepDataset, consolidate
+
+
+def test_consolidate_and_read(tmp_path):
+    for run_id, tick_size, prices in [('0_1', 0.05, [100., 101.]), ('1_2', 0.1, [100., 99., 98.])]:
+        with open(tmp_path / f'{run_id}_params.json', 'w') as p_file:
+            json.dump({'steps_number': len(prices) - 1, 'tick_size': tick_size}, p_file)
+        pd.DataFrame({'Price': prices, 'Positive news occurred': [False] * len(prices)}).to_csv(
+            tmp_path / f'{run_id}_model_data.csv', index_label='Step')
+        agents = pd.DataFrame({'Type': ['MarketMaker', 'ChartistAgent'], 'Is optimist': [None, True]},
+                              index=pd.MultiIndex.from_tuples([(0, 1), (0, 2)], names=['Step', 'AgentID']))
+        agents.to_csv(tmp_path / f'{run_id}_agents_data.csv', index_label='Step')
+
+    dataset = SweepDataset(consolidate(str(tmp_path)))
+    assert dataset.select(tick_size=0.1) == ['1_2'] and dataset.select(seed=0) == ['0_1']
+    assert dataset.series('Price', ['1_2'])['1_2'].tolist() == [100., 99., 98.]
+    agents = dataset.to_dataframe(['0_1'], table='agents')
+    assert agents['AgentID'].tolist() == [1, 2] and agents['Type'].tolist() == ['MarketMaker', 'ChartistAgent']
+    assert np.isnan(agents['Is optimist'][0]) and agents['Is optimist'][1] == 1.
+
+
+def test_integer_columns_widen_on_gaps(tmp_path):
+    runs = [('0_1', {'Price': [100., 101.], 'Transactions': [0, 3]}),
+            ('1_2', {'Price': [100., 99.], 'Transactions': [2, None]}),
+            ('2_3', {'Price': [100., 98.]}),
+            ('3_4', {'Price': [100., 97.], 'Transactions': [1, 4]})]
+    for idx, (run_id, columns) in enumerate(runs):
+        with open(tmp_path / f'{run_id}_params.json', 'w') as p_file:
+            json.dump({'steps_number': 1, 'tick_size': 0.05 * (idx + 1)}, p_file)
+        pd.DataFrame(columns).to_csv(tmp_path / f'{run_id}_model_data.csv', index_label='Step')
+
+    dataset = SweepDataset(consolidate(str(tmp_path), tables=['model']))
+    transactions = dataset.series('Transactions')
+    assert transactions['0_1'].tolist() == [0., 3.] and transactions['3_4'].tolist() == [1., 4.]
+    assert transactions['1_2'][0] == 2. and np.isnan(transactions['1_2'][1])
+    assert np.isnan(transactions['2_3']).all()
+    assert dataset.series('Step')['3_4'].tolist() == [0, 1]
@@ -0,0 +1,117 @@
+import numpy as np
+import pytest
+
+import config
+from abm_model.chartist import ChartistAgent
+from abm_model.decisions import DECISION, DecisionPool, apply_decision, decide_block, snapshot
+from abm_model.fundamentalist import FundamentalistAgent
+from abm_model.market_agent import MarketAgent
+from abm_model.market_model import MarketModel
+from experiments.run_experiments import _change_seed
+
+
+def _prices(**kwargs):
+    _change_seed(config.SEEDS[0])
+    model = MarketModel(fundamentalists_number=20, chartists_number=20, steps_number=10, **kwargs)
+    model.run_model()
+    return list(model.prices)
+
+
+def test_decisions_do_not_depend_on_workers():
+    assert _prices(decision_workers=1, decision_batch=15) == _prices(decision_workers=2, decision_batch=15)
+    assert len(_prices(decision_workers=1)) == 11
+
+
+class _Draws:
+    """
+    Fixed standard draws per trader, served as the vectorized block's streams or as one agent's `RNG` calls.
+    """
+
+    def __init__(self, traders_number: int, seed: int):
+        rng = np.random.default_rng(seed)
+        self.uniform = rng.random(traders_number)
+        self.laplace_z = rng.laplace(0., 1., traders_number)
+        self.normal_z = rng.normal(0., 1., traders_number)
+        self.trader = None
+
+    # `decide_block` draws for all traders at once
+    def random(self, n):
+        return self.uniform[:n]
+
+    def laplace(self, loc, scale, n=None):
+        return loc + scale * (self.laplace_z[:n] if n is not None else self.laplace_z[self.trader])
+
+    def normal(self, loc, scale, n=None):
+        return loc + scale * (self.normal_z[:n] if n is not None else self.normal_z[self.trader])
+
+    # `ChartistAgent.__evaluate_opinion`
+    def choice(self, options, p):
+        return options[1] if self.uniform[self.trader] < p[1] else options[0]
+
+
+class _RecordingBook:
+    """
+    Reads the real book, records cancels and orders without changing it, so every trader sees the same book.
+    """
+
+    def __init__(self, order_book):
+        self.order_book = order_book
+        self.calls = []
+
+    def __getattr__(self, name):
+        return getattr(self.order_book, name)
+
+    def cancel_limit_orders(self, agent_id, side='both'):
+        self.calls.append(('cancel', agent_id, side))
+
+    def place_order(self, agent_id, action, price, quantity):
+        self.calls.append(('order', agent_id, action, pytest.approx(price), quantity))
+
+
+def _restore(trader, model, state):
+    fundamental_price, is_optimistic, optimists = state
+    if isinstance(trader, ChartistAgent):
+        trader._ChartistAgent__is_optimistic = is_optimistic
+    else:
+        trader._fundamental_price = fundamental_price
+    model._optimistic_chartists_number = optimists
+
+
+@pytest.mark.parametrize('news', [None, 0.7])
+def test_decide_block_matches_agent_steps(monkeypatch, news):
+    assert all('RNG' not in vars(cls) for cls in [FundamentalistAgent, ChartistAgent])
+    _change_seed(config.SEEDS[1])
+    model = MarketModel(fundamentalists_number=30, chartists_number=30, steps_number=40, tick_size=0.05)
+    for _ in range(25):
+        model.step()
+    if news is not None:
+        model.news_event_value = news
+
+    traders = tuple(model.get_agents_of_type(FundamentalistAgent)) + tuple(model.get_agents_of_type(ChartistAgent))
+    positions = np.arange(len(traders))
+    snap = snapshot(model)
+    pool = DecisionPool(traders)
+    pool.decide(positions, snap, seed=0)  # gathers the traders' state
+    out = np.zeros((len(DECISION), len(traders)))
+    draws = _Draws(len(traders), seed=2)
+    decide_block(pool.state, out, positions, snap, draws)
+
+    monkeypatch.setattr(MarketAgent, 'RNG', draws)
+    book = _RecordingBook(model.order_book)
+    monkeypatch.setattr(model, 'order_book', book)
+    placed = 0
+    for idx, trader in enumerate(traders):
+        state = (trader._fundamental_price if isinstance(trader, FundamentalistAgent) else None,
+                 getattr(trader, 'is_optimistic', None), model._optimistic_chartists_number)
+        draws.trader = idx
+        book.calls = []
+        trader.step()
+        expected = book.calls
+        _restore(trader, model, state)
+
+        book.calls = []
+        apply_decision(trader, out[:, idx], book)
+        _restore(trader, model, state)
+        assert book.calls == expected, f'{type(trader).__name__} {trader.unique_id}'
+        placed += sum(call[0] == 'order' for call in expected)
+    assert placed > len(traders) // 2
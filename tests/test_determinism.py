@@ -0,0 +1,8 @@
+from abm_model.scheduler import MarketScheduler
+from experiments.determinism import CONFIGS, check
+
+
+def test_golden_trajectories():
+    news_lambda = MarketScheduler.news_lambda
+    assert check() == {name: None for name in CONFIGS}
+    assert MarketScheduler.news_lambda == news_lambda
@@ -0,0 +1,47 @@
+import numpy as np
+
+from abm_model.ensemble import EnsembleModel, batch_clear
+from abm_model.market_model import BOOL_REPORTERS, MarketModel
+
+
+def _brute_force_volume(bid_p, bid_q, ask_p, ask_q, price):
+    return min(bid_q[bid_p >= price].sum(), ask_q[ask_p <= price].sum())
+
+
+def test_batch_clear_matches_brute_force():
+    rng = np.random.default_rng(0)
+    replicas, n_bids, n_asks = 200, 6, 5
+    bid_p = rng.integers(90, 111, (replicas, n_bids)) * 0.5
+    ask_p = rng.integers(90, 111, (replicas, n_asks)) * 0.5
+    bid_q = rng.integers(0, 4, (replicas, n_bids)).astype(float)
+    ask_q = rng.integers(0, 4, (replicas, n_asks)).astype(float)
+    last_price = rng.integers(90, 111, replicas) * 0.5
+
+    price, volume, bid_fill, ask_fill = batch_clear(bid_p, bid_q, ask_p, ask_q, last_price)
+    for r in range(replicas):
+        candidates = np.concatenate([bid_p[r][bid_q[r] > 0], ask_p[r][ask_q[r] > 0]])
+        volumes = [_brute_force_volume(bid_p[r], bid_q[r], ask_p[r], ask_q[r], p) for p in candidates]
+        best_volume = max(volumes, default=0)
+        assert volume[r] == best_volume
+        if best_volume == 0:
+            assert np.isnan(price[r])
+            continue
+        distance = min(abs(p - last_price[r]) for p, v in zip(candidates, volumes) if v == best_volume)
+        assert _brute_force_volume(bid_p[r], bid_q[r], ask_p[r], ask_q[r], price[r]) == best_volume
+        assert abs(price[r] - last_price[r]) == distance
+        assert np.isclose(bid_fill[r].sum(), best_volume) and np.isclose(ask_fill[r].sum(), best_volume)
+        assert np.all(bid_fill[r] <= bid_q[r] + 1e-9) and np.all(ask_fill[r] <= ask_q[r] + 1e-9)
+        assert not bid_fill[r][bid_p[r] < price[r]].any() and not ask_fill[r][ask_p[r] > price[r]].any()
+
+
+def test_reporter_dtypes_match_market_model():
+    params = {'fundamentalists_number': 5, 'chartists_number': 5, 'steps_number': 5}
+    ensemble = EnsembleModel(replicas=2, seed=1, **params)
+    ensemble.run_model()
+    model = MarketModel(**params)
+    model.run_model()
+    expected = model.datacollector.get_model_vars_dataframe()
+    for data in [ensemble.get_model_vars_dataframe(), ensemble.get_model_vars_dataframe(replica=0)]:
+        assert list(data.columns) == [c for c in expected.columns if not c.startswith('Profile:')]
+        for column in BOOL_REPORTERS:
+            assert data[column].dtype == expected[column].dtype == bool
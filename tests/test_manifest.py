@@ -0,0 +1,47 @@
+import pytest
+
+import config
+from experiments.manifest import JobStatus, SweepManifest
+from experiments.run_experiments import _calc_hash, _job_id
+
+
+def _colliding_params() -> tuple[dict, dict]:
+    seen = {}
+    for idx in range(10_000):
+        params = {'tick_size': 0.01, 'steps_number': idx}
+        seen.setdefault(_calc_hash(params), []).append(params)
+        if len(seen[_calc_hash(params)]) == 2:
+            return tuple(seen[_calc_hash(params)])
+
+
+def test_job_ids_use_the_full_params_digest(tmp_path):
+    first, second = _colliding_params()
+    seed = config.SEEDS[0]
+    assert _job_id(seed, first) != _job_id(seed, second)
+
+    manifest = SweepManifest(str(tmp_path))
+    manifest.add_job(_job_id(seed, first), seed, first)
+    manifest.add_job(_job_id(seed, second), seed, second)
+    with pytest.raises(ValueError):
+        manifest.add_job(_job_id(seed, first), seed, first)
+    manifest.save()
+
+    manifest.set_status(_job_id(seed, first), JobStatus.RUNNING)
+    assert SweepManifest(str(tmp_path)).unfinished() == [(_job_id(seed, first), seed, first),
+                                                          (_job_id(seed, second), seed, second)]
+
+
+def test_resume_keeps_common_shocks(tmp_path):
+    from experiments.run_experiments import _sweep_common_shocks
+
+    manifest = SweepManifest(str(tmp_path))
+    manifest.add_job('0_a', config.SEEDS[0], {'tick_size': 0.05})
+    manifest.save()
+    assert _sweep_common_shocks(manifest, 'all') == 'all'
+
+    resumed = SweepManifest(str(tmp_path))
+    assert list(resumed.jobs) == ['0_a']
+    assert _sweep_common_shocks(resumed, None) == 'all'
+    assert _sweep_common_shocks(resumed, 'all') == 'all'
+    with pytest.raises(ValueError):
+        _sweep_common_shocks(resumed, 'news')
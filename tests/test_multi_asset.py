@@ -0,0 +1,23 @@
+import numpy as np
+
+from abm_model.market_agent import MarketAgent
+from abm_model.multi_asset import MultiAssetModel
+
+PARAMS = {'fundamentalists_number': 5, 'chartists_number': 5, 'steps_number': 10}
+
+
+def _run(workers):
+    with MultiAssetModel(3, PARAMS, seed=1, news_correlation=0.5, workers=workers) as model:
+        model.run_model()
+        return model.prices, model.news, model.accounts()
+
+
+def test_sharded_run_matches_serial():
+    rng_state = MarketAgent.RNG.bit_generator.state
+    serial, sharded = _run(1), _run(2)
+    assert MarketAgent.RNG.bit_generator.state == rng_state
+    assert np.array_equal(serial[0], sharded[0])
+    assert np.array_equal(serial[1], sharded[1])
+    for expected, actual in zip(serial[2], sharded[2]):
+        assert np.array_equal(expected, actual)
+    assert serial[2][0].shape == (10, 3)
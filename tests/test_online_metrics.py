@@ -0,0 +1,34 @@
+import math
+
+import numpy as np
+import pytest
+
+from abm_model.online_metrics import LagCorrelation, Welford
+
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(42).lognormal(0., 0.5, 500)
+
+
+def test_welford_moments(values):
+    acc = Welford()
+    for value in values:
+        acc.update(value)
+    assert acc.mean == pytest.approx(values.mean())
+    assert acc.variance() == pytest.approx(values.var(ddof=1))
+    assert acc.std(ddof=0) == pytest.approx(values.std())
+    centered = values - values.mean()
+    assert acc.kurtosis() == pytest.approx((centered ** 4).mean() / (centered ** 2).mean() ** 2 - 3)
+
+
+def test_welford_empty():
+    assert math.isnan(Welford().variance())
+
+
+def test_lag_correlation(values):
+    acc = LagCorrelation()
+    for value in values:
+        acc.update(value)
+    assert acc.n == len(values) - 1
+    assert acc.corr() == pytest.approx(np.corrcoef(values[:-1], values[1:])[0, 1])
@@ -51,6 +51,43 @@ def test_get_mu_spread(filled_order_book):
     assert filled_order_book.get_mu_spread() == 102.0
 
 
+def test_best_excluding_agent(filled_order_book):
+    assert filled_order_book.get_best_bid(exclude='agent2').price == 100.0
+    assert filled_order_book.get_best_ask(exclude='agent3').price == 104.0
+    assert filled_order_book.get_central_price(exclude='agent2') == 101.5
+
+
+def test_cancel_order(filled_order_book):
+    order = filled_order_book.place_order('agent5', MarketAction.BUY_LIMIT, 101.0, 3)
+    assert filled_order_book.cancel_order(order)
+    assert [o.agent_id for o in filled_order_book.bid] == ['agent2', 'agent1']
+    assert not filled_order_book.cancel_order(order)
+
+
+def test_amend_order_keeps_priority_on_decrease(filled_order_book):
+    order = filled_order_book.bid[0]
+    filled_order_book.place_order('agent5', MarketAction.BUY_LIMIT, 101.0, 3)
+    assert filled_order_book.amend_order(order, 5)
+    assert [(o.agent_id, o.quantity) for o in filled_order_book.bid[:2]] == [('agent2', 5), ('agent5', 3)]
+
+    assert filled_order_book.amend_order(order, 20)
+    assert [(o.agent_id, o.quantity) for o in filled_order_book.bid[:2]] == [('agent5', 3), ('agent2', 20)]
+    with pytest.raises(ValueError):
+        filled_order_book.amend_order(order, 0)
+
+
+def test_replace_order(filled_order_book):
+    order = filled_order_book.ask[0]
+    assert filled_order_book.replace_order(order, 105.0)
+    assert [(o.agent_id, o.price) for o in filled_order_book.ask] == [('agent4', 104.0), ('agent3', 105.0)]
+    assert filled_order_book.replace_order(order, 102.0, 2)
+    assert filled_order_book.get_best_ask() is order and order.quantity == 2
+
+    filled_order_book.cancel_order(order)
+    assert not filled_order_book.replace_order(order, 103.0)
+    assert not filled_order_book.amend_order(order, 1)
+
+
 def test_invalid_order(empty_order_book):
     with pytest.raises(ValueError):
         empty_order_book.place_order('agent1', 'INVALID_ACTION', 100.0, 10)
@@ -0,0 +1,32 @@
+import config
+from abm_model.chartist import ChartistAgent
+from abm_model.market_agent import MarketAgent
+from abm_model.market_model import MarketModel
+from abm_model.population import clear_cache
+
+
+def _model(**kwargs):
+    MarketAgent.update_rng(config.SEEDS[0])
+    return MarketModel(fundamentalists_number=5, chartists_number=5, steps_number=1, **kwargs)
+
+
+def _agents_state(model):
+    return [(type(a).__name__, a.cash, getattr(a, 'take_profit', None), getattr(a, '_fundamental_price', None))
+            for a in model.agents if isinstance(a, MarketAgent)]
+
+
+def test_exact_template_matches_agents_construction():
+    clear_cache()
+    expected = _agents_state(_model(population=None))
+    next_draw = MarketAgent.RNG.random()
+    for _ in range(2):  # cache miss, then hit
+        assert _agents_state(_model(population='exact')) == expected
+        assert MarketAgent.RNG.random() == next_draw
+
+
+def test_class_config_does_not_leak():
+    _model(chartists_config={'take_profit_range': [0.5, 0.6], 'lambda_limit': 1.})
+    assert ChartistAgent.take_profit_range == [0.5, 0.6]
+    _model()
+    assert ChartistAgent.take_profit_range == [0.01, 0.1]
+    assert 'lambda_limit' not in vars(ChartistAgent)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from utils.price_history import PriceHistory
+
+
+def test_full_mode():
+    prices = PriceHistory(100., capacity=2)
+    for price in [101., 102., 103.]:
+        prices.append(price)
+    assert len(prices) == 4
+    assert prices[-1] == 103.
+    assert prices[-2] == 102.
+    assert prices[0] == 100.
+    assert list(prices) == [100., 101., 102., 103.]
+
+
+def test_ring_mode():
+    prices = PriceHistory(100., window=3)
+    for price in range(101, 106):
+        prices.append(price)
+    assert len(prices) == 6
+    assert prices[-1] == 105.
+    assert prices[-2] == 104.
+    assert prices.to_numpy().tolist() == [103., 104., 105.]
+    with pytest.raises(IndexError):
+        prices[0]
+
+
+def test_ring_mode_spill(tmp_path):
+    path = str(tmp_path / 'prices.npy')
+    prices = PriceHistory(100., capacity=3, window=2, spill_path=path)
+    for price in range(101, 106):
+        prices.append(price)
+    prices.flush()
+    assert prices.to_numpy().tolist() == [100., 101., 102., 103., 104., 105.]
+    assert np.load(path, mmap_mode='r')[:6].tolist() == [100., 101., 102., 103., 104., 105.]
+
+
+def test_invalid_window():
+    with pytest.raises(ValueError):
+        PriceHistory(100., window=1)
@@ -0,0 +1,31 @@
+from abm_model.quoting import QuoteLadder
+from utils.models import MarketAction
+from utils.order_book import OrderBook
+
+BID, ASK = MarketAction.BUY_LIMIT, MarketAction.SELL_LIMIT
+
+
+def test_ladder_touches_changed_levels_only():
+    ob = OrderBook()
+    ladder = QuoteLadder(ob, 'mm')
+    assert ladder.update({(BID, 0): (99., 10), (BID, 1): (98., 10), (ASK, 0): (101., 10)}) == 3
+    kept = ladder.orders[(BID, 0)]
+    ob.place_order('agent1', BID, 99., 5)
+
+    assert ladder.update({(BID, 0): (99., 10), (BID, 1): (97., 10)}) == 2
+    assert ladder.orders[(BID, 0)] is kept
+    assert [(o.agent_id, o.price) for o in ob.bid] == [('mm', 99.), ('agent1', 99.), ('mm', 97.)]
+    assert len(ob.ask) == 0
+
+
+def test_ladder_requotes_partially_filled_level():
+    ob = OrderBook()
+    ladder = QuoteLadder(ob, 'mm')
+    ladder.update({(ASK, 0): (101., 10)})
+    ob.place_order('agent1', MarketAction.BUY, 101., 4)
+    ob.execute_orders()
+
+    assert ladder.update({(ASK, 0): (101., 10)}) == 1
+    assert [(o.price, o.quantity) for o in ob.ask] == [(101., 10)]
+    ladder.cancel()
+    assert len(ob) == 0
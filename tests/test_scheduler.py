@@ -0,0 +1,28 @@
+import config
+from abm_model.chartist import ChartistAgent
+from abm_model.market_model import MarketModel, _agents_factory
+from experiments.run_experiments import _change_seed
+
+
+def _model(**kwargs):
+    _change_seed(config.SEEDS[0])
+    return MarketModel(fundamentalists_number=5, chartists_number=5, steps_number=5, **kwargs)
+
+
+def test_agent_views_follow_population():
+    model = _model()
+    chartists = model.schedule.agents_of_type(ChartistAgent)
+    assert chartists == tuple(model.get_agents_of_type(ChartistAgent))
+    assert model.schedule.agents_of_type(ChartistAgent) is chartists  # cached
+    _agents_factory(model, ChartistAgent, 1)
+    assert len(model.schedule.agents_of_type(ChartistAgent)) == 6
+    assert model.schedule.agents_number == len(model.agents)
+
+
+def test_several_market_makers_are_reproducible():
+    prices = []
+    for _ in range(2):
+        model = _model(market_makers_number=3)
+        model.run_model()
+        prices.append(list(model.prices))
+    assert prices[0] == prices[1]
@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+
+from experiments.series import SeriesBlock
+
+
+def test_series_block(tmp_path):
+    block = SeriesBlock.create(str(tmp_path), ['0_1', '1_1'], steps=3, columns=['Price', 'Volume'])
+    block.write('1_1', pd.DataFrame({'Price': [100., 101.], 'Volume': [0, 5], 'Other': [1, 1]}))
+
+    reopened = SeriesBlock.create(str(tmp_path), ['0_1', '1_1'], steps=3, columns=['Price', 'Volume'])
+    assert np.array_equal(reopened.column('Price', ['1_1'])[0], [100., 101., np.nan], equal_nan=True)
+    assert np.isnan(reopened.column('Volume', ['0_1'])).all()
+    stats = reopened.cross_run_stats('Volume')
+    assert stats['runs'].tolist() == [1, 1, 0] and stats['mean'][1] == 5.
+
+
+def test_changed_jobs_keep_written_rows(tmp_path):
+    block = SeriesBlock.create(str(tmp_path), ['0_1', '1_1'], steps=3, columns=['Price', 'Volume'])
+    block.write('0_1', pd.DataFrame({'Price': [100., 101., 102.], 'Volume': [0, 5, 2]}))
+
+    extended = SeriesBlock.create(str(tmp_path), ['0_1', '0_2', '1_1'], steps=4, columns=['Volume', 'Price'])
+    assert np.array_equal(extended.column('Price', ['0_1'])[0], [100., 101., 102., np.nan], equal_nan=True)
+    assert np.array_equal(extended.column('Volume', ['0_1'])[0], [0., 5., 2., np.nan], equal_nan=True)
+    assert np.isnan(extended.column('Price', ['0_2', '1_1'])).all()
+
+    shorter = SeriesBlock.create(str(tmp_path), ['0_1'], steps=2, columns=['Price'])
+    assert shorter.column('Price').tolist() == [[100., 101.]]
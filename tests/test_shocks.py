@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+import config
+from abm_model.market_model import MarketModel
+from abm_model.shocks import generate_shocks
+from experiments.run_experiments import _change_seed
+
+
+def _news_steps(tick_size, shocks):
+    _change_seed(config.SEEDS[0])
+    model = MarketModel(fundamentalists_number=5, chartists_number=5, steps_number=30, tick_size=tick_size,
+                        shocks=shocks)
+    model.run_model()
+    data = model.datacollector.get_model_vars_dataframe()
+    return (data['Positive news occurred'] | data['Negative news occurred']).to_numpy()[1:]
+
+
+def test_shocks_are_shared_across_params():
+    shocks = generate_shocks(config.SEEDS[0], 30, traders_number=10)
+    assert np.array_equal(generate_shocks(config.SEEDS[0], 20).news, shocks.news[:20], equal_nan=True)
+    news = _news_steps(0.01, shocks)
+    assert np.array_equal(news, ~np.isnan(shocks.news))
+    assert np.array_equal(news, _news_steps(0.5, shocks))
+
+
+def test_activation_must_match_traders():
+    with pytest.raises(ValueError):
+        _news_steps(0.05, generate_shocks(config.SEEDS[0], 30, traders_number=7))
+
+
+def test_saved_paths_follow_the_sweep(tmp_path):
+    from experiments.manifest import SweepManifest
+    from experiments.run_experiments import _job_id, _prepare_shocks, _shocks_mode
+    from abm_model.shocks import ShockPaths
+
+    seed = config.SEEDS[0]
+    manifest = SweepManifest(str(tmp_path))
+    params = {'fundamentalists_number': 5, 'chartists_number': 5, 'steps_number': 50, 'tick_size': 0.05}
+    manifest.add_job(_job_id(seed, params), seed, params)
+    _prepare_shocks(str(tmp_path), manifest, 'all')
+    short = ShockPaths.load(str(tmp_path), '0')
+    short_news, short_activation = np.array(short.news), np.array(short.activation)
+
+    longer = dict(params, steps_number=100)
+    manifest.add_job(_job_id(seed, longer), seed, longer)
+    _prepare_shocks(str(tmp_path), manifest, 'all')
+    extended = ShockPaths.load(str(tmp_path), '0')
+    assert len(extended.news) == 100 and np.array_equal(extended.news[:50], short_news, equal_nan=True)
+    assert np.array_equal(extended.activation[:50], short_activation)
+    extended_news = np.array(extended.news)
+
+    _prepare_shocks(str(tmp_path), manifest, 'news')
+    assert _shocks_mode(ShockPaths.load(str(tmp_path), '0')) == 'news'
+
+    manifest.jobs[_job_id(seed, longer)]['params'] = dict(longer, scheduler_config={'news_lambda': 0.9})
+    manifest.jobs[_job_id(seed, params)]['params'] = dict(params, scheduler_config={'news_lambda': 0.9})
+    _prepare_shocks(str(tmp_path), manifest, 'news')
+    assert ShockPaths.load_info(str(tmp_path), '0')['news_lambda'] == 0.9
+    assert not np.array_equal(ShockPaths.load(str(tmp_path), '0').news, extended_news, equal_nan=True)
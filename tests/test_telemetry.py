@@ -0,0 +1,14 @@
+import json
+
+from experiments.telemetry import SweepTelemetry
+
+
+def test_status(tmp_path):
+    with SweepTelemetry(str(tmp_path), total=4, pending=3) as telemetry:
+        telemetry.job_done('0_1', {'pid': 1, 'wall_time': 2., 'steps': 10, 'peak_rss_mb': 50.})
+        telemetry.job_failed('1_1', 'ValueError()')
+    with open(tmp_path / SweepTelemetry.file_name) as s_file:
+        status = json.load(s_file)
+    assert status['jobs'] == {'total': 4, 'done': 1, 'failed': 1, 'pending': 1, 'finished before': 1}
+    assert status['workers']['1']['steps_per_sec'] == 5.
+    assert status['eta'] is not None
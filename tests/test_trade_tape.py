@@ -0,0 +1,37 @@
+import math
+
+import numpy as np
+import pytest
+
+from utils.trade_tape import TradeTape
+
+
+@pytest.fixture
+def tape():
+    tape = TradeTape(capacity=2, steps=1)
+    tape.record(0, 100., 2, 'ChartistAgent', 'MarketMaker', 1)
+    tape.record(0, 101., 1, 'MarketMaker', 'ChartistAgent', -1)
+    tape.record(2, 99., 3, 'FundamentalistAgent', 'MarketMaker', 1)
+    return tape
+
+
+def test_fills(tape):
+    fills = tape.fills()
+    assert len(tape) == 3
+    assert fills['sequence'].tolist() == [0, 1, 0]
+    assert [tape.types[code] for code in fills['buyer_type']] == ['ChartistAgent', 'MarketMaker',
+                                                                   'FundamentalistAgent']
+
+
+def test_bars(tape):
+    bars = tape.bars()
+    assert tape.steps == 3
+    assert bars['open'][0] == 100. and bars['high'][0] == 101. and bars['low'][0] == 100. and bars['close'][0] == 101.
+    assert bars['vwap'][0] == pytest.approx(301 / 3) == tape.vwap(0)
+    assert bars['signed_flow'].tolist() == [1., 0., 3.]
+    assert np.isnan(bars['close'][1]) and math.isnan(tape.vwap(1))
+
+
+def test_step_order(tape):
+    with pytest.raises(ValueError):
+        tape.record(1, 100., 1, 'ChartistAgent', 'MarketMaker')
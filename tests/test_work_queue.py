@@ -0,0 +1,51 @@
+import os
+import threading
+import time
+
+import config
+from experiments.work_queue import WorkQueue, _heartbeat
+
+PARAMS = [{'steps_number': 5, 'tick_size': 0.05}, {'steps_number': 5, 'tick_size': 0.1}]
+
+
+def test_claim_and_complete(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    assert queue.submit(PARAMS, config.SEEDS[:1]) == 2
+    assert queue.submit(PARAMS, config.SEEDS[:1]) == 0
+    job, claim_path = queue.claim()
+    assert queue.counts() == {'pending': 1, 'claimed': 1, 'done': 0, 'failed': 0}
+    assert queue.submit(PARAMS, config.SEEDS[:1]) == 0
+    queue.complete(job, claim_path, {'seed': 0, 'spread': 0.1})
+    assert queue.counts() == {'pending': 1, 'claimed': 0, 'done': 1, 'failed': 0}
+    job, claim_path = queue.claim()
+    queue.fail(job, claim_path, ValueError('boom'))
+    assert queue.claim() is None
+    assert queue.retry_failed() == 1 and queue.counts()['pending'] == 1
+
+
+def test_claim_is_fresh_and_recover_stale(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    queue.submit(PARAMS[:1], config.SEEDS[:1])
+    (pending,) = queue._files('pending')
+    os.utime(pending, (time.time() - 3600, time.time() - 3600))
+    job, claim_path = queue.claim()
+    assert queue.recover_stale(stale_after=600) == 0 and os.path.exists(claim_path)
+
+    os.utime(claim_path, (time.time() - 3600, time.time() - 3600))
+    assert queue.recover_stale(stale_after=600) == 1
+    assert queue.counts()['pending'] == 1 and not os.path.exists(claim_path)
+    queue._release(claim_path)  # the old owner finishing late doesn't fail
+
+
+def test_heartbeat_refreshes_claim(tmp_path):
+    queue = WorkQueue(str(tmp_path))
+    queue.submit(PARAMS[:1], config.SEEDS[:1])
+    job, claim_path = queue.claim()
+    os.utime(claim_path, (time.time() - 3600, time.time() - 3600))
+    stop = threading.Event()
+    beat = threading.Thread(target=_heartbeat, args=(claim_path, 0.01, stop), daemon=True)
+    beat.start()
+    time.sleep(0.1)
+    stop.set()
+    beat.join()
+    assert queue.recover_stale(stale_after=600) == 0
@@ -15,3 +15,4 @@ class Transaction(NamedTuple):
     seller_id: int
     price: float
     quantity: int
+    aggressor: int = 0  # 1 buyer-initiated, -1 seller-initiated
@@ -1,4 +1,4 @@
-from bisect import insort_right
+from bisect import bisect_left, insort_right
 from collections import deque
 from dataclasses import dataclass, field
 from operator import attrgetter
@@ -21,6 +21,11 @@ class OrderBook:
         self.__bid: list[Order | None] = []
         self.__ask: list[Order | None] = []
         self.__market_orders: deque[Order | None] = deque([])
+        # cumulative counters, read by `abm_model.profiling.StepProfiler`
+        self.orders_placed = 0
+        self.orders_cancelled = 0
+        self.orders_amended = 0
+        self.executions = 0
 
     def __len__(self):
         return len(self.__bid) + len(self.__ask)
@@ -46,17 +51,30 @@ class OrderBook:
     def market_orders(self):
         return self.__market_orders
 
-    def get_best_ask(self) -> Order | None:
-        if len(self.ask) == 0: return
-        return self.ask[0]
-
-    def get_best_bid(self) -> Order | None:
-        if len(self.bid) == 0: return
-        return self.bid[0]
-
-    def get_central_price(self) -> float | None:
-        if not all([self.get_best_ask(), self.get_best_bid()]): return
-        return 0.5 * (self.get_best_ask().price + self.get_best_bid().price)
+    @staticmethod
+    def __best(side: list[Order], exclude: int | str | None) -> Order | None:
+        if exclude is None:
+            return side[0] if side else None
+        for order in side:
+            if order.agent_id != exclude:
+                return order
+
+    def get_best_ask(self, exclude: int | str | None = None) -> Order | None:
+        """
+        exclude: agent id whose own orders are skipped
+        """
+        return self.__best(self.__ask, exclude)
+
+    def get_best_bid(self, exclude: int | str | None = None) -> Order | None:
+        """
+        exclude: agent id whose own orders are skipped
+        """
+        return self.__best(self.__bid, exclude)
+
+    def get_central_price(self, exclude: int | str | None = None) -> float | None:
+        best_ask, best_bid = self.get_best_ask(exclude), self.get_best_bid(exclude)
+        if not all([best_ask, best_bid]): return
+        return 0.5 * (best_ask.price + best_bid.price)
 
     def _add_ask(self, order: Order):
         insort_right(self.__ask, order, key=attrgetter('price'))
@@ -67,24 +85,32 @@ class OrderBook:
     def _add_market(self, order: Order):
         self.__market_orders.append(order)
 
-    def place_order(self, agent_id: int, action: MarketAction, price: float, quantity: int):
+    def place_order(self, agent_id: int, action: MarketAction, price: float, quantity: int) -> Order | None:
+        """
+        Returns the placed order, it is the handle for `cancel_order`. None for ABSTAIN.
+        """
         if quantity <= 0:
             raise ValueError(f"Agent: {agent_id}. Order quantity has to be > 0, got {str(quantity)}.")
         order = Order(agent_id=agent_id, type_=action, price=price, quantity=quantity)
         match action:
             case MarketAction.BUY | MarketAction.SELL:
                 self._add_market(order)
+                self.orders_placed += 1
             case MarketAction.BUY_LIMIT:
                 self._add_bid(order)
+                self.orders_placed += 1
             case MarketAction.SELL_LIMIT:
                 self._add_ask(order)
+                self.orders_placed += 1
             case MarketAction.ABSTAIN:
-                pass
+                return
             case _:
                 raise ValueError(f"Invalid action '{action}'. "
                                  f"Expected MarketAction one from `{', '.join(MarketAction.__members__.keys())}`.")
+        return order
 
     def cancel_limit_orders(self, agent_id: int, side: str = 'both'):
+        book_len = len(self)
         match side:
             case 'both':
                 self.__bid = [order for order in self.__bid if order.agent_id != agent_id]
@@ -95,19 +121,94 @@ class OrderBook:
                 self.__ask = [order for order in self.__ask if order.agent_id != agent_id]
             case _:
                 raise ValueError(f'Wrong `side`. Expected both, ask or bid. Got {str(side)}.')
+        self.orders_cancelled += book_len - len(self)
+
+    def __locate(self, order: Order) -> tuple[list[Order], int | None]:
+        match order.type_:
+            case MarketAction.BUY_LIMIT:
+                side, key = self.__bid, lambda x: -x.price
+            case MarketAction.SELL_LIMIT:
+                side, key = self.__ask, attrgetter('price')
+            case _:
+                raise ValueError(f"Expected a limit order, got {order.type_}.")
+        idx = bisect_left(side, key(order), key=key)
+        while idx < len(side) and side[idx].price == order.price:
+            if side[idx] is order:
+                return side, idx
+            idx += 1
+        return side, None
+
+    def cancel_order(self, order: Order) -> bool:
+        """
+        Removes one resting limit order by its handle. Returns False if it is not in the book (filled or cancelled).
+        """
+        side, idx = self.__locate(order)
+        if idx is None:
+            return False
+        del side[idx]
+        self.orders_cancelled += 1
+        return True
+
+    def amend_order(self, order: Order, quantity: int) -> bool:
+        """
+        Changes the quantity of a resting limit order. A decrease keeps its time priority, an increase requeues it
+        at the back of its price level. Returns False if the order is not in the book.
+        """
+        if quantity <= 0:
+            raise ValueError(f"Agent: {order.agent_id}. Order quantity has to be > 0, got {str(quantity)}.")
+        side, idx = self.__locate(order)
+        if idx is None:
+            return False
+        if quantity > order.quantity:
+            del side[idx]
+            order.quantity, order.ts = quantity, time.time()
+            self.__requeue(order)
+        else:
+            order.quantity = quantity
+        self.orders_amended += 1
+        return True
+
+    def replace_order(self, order: Order, price: float, quantity: int | None = None) -> bool:
+        """
+        Moves a resting limit order to a new price (and quantity), it is requeued like a new order but keeps
+        its handle. Without a price change it is `amend_order`. Returns False if the order is not in the book.
+        """
+        quantity = order.quantity if quantity is None else quantity
+        if price == order.price:
+            return self.amend_order(order, quantity)
+        if quantity <= 0:
+            raise ValueError(f"Agent: {order.agent_id}. Order quantity has to be > 0, got {str(quantity)}.")
+        side, idx = self.__locate(order)
+        if idx is None:
+            return False
+        del side[idx]
+        order.price, order.quantity, order.ts = price, quantity, time.time()
+        self.__requeue(order)
+        self.orders_amended += 1
+        return True
+
+    def __requeue(self, order: Order):
+        if order.type_ == MarketAction.BUY_LIMIT:
+            self._add_bid(order)
+        else:
+            self._add_ask(order)
 
     @staticmethod
     def __make_transaction(order: Order, matched: Order) -> Transaction:
         trade_qty = min(order.quantity, matched.quantity)
         if abs(order.type_.value) == 1:
+            # limit against limit: the resting (earlier) order sets the price, the later one is the aggressor
             trade_price = order.price if order.ts < matched.ts else matched.price
+            aggressor = matched if order.ts < matched.ts else order
         else:
             trade_price = matched.price
+            aggressor = order
         transaction = Transaction(
             buyer_id=order.agent_id if order.type_.value > 0 else matched.agent_id,
             seller_id=matched.agent_id if matched.type_.value < 0 else order.agent_id,
             price=trade_price,
             quantity=trade_qty,
+            aggressor=1 if aggressor.type_.value > 0 else -1,
         )
         order.quantity -= trade_qty
         matched.quantity -= trade_qty
@@ -129,6 +230,7 @@ class OrderBook:
         return transactions
 
     def execute_orders(self) -> list[Transaction | None]:
+        self.executions += 1
         transactions = []
         while self.__market_orders:
             market_order = self.__market_orders.popleft()
@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+
+
+class PriceHistory:
+    """
+    Append-only price series backed by a preallocated NumPy array, with the list interface agents use
+    (`prices[-1]`, `prices[-2]`, `len(prices)`, `append`).
+
+    capacity: expected number of prices, the array grows by doubling if it is exceeded
+    window: ring-buffer mode, only the last `window` prices are kept in memory
+    spill_path: in ring-buffer mode, the full series is also written to this memory-mapped file
+        (float64, `capacity` long), so it can be read after the run while RAM use stays constant
+    """
+
+    def __init__(self, initial_price: float, capacity: int = 1024, window: int | None = None,
+                 spill_path: str | None = None):
+        if window is not None and window < 2:
+            raise ValueError(f"`window` must be >=2, agents read two last prices. Got {str(window)}.")
+        if spill_path and window is None:
+            raise ValueError('`spill_path` is used in the ring-buffer mode only, `window` is required.')
+        self.window = window
+        self.capacity = int(capacity)
+        self.__data = np.empty(window if window else max(self.capacity, 2), dtype=np.float64)
+        self.__len = 0
+        self.__last = None
+        self.__spill: np.memmap | None = None
+        if spill_path:
+            self.__spill = np.lib.format.open_memmap(spill_path, mode='w+', dtype=np.float64,
+                                                     shape=(max(self.capacity, 2),))
+        self.append(initial_price)
+
+    def __len__(self):
+        return self.__len
+
+    def __repr__(self):
+        cls = type(self).__name__
+        return f'{cls}(len={self.__len}, window={self.window}, last={self.__last})'
+
+    @property
+    def first_available(self) -> int:
+        """
+        Index of the oldest price kept in memory.
+        """
+        return max(self.__len - self.window, 0) if self.window else 0
+
+    def append(self, price: float):
+        price = float(price)
+        if self.window:
+            self.__data[self.__len % self.window] = price
+            if self.__spill is not None:
+                if self.__len >= len(self.__spill):
+                    self.__grow_spill()
+                self.__spill[self.__len] = price
+        else:
+            if self.__len == len(self.__data):
+                self.__data = np.concatenate([self.__data, np.empty(len(self.__data), dtype=np.float64)])
+            self.__data[self.__len] = price
+        self.__len += 1
+        self.__last = price
+
+    def __grow_spill(self):
+        path = self.__spill.filename
+        self.__spill.flush()
+        old_len = len(self.__spill)
+        del self.__spill
+        grown = np.lib.format.open_memmap(path + '.tmp', mode='w+', dtype=np.float64, shape=(old_len * 2,))
+        grown[:old_len] = np.load(path, mmap_mode='r')
+        grown.flush()
+        del grown
+        os.replace(path + '.tmp', path)
+        self.__spill = np.load(path, mmap_mode='r+')
+
+    def __index(self, idx: int) -> int:
+        if idx < 0:
+            idx += self.__len
+        if not 0 <= idx < self.__len:
+            raise IndexError('PriceHistory index out of range')
+        if idx < self.first_available:
+            raise IndexError(f'Price {idx} is out of the ring-buffer window {self.window}')
+        return idx % self.window if self.window else idx
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            return self.to_numpy()[idx].tolist()
+        if idx == -1:
+            return self.__last
+        return float(self.__data[self.__index(idx)])
+
+    def __iter__(self):
+        return iter(self.to_numpy().tolist())
+
+    def to_numpy(self) -> np.ndarray:
+        """
+        The full series if it is available (full mode or spilled), otherwise the prices in the window.
+        """
+        if self.__spill is not None:
+            return np.asarray(self.__spill[:self.__len])
+        if not self.window:
+            return self.__data[:self.__len]
+        if self.__len <= self.window:
+            return self.__data[:self.__len]
+        head = self.__len % self.window
+        return np.concatenate([self.__data[head:], self.__data[:head]])
+
+    def flush(self):
+        if self.__spill is not None:
+            self.__spill.flush()
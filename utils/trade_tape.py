@@ -0,0 +1,134 @@
+import numpy as np
+
+FILL_COLUMNS = {
+    'step': np.int32,
+    'sequence': np.int32,
+    'price': np.float64,
+    'quantity': np.int64,
+    'buyer_type': np.int8,
+    'seller_type': np.int8,
+    'aggressor': np.int8,
+}
+BAR_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'notional', 'signed_flow', 'trades']
+
+
+class TradeTape:
+    """
+    Columnar record of every fill plus per-step bars (OHLC, volume, VWAP, signed order flow), both kept in
+    preallocated NumPy arrays which grow by doubling. Bars are updated as fills are recorded.
+
+    capacity: expected number of fills
+    steps: expected number of steps
+    Agent types are stored as codes, `types[code]` is the type name.
+    """
+
+    def __init__(self, capacity: int = 4096, steps: int = 256):
+        self.types: list[str] = []
+        self.__type_codes: dict[str, int] = {}
+        self.__fills = {name: np.zeros(max(int(capacity), 1), dtype=dtype) for name, dtype in FILL_COLUMNS.items()}
+        self.__len = 0
+        self.__bars = {name: np.zeros(max(int(steps), 1), dtype=np.int64 if name == 'trades' else np.float64)
+                       for name in BAR_COLUMNS}
+        self.__steps = 0
+        self.__last_step = -1
+        self.__sequence = 0
+
+    def __len__(self):
+        return self.__len
+
+    def __repr__(self):
+        cls = type(self).__name__
+        return f'{cls}(fills={self.__len}, steps={self.__steps})'
+
+    @property
+    def steps(self) -> int:
+        """
+        Number of steps covered by the bars, including steps without trades.
+        """
+        return self.__steps
+
+    def type_code(self, type_name: str) -> int:
+        code = self.__type_codes.get(type_name)
+        if code is None:
+            code = self.__type_codes[type_name] = len(self.types)
+            self.types.append(type_name)
+        return code
+
+    @staticmethod
+    def __grow(columns: dict[str, np.ndarray], size: int):
+        for name, column in columns.items():
+            new_len = len(column)
+            while new_len < size:
+                new_len *= 2
+            if new_len != len(column):
+                grown = np.zeros(new_len, dtype=column.dtype)
+                grown[:len(column)] = column
+                columns[name] = grown
+
+    def record(self, step: int, price: float, quantity: int, buyer_type: str, seller_type: str, aggressor: int = 0):
+        if step < self.__last_step:
+            raise ValueError(f'Fills must be recorded in step order. Got step {step} after {self.__last_step}.')
+        if step != self.__last_step:
+            self.__last_step = step
+            self.__sequence = 0
+        if self.__len == len(self.__fills['step']):
+            self.__grow(self.__fills, self.__len + 1)
+        idx = self.__len
+        fills = self.__fills
+        fills['step'][idx] = step
+        fills['sequence'][idx] = self.__sequence
+        fills['price'][idx] = price
+        fills['quantity'][idx] = quantity
+        fills['buyer_type'][idx] = self.type_code(buyer_type)
+        fills['seller_type'][idx] = self.type_code(seller_type)
+        fills['aggressor'][idx] = aggressor
+        self.__len += 1
+        self.__sequence += 1
+
+        if step >= len(self.__bars['trades']):
+            self.__grow(self.__bars, step + 1)
+        self.__steps = max(self.__steps, step + 1)
+        bars = self.__bars
+        if bars['trades'][step] == 0:
+            bars['open'][step] = bars['high'][step] = bars['low'][step] = price
+        else:
+            bars['high'][step] = max(bars['high'][step], price)
+            bars['low'][step] = min(bars['low'][step], price)
+        bars['close'][step] = price
+        bars['volume'][step] += quantity
+        bars['notional'][step] += price * quantity
+        bars['signed_flow'][step] += aggressor * quantity
+        bars['trades'][step] += 1
+
+    def fills(self) -> dict[str, np.ndarray]:
+        """
+        Views of the fill columns, valid until the next `record`.
+        """
+        return {name: column[:self.__len] for name, column in self.__fills.items()}
+
+    def bars(self) -> dict[str, np.ndarray]:
+        """
+        Per-step bars with `vwap`. Prices of steps without trades are NaN.
+        """
+        bars = {name: column[:self.__steps].copy() for name, column in self.__bars.items()}
+        empty = bars['trades'] == 0
+        for name in ['open', 'high', 'low', 'close']:
+            bars[name][empty] = np.nan
+        with np.errstate(invalid='ignore', divide='ignore'):
+            bars['vwap'] = bars['notional'] / bars['volume']
+        return bars
+
+    def vwap(self, step: int) -> float:
+        volume = self.__bars['volume'][step] if step < self.__steps else 0
+        return float(self.__bars['notional'][step] / volume) if volume else float('nan')
+
+    def to_dataframe(self, bars: bool = False):
+        import pandas as pd
+
+        if bars:
+            return pd.DataFrame(self.bars()).rename_axis('Step')
+        data = pd.DataFrame(self.fills())
+        categories = pd.CategoricalDtype(self.types)
+        for name in ['buyer_type', 'seller_type']:
+            data[name] = pd.Categorical.from_codes(data[name], dtype=categories)
+        return data